@@ -76,6 +76,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # CORS middleware should be at the top
+    'store.instrumentation.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -108,9 +109,24 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Keep connections open between requests (DB_CONN_MAX_AGE seconds, 0 to
+# close after each request) and ping them before reuse. Set DB_POOLER=pgbouncer
+# when DATABASE_URL points at a transaction-pooling PgBouncer; see store/db.py.
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', '600'))
+DB_CONN_HEALTH_CHECKS = os.getenv('DB_CONN_HEALTH_CHECKS', 'True').lower() == 'true'
+DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', '10'))
+DB_POOLER = os.getenv('DB_POOLER', '').lower()
+
 DATABASES = {
-    'default': dj_database_url.config(default=os.getenv('DATABASE_URL'))
+    'default': dj_database_url.config(
+        default=os.getenv('DATABASE_URL'),
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
+        disable_server_side_cursors=DB_POOLER == 'pgbouncer',
+    )
 }
+if DATABASES['default'].get('ENGINE', '').endswith('postgresql'):
+    DATABASES['default'].setdefault('OPTIONS', {})['connect_timeout'] = DB_CONNECT_TIMEOUT
 
 
 # Password validation
@@ -158,9 +174,27 @@ LOGGING = {
             'level': 'ERROR',
             'propagate': True,
         },
+        'store.db': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+        # WARNING keeps slow requests and failures; INFO adds a line per request
+        'store.instrumentation': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_LOG_LEVEL', 'WARNING'),
+        },
     },
 }
 
+# Per-request query/timing instrumentation (store/instrumentation.py)
+REQUEST_METRICS_ENABLED = os.getenv("REQUEST_METRICS_ENABLED", "True").lower() == "true"
+REQUEST_METRICS_SERVER_TIMING = os.getenv("REQUEST_METRICS_SERVER_TIMING", "True").lower() == "true"
+DUPLICATE_QUERY_THRESHOLD = int(os.getenv("DUPLICATE_QUERY_THRESHOLD", "3"))
+SLOW_REQUEST_MS = int(os.getenv("SLOW_REQUEST_MS", "1000"))  # 0 disables the slow log
+SLOW_REQUEST_SAMPLE_RATE = float(os.getenv("SLOW_REQUEST_SAMPLE_RATE", "1.0"))
+# Share of requests given a log line at REQUEST_LOG_LEVEL=INFO
+REQUEST_LOG_SAMPLE_RATE = float(os.getenv("REQUEST_LOG_SAMPLE_RATE", "1.0"))
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -213,6 +247,7 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'x-cart-token',
 ]
 
 # Django REST Framework Configuration
@@ -229,6 +264,10 @@ REST_FRAMEWORK = {
         'rest_framework.renderers.JSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
+    # Unbounded lists (products, orders, reviews, returns, discount codes) use
+    # the keyset paginators in store/pagination.py; ?page=<n> gives offset pages.
+    'DEFAULT_PAGINATION_CLASS': 'store.pagination.StoreCursorPagination',
+    'PAGE_SIZE': int(os.getenv('API_PAGE_SIZE', '24')),
 }
 
 
@@ -246,8 +285,66 @@ DJANGO_FILTER_BACKEND_TEMPLATE = None
 PAYSTACK_SECRET_KEY = os.getenv("PAYSTACK_SECRET_KEY", "sk_test_b5f17c18f2d824b1adf063c7fc7c2ccabd75947c")
 PAYSTACK_PUBLIC_KEY = os.getenv("PAYSTACK_PUBLIC_KEY", "pk_test_e3c8e876ce967dad9beddf5b292d2f97f5a9e142")
 PAYSTACK_BASE_URL = os.getenv("PAYSTACK_BASE_URL", "https://api.paystack.co")
+# Outbound Paystack client (store/paystack.py): pooled keep-alive session
+PAYSTACK_CONNECT_TIMEOUT = float(os.getenv("PAYSTACK_CONNECT_TIMEOUT", "5"))
+PAYSTACK_READ_TIMEOUT = float(os.getenv("PAYSTACK_READ_TIMEOUT", "20"))
+PAYSTACK_POOL_SIZE = int(os.getenv("PAYSTACK_POOL_SIZE", "10"))
+PAYSTACK_MAX_RETRIES = int(os.getenv("PAYSTACK_MAX_RETRIES", "2"))  # GETs only
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
 
+# Two-tier cache (store/cache_backends.py): a small per-process L1 in front
+# of a shared L2 that every worker and replica sees. Set REDIS_URL on Railway;
+# without it L2 is a file-based cache in CACHE_DIR (shared by the workers of
+# one machine) or, if that is unset too, per-process LocMem (dev and tests).
+# The catalog, category tree, search index and Mckot quotes all use "default";
+# code that needs a strictly shared value (rate-limit counters) should use
+# caches["shared"] directly.
+REDIS_URL = os.getenv("REDIS_URL", "")
+CACHE_DIR = os.getenv("CACHE_DIR", "")
+CACHE_KEY_PREFIX = os.getenv("CACHE_KEY_PREFIX", "crochethairbygg")
+CACHE_L1_TIMEOUT = int(os.getenv("CACHE_L1_TIMEOUT", "5"))
+
+if REDIS_URL:
+    SHARED_CACHE = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+        "OPTIONS": {"socket_connect_timeout": 2, "socket_timeout": 2},
+    }
+elif CACHE_DIR:
+    SHARED_CACHE = {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": CACHE_DIR}
+else:
+    SHARED_CACHE = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "shared"}
+
+CACHES = {
+    "default": {
+        "BACKEND": "store.cache_backends.TieredCache",
+        "TIMEOUT": 300,
+        "OPTIONS": {"L1": "local", "L2": "shared", "L1_TIMEOUT": CACHE_L1_TIMEOUT},
+    },
+    "local": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "l1",
+        "OPTIONS": {"MAX_ENTRIES": 2000},
+    },
+    "shared": {**SHARED_CACHE, "KEY_PREFIX": CACHE_KEY_PREFIX},
+}
+
+# Anonymous catalog response cache (store/caching.py). Saves and deletes bump
+# the resource's version immediately; TIMEOUT bounds how long an entry lives,
+# MAX_AGE / STALE_WHILE_REVALIDATE go out in Cache-Control for browsers and CDNs.
+API_CACHE_ENABLED = os.getenv("API_CACHE_ENABLED", "True").lower() == "true"
+API_CACHE_TIMEOUT = int(os.getenv("API_CACHE_TIMEOUT", "300"))
+API_CACHE_MAX_AGE = int(os.getenv("API_CACHE_MAX_AGE", "30"))
+API_CACHE_STALE_WHILE_REVALIDATE = int(os.getenv("API_CACHE_STALE_WHILE_REVALIDATE", "30"))
+
+# Server-side guest carts (store/carts.py): tokens expire and idle carts are
+# purged (`manage.py purge_guest_carts`) after this many days
+GUEST_CART_TTL_DAYS = int(os.getenv("GUEST_CART_TTL_DAYS", "30"))
+
+# Stock held for an unpaid order (store/reservations.py) is released after this
+# many minutes; `manage.py release_stock_holds` sweeps lapsed holds
+STOCK_HOLD_MINUTES = int(os.getenv("STOCK_HOLD_MINUTES", "30"))
+
 # Mckot Merchant Delivery API (server-side only — never expose the key to the client)
 MCKOT_BASE_URL = os.getenv("MCKOT_BASE_URL", "https://api.mckot.com/merchant/v1")
 MCKOT_MERCHANT_API_KEY = os.getenv("MCKOT_MERCHANT_API_KEY", "")
@@ -257,6 +354,17 @@ MCKOT_PICKUP_LAT = os.getenv("MCKOT_PICKUP_LAT", "")
 MCKOT_PICKUP_LNG = os.getenv("MCKOT_PICKUP_LNG", "")
 # Default delivery payment posture: prepaid orders pay online; merchant pays the fee
 MCKOT_DEFAULT_FEE_PAYER = os.getenv("MCKOT_DEFAULT_FEE_PAYER", "merchant_wallet")
+# HTTP client (store/mckot.py): pooled keep-alive session
+MCKOT_CONNECT_TIMEOUT = float(os.getenv("MCKOT_CONNECT_TIMEOUT", "5"))
+MCKOT_READ_TIMEOUT = float(os.getenv("MCKOT_READ_TIMEOUT", "30"))
+MCKOT_POOL_SIZE = int(os.getenv("MCKOT_POOL_SIZE", "10"))
+MCKOT_MAX_RETRIES = int(os.getenv("MCKOT_MAX_RETRIES", "2"))  # idempotent calls only
+# Quote cache: seconds to reuse a quote (capped under the 15-min validity) and
+# decimal places the drop-off is rounded to for the cache key (3 ~ 110 m)
+MCKOT_QUOTE_CACHE_SECONDS = int(os.getenv("MCKOT_QUOTE_CACHE_SECONDS", "300"))
+MCKOT_QUOTE_CACHE_PRECISION = int(os.getenv("MCKOT_QUOTE_CACHE_PRECISION", "3"))
+# Hours a webhook event for a delivery we haven't saved yet keeps being retried
+MCKOT_EVENT_RETRY_HOURS = int(os.getenv("MCKOT_EVENT_RETRY_HOURS", "24"))
 
 # Email Configuration
 EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", "django.core.mail.backends.smtp.EmailBackend")
@@ -268,6 +376,14 @@ EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "")
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "noreply@crochethairbygg.com")
 SERVER_EMAIL = DEFAULT_FROM_EMAIL
 
+# Background jobs (store/tasks.py): "database" needs `manage.py run_task_worker`
+# running (see Procfile); "thread" runs jobs in-process for local development.
+BACKGROUND_TASKS_BACKEND = os.getenv("BACKGROUND_TASKS_BACKEND", "database")
+BACKGROUND_TASKS_MAX_ATTEMPTS = int(os.getenv("BACKGROUND_TASKS_MAX_ATTEMPTS", "5"))
+BACKGROUND_TASKS_RETRY_BASE_SECONDS = int(os.getenv("BACKGROUND_TASKS_RETRY_BASE_SECONDS", "10"))
+BACKGROUND_TASKS_RETRY_MAX_SECONDS = int(os.getenv("BACKGROUND_TASKS_RETRY_MAX_SECONDS", "3600"))
+BACKGROUND_TASKS_THREAD_WORKERS = int(os.getenv("BACKGROUND_TASKS_THREAD_WORKERS", "4"))
+
 # For development: Use console backend if no email credentials provided
 if DEBUG and not EMAIL_HOST_USER:
     EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend" 
\ No newline at end of file
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
+
+# Log the effective database settings; the connection is checked lazily
+from store.db import log_database_settings  # noqa: E402
+
+log_database_settings()
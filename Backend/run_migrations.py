@@ -6,4 +6,6 @@ django.setup()
 
 from django.core.management import call_command
 
-call_command("migrate")
\ No newline at end of file
+call_command("migrate")
+# First deploy with the rollup tables: backfill them from existing orders
+call_command("rebuild_sales_rollups", if_empty=True)
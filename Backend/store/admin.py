@@ -1,6 +1,9 @@
 from django.contrib import admin
+from django.db import transaction
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import Category, Product, ProductVariant, ProductImage, Order, OrderItem, Cart, CartItem, Address, ShippingMethod, Favorite, ProductLike, HeroSlide, PromoBanner, Review, DiscountCode, ReturnRequest, Delivery
+from . import reservations
+from .models import Category, Product, ProductVariant, ProductImage, Order, OrderItem, Cart, CartItem, Address, ShippingMethod, Favorite, ProductLike, HeroSlide, PromoBanner, Review, DiscountCode, ReturnRequest, Delivery, BackgroundJob, MckotEvent, PaystackEvent, StockHold
 
 
 @admin.register(Category)
@@ -25,16 +28,18 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ['title', 'category', 'base_price', 'is_active']
+    list_display = ['title', 'category', 'base_price', 'is_active', 'rating_avg', 'rating_count', 'like_count']
     list_filter = ['is_active', 'category']
     search_fields = ['title', 'description']
+    readonly_fields = ['rating_avg', 'rating_count', 'like_count']
 
 
 @admin.register(ProductVariant)
 class ProductVariantAdmin(admin.ModelAdmin):
-    list_display = ['product', 'price', 'stock', 'length', 'color', 'texture']
+    list_display = ['product', 'price', 'stock', 'reserved', 'length', 'color', 'texture']
     list_filter = ['product', 'color', 'texture']
     search_fields = ['product__title']
+    readonly_fields = ['reserved']
 
 
 @admin.register(ProductImage)
@@ -59,7 +64,8 @@ class OrderItemAdmin(admin.ModelAdmin):
 
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
-    list_display = ['user', 'created_at']
+    list_display = ['id', 'user', 'created_at', 'updated_at']
+    list_filter = [('user', admin.EmptyFieldListFilter), 'updated_at']  # "empty" user = guest carts
 
 
 @admin.register(CartItem)
@@ -169,4 +175,56 @@ class DeliveryAdmin(admin.ModelAdmin):
     list_display = ['id', 'order', 'status', 'collection_status', 'ride_type_label', 'delivery_fee', 'courier_name', 'created_at']
     list_filter = ['status', 'collection_status', 'created_at']
     search_fields = ['order__id', 'mckot_delivery_id', 'quote_id', 'courier_name', 'courier_phone']
-    readonly_fields = ['created_at', 'updated_at', 'raw_response']
\ No newline at end of file
+    readonly_fields = ['created_at', 'updated_at', 'raw_response', 'status_history', 'last_event_at']
+
+
+@admin.register(MckotEvent)
+class MckotEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'event', 'delivery_ref', 'order_ref', 'occurred_at', 'applied_at']
+    list_filter = ['event', 'received_at']
+    search_fields = ['delivery_ref', 'order_ref']
+    readonly_fields = ['event', 'delivery_ref', 'order_ref', 'payload', 'occurred_at', 'received_at', 'applied_at']
+
+
+@admin.register(PaystackEvent)
+class PaystackEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'event', 'reference', 'status', 'received_at', 'processed_at']
+    list_filter = ['status', 'event']
+    search_fields = ['reference', 'paystack_id']
+    readonly_fields = ['event', 'reference', 'paystack_id', 'payload', 'received_at', 'processed_at']
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'task_name', 'status', 'attempts', 'max_attempts', 'run_at', 'created_at']
+    list_filter = ['status', 'task_name']
+    search_fields = ['task_name', 'last_error']
+    readonly_fields = ['created_at', 'updated_at', 'locked_at', 'last_error']
+    actions = ['retry_jobs']
+
+    @admin.action(description='Retry selected jobs now')
+    def retry_jobs(self, request, queryset):
+        count = queryset.update(status='pending', attempts=0, run_at=timezone.now(), locked_at=None)
+        self.message_user(request, f'{count} job(s) queued for retry.')
+
+
+@admin.register(StockHold)
+class StockHoldAdmin(admin.ModelAdmin):
+    list_display = ['id', 'order', 'variant', 'quantity', 'expires_at', 'created_at']
+    list_filter = ['expires_at']
+    search_fields = ['order__id', 'variant__product__title']
+    readonly_fields = ['order', 'variant', 'quantity', 'created_at']
+    actions = ['release_holds']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        # A plain delete would leave ProductVariant.reserved counting the hold
+        return False
+
+    @admin.action(description='Release selected holds')
+    def release_holds(self, request, queryset):
+        with transaction.atomic():
+            count = reservations.release_holds(queryset)
+        self.message_user(request, f'{count} hold(s) released.')
@@ -0,0 +1,264 @@
+"""
+Sales analytics backed by daily rollup tables.
+
+DailySalesRollup holds order count, revenue and discount totals per
+(day, status); DailyProductSales holds units and revenue per (day, product)
+for paid orders. When one of a day's orders changes (see store/signals.py),
+a background job recomputes the day from its orders, so the dashboard reads
+a few hundred pre-aggregated rows instead of scanning every order, and the
+request that changed the order doesn't wait for it. Changes to the same
+day share one queued job.
+
+Reports take a [start, end) time range. Whole days inside the range come from
+the rollups; the partial days at either edge, today, and any day whose
+rollup_sales_day job hasn't finished yet are aggregated from Order and
+OrderItem directly, so figures match a query over the raw tables exactly
+even before the worker catches up. Days follow the current time zone, as
+TruncDate does.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from .models import BackgroundJob, DailyProductSales, DailySalesRollup, Order, OrderItem
+from .reservations import PAID_STATUSES
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _order_rows(orders):
+    """Orders grouped by (date, status), in DailySalesRollup's shape."""
+    has_discount = Q(discount_code__isnull=False)
+    return list(
+        orders.annotate(date=TruncDate('created_at'))
+        .values('date', 'status')
+        .annotate(
+            order_count=Count('id'),
+            revenue=Sum('total'),
+            discount_order_count=Count('id', filter=has_discount),
+            discount_total=Sum('discount_amount', filter=has_discount),
+        )
+        .order_by()
+    )
+
+
+def _product_rows(items):
+    """Paid order items grouped by (date, product), in DailyProductSales' shape."""
+    return list(
+        items.filter(order__status__in=PAID_STATUSES)
+        .annotate(date=TruncDate('order__created_at'), product_id=F('variant__product_id'))
+        .values('date', 'product_id')
+        .annotate(quantity=Sum('quantity'), revenue=Sum('item_total'))
+        .order_by()
+    )
+
+
+# --- Maintenance -----------------------------------------------------------
+
+def rollup_day(day, attempts=3):
+    """Recompute both rollup tables for one day from its orders."""
+    start, end = day_start(day), day_start(day + timedelta(days=1))
+    for attempt in range(1, attempts + 1):
+        try:
+            with transaction.atomic():
+                # Delete first: on Postgres this locks the day's rows, so a
+                # concurrent rebuild waits and then reads the committed orders.
+                DailySalesRollup.objects.filter(date=day).delete()
+                DailyProductSales.objects.filter(date=day).delete()
+                orders = Order.objects.filter(created_at__gte=start, created_at__lt=end)
+                items = OrderItem.objects.filter(order__created_at__gte=start, order__created_at__lt=end)
+                DailySalesRollup.objects.bulk_create([
+                    DailySalesRollup(
+                        date=day,
+                        status=row['status'],
+                        order_count=row['order_count'],
+                        revenue=row['revenue'] or 0,
+                        discount_order_count=row['discount_order_count'],
+                        discount_total=row['discount_total'] or 0,
+                    )
+                    for row in _order_rows(orders)
+                ])
+                DailyProductSales.objects.bulk_create([
+                    DailyProductSales(
+                        date=day, product_id=row['product_id'],
+                        quantity=row['quantity'] or 0, revenue=row['revenue'] or 0,
+                    )
+                    for row in _product_rows(items)
+                ])
+            return
+        except IntegrityError:
+            # Another process inserted the same (day, status) first; redo
+            if attempt == attempts:
+                raise
+
+
+def schedule_rollup(day):
+    """Queue a recompute of `day`, unless one is already waiting."""
+    from . import tasks  # tasks imports this module
+    tasks.enqueue_once('rollup_sales_day', day.isoformat())
+
+
+def rebuild_rollups(since=None):
+    """Recompute every day with orders (from `since` onwards); returns the day count."""
+    orders = Order.objects.all()
+    if since:
+        orders = orders.filter(created_at__gte=day_start(since))
+        DailySalesRollup.objects.filter(date__gte=since).delete()
+        DailyProductSales.objects.filter(date__gte=since).delete()
+    else:
+        DailySalesRollup.objects.all().delete()
+        DailyProductSales.objects.all().delete()
+    days = (
+        orders.annotate(date=TruncDate('created_at'))
+        .values_list('date', flat=True).distinct().order_by('date')
+    )
+    count = 0
+    for day in days:
+        rollup_day(day)
+        count += 1
+    return count
+
+
+# --- Reporting -------------------------------------------------------------
+
+def _split(start, end=None):
+    """
+    Split [start, end) into whole days and partial-day time ranges.
+
+    Returns (first_day, stop_day, partial_ranges); whole days are
+    first_day <= d < stop_day, with stop_day None when end is open.
+    """
+    first_day = timezone.localdate(start)
+    if start != day_start(first_day):
+        first_day += timedelta(days=1)
+    stop_day = timezone.localdate(end) if end is not None else None
+
+    if stop_day is not None and first_day >= stop_day:
+        return None, None, [(start, end)]
+    partial = []
+    if start < day_start(first_day):
+        partial.append((start, day_start(first_day)))
+    if stop_day is not None and day_start(stop_day) < end:
+        partial.append((day_start(stop_day), end))
+    return first_day, stop_day, partial
+
+
+def unrolled_days():
+    """
+    Days whose rollups may lag their orders: today, and days with a
+    rollup_sales_day job still queued, running or dead. The reports below
+    look this up themselves; pass it in to share one lookup between them.
+    """
+    days = {timezone.localdate()}
+    for args in BackgroundJob.objects.filter(task_name='rollup_sales_day').values_list('args', flat=True):
+        days.add(date.fromisoformat(args[0]))
+    return sorted(days)
+
+
+def _unrolled_in(unrolled, first_day, stop_day=None):
+    if unrolled is None:
+        unrolled = unrolled_days()
+    return [day for day in unrolled if day >= first_day and (stop_day is None or day < stop_day)]
+
+
+def _day_ranges(days):
+    return [(day_start(day), day_start(day + timedelta(days=1))) for day in days]
+
+
+def _range_q(ranges, field):
+    q = Q(pk__in=[])
+    for lo, hi in ranges:
+        q |= Q(**{f'{field}__gte': lo, f'{field}__lt': hi})
+    return q
+
+
+def order_rows(start, end=None, unrolled=None):
+    """Per (date, status) order totals for [start, end)."""
+    first_day, stop_day, partial = _split(start, end)
+    rows = []
+    if first_day is not None:
+        unrolled = _unrolled_in(unrolled, first_day, stop_day)
+        partial += _day_ranges(unrolled)
+        rollups = DailySalesRollup.objects.filter(date__gte=first_day).exclude(date__in=unrolled)
+        if stop_day is not None:
+            rollups = rollups.filter(date__lt=stop_day)
+        rows += rollups.values(
+            'date', 'status', 'order_count', 'revenue', 'discount_order_count', 'discount_total'
+        ).order_by()
+    if partial:
+        rows += _order_rows(Order.objects.filter(_range_q(partial, 'created_at')))
+    return rows
+
+
+def top_products(start, end=None, limit=10, unrolled=None):
+    """Best sellers by units for [start, end): [{product_id, title, quantity, revenue}]."""
+    first_day, stop_day, partial = _split(start, end)
+    totals = defaultdict(lambda: {'quantity': 0, 'revenue': Decimal('0'), 'title': None})
+
+    def add(product_id, title, quantity, revenue):
+        entry = totals[product_id]
+        entry['quantity'] += quantity or 0
+        entry['revenue'] += revenue or 0
+        entry['title'] = entry['title'] or title
+
+    if first_day is not None:
+        unrolled = _unrolled_in(unrolled, first_day, stop_day)
+        partial += _day_ranges(unrolled)
+        rollups = DailyProductSales.objects.filter(date__gte=first_day).exclude(date__in=unrolled)
+        if stop_day is not None:
+            rollups = rollups.filter(date__lt=stop_day)
+        for row in rollups.values('product_id', 'product__title').annotate(
+            total_quantity=Sum('quantity'), total_revenue=Sum('revenue')
+        ).order_by():
+            add(row['product_id'], row['product__title'], row['total_quantity'], row['total_revenue'])
+    if partial:
+        items = OrderItem.objects.filter(
+            _range_q(partial, 'order__created_at'), order__status__in=PAID_STATUSES
+        )
+        for row in items.values('variant__product_id', 'variant__product__title').annotate(
+            total_quantity=Sum('quantity'), total_revenue=Sum('item_total')
+        ).order_by():
+            add(row['variant__product_id'], row['variant__product__title'],
+                row['total_quantity'], row['total_revenue'])
+
+    ranked = sorted(totals.items(), key=lambda kv: -kv[1]['quantity'])[:limit]
+    return [dict(product_id=product_id, **entry) for product_id, entry in ranked]
+
+
+def total_revenue(unrolled=None):
+    """All-time revenue from paid orders."""
+    if unrolled is None:
+        unrolled = unrolled_days()
+    rolled = DailySalesRollup.objects.filter(status__in=PAID_STATUSES).exclude(date__in=unrolled).aggregate(
+        total=Sum('revenue')
+    )['total'] or Decimal('0')
+    raw = Order.objects.filter(_range_q(_day_ranges(unrolled), 'created_at'), status__in=PAID_STATUSES).aggregate(
+        total=Sum('total')
+    )['total'] or Decimal('0')
+    return rolled + raw
+
+
+def monthly_revenue(limit=12, unrolled=None):
+    """Paid revenue per month, oldest first: [{month, revenue}]."""
+    if unrolled is None:
+        unrolled = unrolled_days()
+    months = defaultdict(Decimal)
+    for row in (
+        DailySalesRollup.objects.filter(status__in=PAID_STATUSES).exclude(date__in=unrolled)
+        .annotate(month=TruncMonth('date'))
+        .values('month')
+        .annotate(revenue=Sum('revenue'))
+        .order_by()
+    ):
+        months[row['month']] += row['revenue'] or 0
+    for row in _order_rows(Order.objects.filter(_range_q(_day_ranges(unrolled), 'created_at'))):
+        if row['status'] in PAID_STATUSES:
+            months[row['date'].replace(day=1)] += row['revenue'] or 0
+    return [{'month': month, 'revenue': months[month]} for month in sorted(months)][:limit]
@@ -0,0 +1,14 @@
+"""
+API benchmark suite.
+
+    python manage.py run_benchmarks --scale small
+    python manage.py run_benchmarks --scale full --save-baseline
+    python manage.py run_benchmarks --scale full          # fails on regressions
+
+Seeds a throwaway database with store.seeding, replays the hot endpoints
+(scenarios.py) in-process through the full middleware stack with Paystack,
+Mckot and SMTP replaced by local fakes (fakes.py), and reports p50/p95/p99
+latency, requests per second and queries per request for each (runner.py).
+Results are compared against a saved baseline JSON; a slower p95 beyond the
+tolerance or any extra queries per request fails the run.
+"""
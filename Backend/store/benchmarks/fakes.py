@@ -0,0 +1,118 @@
+"""
+Local stand-ins for the third-party services, so benchmarks never call out.
+
+FakeServices runs one HTTP server that answers the Paystack and Mckot calls
+the API makes, optionally after a fixed delay to mimic real round trips, and
+points settings at it. Email goes to Django's locmem backend. Cloudinary is
+only used to build image URLs, which needs a cloud name but no network.
+"""
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cloudinary
+from django.test import override_settings
+
+from store import mckot, paystack
+
+
+def _paystack_reply(method, path, body):
+    if path == '/transaction/initialize':
+        reference = body.get('reference') or uuid.uuid4().hex
+        return {'status': True, 'message': 'Authorization URL created', 'data': {
+            'authorization_url': f'https://checkout.paystack.test/{reference}',
+            'access_code': reference[-10:], 'reference': reference,
+        }}
+    if path.startswith('/transaction/verify/'):
+        reference = path.rsplit('/', 1)[-1]
+        return {'status': True, 'message': 'Verification successful', 'data': {
+            'status': 'success', 'reference': reference, 'amount': 10000, 'currency': 'GHS',
+        }}
+    if path == '/refund':
+        return {'status': True, 'message': 'Refund queued', 'data': {
+            'transaction': {'reference': body.get('transaction')}, 'status': 'pending',
+        }}
+    return None
+
+
+def _mckot_reply(method, path, body):
+    if path == '/deliveries/quote':
+        return {'success': True, 'data': {
+            'quote_id': f'qt_{uuid.uuid4().hex[:12]}', 'delivery_fee': {'amount': '35.00', 'currency': 'GHS'},
+            'distance_km': 8.4, 'duration_minutes': 32,
+            'options': [{'ride_type_id': 1, 'label': 'Motorbike', 'fee': '35.00'}],
+        }}
+    if path == '/deliveries':
+        return {'success': True, 'data': {
+            'id': f'dlv_{uuid.uuid4().hex[:12]}', 'status': 'pending', 'order_ref': body.get('order_ref'),
+        }}
+    if path.startswith('/deliveries/'):
+        return {'success': True, 'data': {'id': path.split('/')[2], 'status': 'in_transit'}}
+    return None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # otherwise keep-alive replies stall ~40ms
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length)) if length else {}
+        service, _, path = self.path.lstrip('/').partition('/')
+        handler = {'paystack': _paystack_reply, 'mckot': _mckot_reply}.get(service)
+        payload = handler(self.command, f'/{path}', body) if handler else None
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.server.calls[service] = self.server.calls.get(service, 0) + 1
+        raw = json.dumps(payload or {'status': False, 'message': 'Not found'}).encode()
+        self.send_response(200 if payload else 404)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    do_GET = do_POST = _reply
+
+
+class FakeServices:
+    """Context manager: start the fake server and route the clients to it."""
+
+    def __init__(self, latency_ms=0):
+        self.latency = latency_ms / 1000
+
+    def __enter__(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self.server.daemon_threads = True
+        self.server.latency = self.latency
+        self.server.calls = {}
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{self.server.server_port}'
+        self.settings = override_settings(
+            PAYSTACK_BASE_URL=f'{url}/paystack',
+            PAYSTACK_SECRET_KEY='sk_test_benchmark',
+            MCKOT_BASE_URL=f'{url}/mckot',
+            MCKOT_MERCHANT_API_KEY='mk_test_benchmark',
+            EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+        )
+        self.settings.enable()
+        if not cloudinary.config().cloud_name:
+            cloudinary.config(cloud_name='benchmark')
+        paystack.reset_session()
+        mckot.reset_session()
+        return self
+
+    @property
+    def calls(self):
+        return dict(self.server.calls)
+
+    def __exit__(self, *exc):
+        self.settings.disable()
+        paystack.reset_session()
+        mckot.reset_session()
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,106 @@
+"""
+Run scenarios, summarise them and compare against a baseline.
+
+A report is {scenario: {requests, errors, p50_ms, p95_ms, p99_ms, rps,
+queries_per_request}} plus a "_meta" entry describing the run.
+"""
+import json
+import math
+import platform
+import time
+from pathlib import Path
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+DEFAULT_BASELINE = Path(__file__).with_name('baseline.json')
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def run_scenario(scenario, ctx, requests, warmup=3):
+    for i in range(warmup):
+        scenario.run(APIClient(), ctx, i)
+
+    timings, queries, errors = [], [], 0
+    started = time.perf_counter()
+    for i in range(warmup, warmup + requests):
+        client = APIClient()
+        with CaptureQueriesContext(connection) as captured:
+            t0 = time.perf_counter()
+            response = scenario.run(client, ctx, i)
+            timings.append((time.perf_counter() - t0) * 1000)
+        queries.append(len(captured))
+        if response.status_code not in scenario.expected_status:
+            errors += 1
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+    return {
+        'requests': requests,
+        'errors': errors,
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'p99_ms': round(percentile(timings, 99), 2),
+        'rps': round(requests / elapsed, 1) if elapsed else 0.0,
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else 0.0,
+    }
+
+
+def run(scenarios, ctx, requests, meta=None, stdout=None):
+    report = {'_meta': {**(meta or {}), 'python': platform.python_version(), 'machine': platform.node()}}
+    for scenario in scenarios:
+        report[scenario.name] = result = run_scenario(scenario, ctx, requests)
+        if stdout is not None:
+            stdout.write(format_row(scenario.name, result))
+    return report
+
+
+def format_row(name, result):
+    return (f"{name:<24} p50 {result['p50_ms']:>8.2f}ms  p95 {result['p95_ms']:>8.2f}ms  "
+            f"p99 {result['p99_ms']:>8.2f}ms  {result['rps']:>7.1f} rps  "
+            f"{result['queries_per_request']:>6.2f} q/req  {result['errors']} errors")
+
+
+def load_baseline(path=DEFAULT_BASELINE):
+    path = Path(path)
+    return json.loads(path.read_text()) if path.exists() else None
+
+
+def save_baseline(report, path=DEFAULT_BASELINE):
+    Path(path).write_text(json.dumps(report, indent=2, sort_keys=True) + '\n')
+
+
+def compare(report, baseline, tolerance=0.25):
+    """
+    Regressions of `report` against `baseline`, as human-readable strings:
+    errors, p95 more than `tolerance` slower, or more queries per request.
+    Query counts are deterministic for a given scale and seed, so any
+    increase counts.
+    """
+    regressions = []
+    for name, result in report.items():
+        if name.startswith('_'):
+            continue
+        if result['errors']:
+            regressions.append(f"{name}: {result['errors']} of {result['requests']} requests failed")
+        base = (baseline or {}).get(name)
+        if not base:
+            continue
+        if result['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {result['p95_ms']:.2f}ms vs baseline {base['p95_ms']:.2f}ms "
+                f"(+{(result['p95_ms'] / base['p95_ms'] - 1) * 100:.0f}%)"
+            )
+        if result['queries_per_request'] > base['queries_per_request']:
+            regressions.append(
+                f"{name}: {result['queries_per_request']} queries/request vs baseline {base['queries_per_request']}"
+            )
+    return regressions
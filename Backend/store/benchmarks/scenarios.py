@@ -0,0 +1,145 @@
+"""
+The hot API paths, as benchmark scenarios.
+
+Each scenario is a function (client, ctx, i) -> response for the i-th
+request; ctx picks its users, products and orders from the seeded data.
+Catalog reads rotate through a few query strings and popular products so the
+response cache sees a realistic mix of hits and misses.
+"""
+from collections import namedtuple
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db.models import Count
+
+from store.models import Order, Product, ProductVariant, ShippingMethod
+
+Scenario = namedtuple('Scenario', 'name run expected_status')
+
+PRODUCT_LIST_QUERIES = [
+    {},
+    {'category__slug': 'wigs'},
+    {'ordering': '-base_price'},
+    {'search': 'body wave'},
+    {'variants__color': '613', 'facets': '1'},
+    {'page': '2', 'page_size': '12'},
+]
+
+
+class Context:
+    """Ids and users the scenarios draw from, prepared once per run."""
+
+    def __init__(self):
+        self.product_ids = list(
+            Product.objects.filter(is_active=True).order_by('-like_count', 'id').values_list('id', flat=True)[:100]
+        )
+        # Checkout must never run out of stock mid-benchmark
+        self.variant_ids = list(
+            ProductVariant.objects.filter(product_id__in=self.product_ids).values_list('id', flat=True)[:50]
+        )
+        ProductVariant.objects.filter(id__in=self.variant_ids).update(stock=10 ** 6)
+        self.shipping_id = ShippingMethod.objects.values_list('id', flat=True).first()
+
+        self.shoppers = list(User.objects.filter(is_staff=False).order_by('id')[:50])
+
+        self.history_user = (
+            User.objects.annotate(order_count=Count('orders')).order_by('-order_count', 'id').first()
+        )
+        self.history_order_ids = list(
+            Order.objects.filter(user=self.history_user).order_by('-created_at').values_list('id', flat=True)[:20]
+        )
+        self.admin = User.objects.create_superuser('benchmark-admin', 'admin@example.com', 'benchmark')
+        self.guest_orders = list(
+            Order.objects.filter(is_guest=True, status='pending', total__gt=Decimal('0'))
+            .values_list('id', 'guest_email')[:50]
+        )
+        # Starting payment holds the order's stock again; keep it there
+        ProductVariant.objects.filter(orderitem__order_id__in=[order_id for order_id, _ in self.guest_orders]).update(
+            stock=10 ** 6
+        )
+
+    def shopper(self, i):
+        return self.shoppers[i % len(self.shoppers)]
+
+    def variant(self, i, offset=0):
+        return self.variant_ids[(i + offset) % len(self.variant_ids)]
+
+
+def product_list(client, ctx, i):
+    return client.get('/api/products/', PRODUCT_LIST_QUERIES[i % len(PRODUCT_LIST_QUERIES)])
+
+
+def product_list_signed_in(client, ctx, i):
+    client.force_authenticate(ctx.shopper(i))
+    return client.get('/api/products/', PRODUCT_LIST_QUERIES[i % len(PRODUCT_LIST_QUERIES)])
+
+
+def product_detail(client, ctx, i):
+    return client.get(f'/api/products/{ctx.product_ids[i % len(ctx.product_ids)]}/')
+
+
+def category_tree(client, ctx, i):
+    return client.get('/api/categories/')
+
+
+def cart_update(client, ctx, i):
+    client.force_authenticate(ctx.shopper(i))
+    items = [{'variant_id': ctx.variant(i), 'quantity': 1}, {'variant_id': ctx.variant(i, 7), 'quantity': 2}]
+    return client.post('/api/cart/', {'items': items}, format='json')
+
+
+def cart_set_quantity(client, ctx, i):
+    client.force_authenticate(ctx.shopper(i))
+    return client.patch('/api/cart/items/', {'variant_id': ctx.variant(i), 'quantity': 1 + i % 3}, format='json')
+
+
+def checkout(client, ctx, i):
+    return client.post('/api/checkout/', {
+        'guest_email': f'bench{i}@example.com',
+        'guest_name': 'Bench Shopper',
+        'guest_address': {'full_name': 'Bench Shopper', 'phone_number': '0244000000',
+                          'address_line': '12 Oxford Street', 'city': 'Accra', 'region': 'Greater Accra'},
+        'shipping_method_id': ctx.shipping_id,
+        'cart_items': [{'variant_id': ctx.variant(i), 'quantity': 1}, {'variant_id': ctx.variant(i, 3), 'quantity': 1}],
+    }, format='json')
+
+
+def order_history(client, ctx, i):
+    client.force_authenticate(ctx.history_user)
+    return client.get('/api/orders/history/')
+
+
+def order_detail(client, ctx, i):
+    client.force_authenticate(ctx.history_user)
+    return client.get(f'/api/orders/{ctx.history_order_ids[i % len(ctx.history_order_ids)]}/')
+
+
+def sales_analytics(client, ctx, i):
+    client.force_authenticate(ctx.admin)
+    return client.get('/api/analytics/sales/', {'days': (7, 30, 90)[i % 3]})
+
+
+def paystack_initialize(client, ctx, i):
+    order_id, email = ctx.guest_orders[i % len(ctx.guest_orders)]
+    return client.post(f'/api/paystack/initiate/{order_id}/', {'guest_email': email}, format='json')
+
+
+def delivery_quote(client, ctx, i):
+    # Neighbouring drop-offs share a cached quote; every 4th is a new area
+    return client.post('/api/delivery/quote/', {'lat': 5.6 + (i // 4) * 0.01, 'lng': -0.18}, format='json')
+
+
+SCENARIOS = [
+    Scenario('product_list', product_list, {200}),
+    Scenario('product_list_signed_in', product_list_signed_in, {200}),
+    Scenario('product_detail', product_detail, {200}),
+    Scenario('category_tree', category_tree, {200}),
+    Scenario('cart_update', cart_update, {201}),
+    Scenario('cart_set_quantity', cart_set_quantity, {200}),
+    Scenario('checkout', checkout, {201}),
+    Scenario('order_history', order_history, {200}),
+    Scenario('order_detail', order_detail, {200}),
+    Scenario('sales_analytics', sales_analytics, {200}),
+    Scenario('paystack_initialize', paystack_initialize, {200}),
+    Scenario('delivery_quote', delivery_quote, {200}),
+]
@@ -0,0 +1,215 @@
+"""
+Two-tier cache backend, configured as CACHES["default"] in settings.
+
+    L1  this process's LocMem ("local" alias), entries kept CACHE_L1_TIMEOUT
+        seconds at most, so hot keys skip the network entirely
+    L2  the shared cache ("shared" alias): Redis when REDIS_URL is set,
+        otherwise a file-based or LocMem stand-in
+
+Reads try L1, then L2 (refilling L1 on a hit); writes and deletes go to
+both. A write in one worker is therefore seen at once by that worker and by
+the others within CACHE_L1_TIMEOUT. Version tokens from store/caching.py
+follow the same rule, so a bump reaches every worker within that window.
+Counters (incr/decr) live in L2 only.
+
+If L2 is unreachable, reads count as misses and writes fall back to L1 alone,
+so an outage of the shared cache degrades to per-process caching rather than
+failing requests.
+
+get_or_set() adds stampede protection: on a miss one caller (per key, across
+all workers) computes the value under a short L2 lock while the others wait
+for it to appear. Unlike Django's default, a computed None is not stored.
+
+Hit/miss counters per key namespace (the first two ":"-separated parts of the
+key, e.g. "store:products" or "mckot:quote") are available from get_stats().
+Each worker process keeps its own.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.functional import cached_property
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+# --- Metrics ---------------------------------------------------------------
+
+_stats_lock = threading.Lock()
+_stats = defaultdict(lambda: {"l1_hits": 0, "l2_hits": 0, "misses": 0, "sets": 0,
+                              "stampede_waits": 0, "l2_errors": 0})
+
+
+def namespace(key):
+    return ":".join(str(key).split(":")[:2])
+
+
+def _record(key, counter):
+    with _stats_lock:
+        _stats[namespace(key)][counter] += 1
+
+
+def get_stats():
+    """{namespace: {l1_hits, l2_hits, misses, sets, stampede_waits, l2_errors, hit_rate}}"""
+    with _stats_lock:
+        stats = {ns: dict(counters) for ns, counters in _stats.items()}
+    for counters in stats.values():
+        reads = counters["l1_hits"] + counters["l2_hits"] + counters["misses"]
+        counters["hit_rate"] = round((reads - counters["misses"]) / reads, 3) if reads else 0.0
+    return stats
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+# --- Backend ---------------------------------------------------------------
+
+class TieredCache(BaseCache):
+    """
+    OPTIONS:
+        L1            alias of the process-local cache (default "local")
+        L2            alias of the shared cache (default "shared")
+        L1_TIMEOUT    max seconds an entry stays in L1 (default 5)
+        LOCK_TIMEOUT  seconds get_or_set waits on another worker (default 10)
+    """
+
+    def __init__(self, location, params):
+        options = dict(params.get("OPTIONS") or {})
+        self._l1_alias = options.pop("L1", "local")
+        self._l2_alias = options.pop("L2", "shared")
+        self.l1_timeout = options.pop("L1_TIMEOUT", 5)
+        self.lock_timeout = options.pop("LOCK_TIMEOUT", 10)
+        super().__init__({**params, "OPTIONS": options})
+
+    @cached_property
+    def l1(self):
+        return caches[self._l1_alias]
+
+    @cached_property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _l1_timeout(self, timeout):
+        timeout = self._timeout(timeout)
+        return self.l1_timeout if timeout is None else min(timeout, self.l1_timeout)
+
+    def _l2(self, key, method, *args, fallback=None, **kwargs):
+        try:
+            return getattr(self.l2, method)(*args, **kwargs)
+        except Exception as e:
+            _record(key, "l2_errors")
+            logger.warning("Shared cache %s(%s) failed: %s", method, key, e)
+            return fallback
+
+    def get(self, key, default=None, version=None):
+        value = self.l1.get(key, _MISSING, version=version)
+        if value is not _MISSING:
+            _record(key, "l1_hits")
+            return value
+        value = self._l2(key, "get", key, _MISSING, version=version, fallback=_MISSING)
+        if value is _MISSING:
+            _record(key, "misses")
+            return default
+        _record(key, "l2_hits")
+        self.l1.set(key, value, self.l1_timeout, version=version)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        _record(key, "sets")
+        self._l2(key, "set", key, value, self._timeout(timeout), version=version)
+        self.l1.set(key, value, self._l1_timeout(timeout), version=version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self._l2(key, "add", key, value, self._timeout(timeout), version=version, fallback=_MISSING)
+        if added is _MISSING:
+            return self.l1.add(key, value, self._l1_timeout(timeout), version=version)
+        if added:
+            _record(key, "sets")
+            self.l1.set(key, value, self._l1_timeout(timeout), version=version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l1.touch(key, self._l1_timeout(timeout), version=version)
+        return self._l2(key, "touch", key, self._timeout(timeout), version=version, fallback=False)
+
+    def delete(self, key, version=None):
+        deleted = self.l1.delete(key, version=version)
+        return self._l2(key, "delete", key, version=version, fallback=False) or deleted
+
+    def has_key(self, key, version=None):
+        return self.l1.has_key(key, version=version) or \
+            self._l2(key, "has_key", key, version=version, fallback=False)
+
+    def incr(self, key, delta=1, version=None):
+        # Counters must be shared to mean anything; no L1 copy, no fallback
+        self.l1.delete(key, version=version)
+        return self.l2.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        self.l1.delete(key, version=version)
+        return self.l2.decr(key, delta, version=version)
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        value = self.get(key, _MISSING, version=version)
+        if value is not _MISSING:
+            return value
+        if not callable(default):
+            self.add(key, default, timeout, version=version)
+            return self.get(key, default, version=version)
+
+        lock_key = f"{key}:lock"
+        if self._l2(key, "add", lock_key, 1, self.lock_timeout, version=version, fallback=True):
+            try:
+                return self._compute(key, default, timeout, version)
+            finally:
+                self._l2(key, "delete", lock_key, version=version)
+
+        # Another worker holds the lock: wait for its value instead of piling on
+        _record(key, "stampede_waits")
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            value = self._l2(key, "get", key, _MISSING, version=version, fallback=_MISSING)
+            if value is not _MISSING:
+                self.l1.set(key, value, self._l1_timeout(timeout), version=version)
+                return value
+            if not self._l2(key, "has_key", lock_key, version=version, fallback=False):
+                break
+        return self._compute(key, default, timeout, version)
+
+    def _compute(self, key, default, timeout, version):
+        value = default()
+        if value is not None:
+            self.set(key, value, timeout, version=version)
+        return value
+
+    def get_many(self, keys, version=None):
+        return {key: value for key in keys
+                if (value := self.get(key, _MISSING, version=version)) is not _MISSING}
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        for key, value in data.items():
+            self.set(key, value, timeout, version=version)
+        return []
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.delete(key, version=version)
+
+    def clear(self):
+        self.l1.clear()
+        self._l2("*", "clear")
+
+    def close(self, **kwargs):
+        # The tiers are connections of their own and are closed with them
+        pass
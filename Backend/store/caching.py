@@ -0,0 +1,223 @@
+"""
+Response caching for the public catalog endpoints.
+
+Each cached resource ("products", "categories", ...) has a version token
+stored in the cache. Keys embed the current token, so bumping it from a model
+signal orphans every cached entry for that resource at once without having to
+know their keys.
+
+Changes that touch a few objects, such as stock moving on every checkout,
+bump those objects' own tokens instead (bump_objects). An entry remembers the
+tokens of the objects in its payload and is rebuilt when one has moved, so
+the rest of the catalog stays cached.
+
+ResponseCacheMixin serves anonymous GETs on a viewset from that cache as
+ready-rendered JSON with a strong ETag, Last-Modified, 304 revalidation and
+Cache-Control headers a CDN can honour. Authenticated responses (which carry
+per-user fields such as is_liked) bypass it and are marked private.
+"""
+import hashlib
+import time
+import uuid
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework.renderers import JSONRenderer
+
+
+def _version_key(resource):
+    return f"store:version:{resource}"
+
+
+def _new_version():
+    return uuid.uuid4().hex[:12]
+
+
+def get_version(resource):
+    version = cache.get(_version_key(resource))
+    if version is None:
+        version = _new_version()
+        # add() so concurrent first readers agree on one token
+        if not cache.add(_version_key(resource), version, None):
+            version = cache.get(_version_key(resource), version)
+    return version
+
+
+def bump_version(resource):
+    """
+    Invalidate everything cached for `resource`: now, and again once the
+    transaction commits so nothing read mid-transaction outlives it.
+    """
+    def bump():
+        cache.set(_version_key(resource), _new_version(), None)
+    bump()
+    transaction.on_commit(bump, robust=True)
+
+
+def _object_version_key(resource, pk):
+    return f"store:version:{resource}:{pk}"
+
+
+def object_versions(resource, pks):
+    """{pk: version token} for objects of `resource`, creating missing tokens."""
+    keys = {_object_version_key(resource, pk): pk for pk in pks}
+    found = cache.get_many(list(keys))
+    versions = {keys[key]: version for key, version in found.items()}
+    for key, pk in keys.items():
+        if key not in found:
+            version = _new_version()
+            versions[pk] = version if cache.add(key, version, None) else cache.get(key, version)
+    return versions
+
+
+def bump_objects(resource, pks):
+    """
+    Invalidate cached entries whose payload includes one of these objects of
+    `resource` (see ResponseCacheMixin.cache_object_resource), now and on commit.
+    """
+    keys = [_object_version_key(resource, pk) for pk in set(pks)]
+    if not keys:
+        return
+
+    def bump():
+        cache.set_many({key: _new_version() for key in keys}, None)
+    bump()
+    transaction.on_commit(bump, robust=True)
+
+
+def versioned_key(resource, *parts):
+    suffix = ":".join(str(p) for p in parts)
+    return f"store:{resource}:{get_version(resource)}:{suffix}"
+
+
+def payload_items(data):
+    """The objects in a list (paginated or not) or detail response body."""
+    if isinstance(data, dict) and "results" in data:
+        data = data["results"]
+    if isinstance(data, dict):
+        data = [data]
+    return [item for item in data if isinstance(item, dict)]
+
+
+def make_entry(body):
+    """Cache entry for a JSON body: the bytes, a strong ETag and when it was built."""
+    return {
+        "body": body,
+        "etag": quote_etag(hashlib.sha1(body).hexdigest()),
+        "last_modified": int(time.time()),
+    }
+
+
+def _not_modified(request, entry):
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match:
+        # Weak comparison, as RFC 9110 requires for If-None-Match
+        client_etags = [etag.removeprefix("W/") for etag in parse_etags(if_none_match)]
+        return entry["etag"] in client_etags or "*" in client_etags
+    since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+    return since is not None and entry["last_modified"] <= since
+
+
+def entry_response(request, entry, max_age=0):
+    """Serve a cached entry, or 304 Not Modified if the client already has it."""
+    if _not_modified(request, entry):
+        response = HttpResponse(status=304)
+    else:
+        response = HttpResponse(entry["body"], content_type="application/json")
+    response["ETag"] = entry["etag"]
+    response["Last-Modified"] = http_date(entry["last_modified"])
+    patch_cache_control(
+        response, public=True, max_age=max_age,
+        stale_while_revalidate=getattr(settings, "API_CACHE_STALE_WHILE_REVALIDATE", 30),
+    )
+    patch_vary_headers(response, ("Authorization", "Accept"))
+    return response
+
+
+class ResponseCacheMixin:
+    """
+    Cache list/retrieve responses for anonymous GETs (see module docstring).
+
+    cache_resource:         version namespace, bumped in store/signals.py
+    cache_all_users:        also serve authenticated users from the cache, for
+                            payloads with no per-user fields
+    cache_object_resource:  per-object version namespace; entries are rebuilt
+                            when an object in cached_object_ids() is bumped
+    """
+    cache_resource = None
+    cache_all_users = False
+    cache_object_resource = None
+
+    def cached_object_ids(self, data):
+        """Ids of the cache_object_resource objects in a response body."""
+        return [item["id"] for item in payload_items(data) if "id" in item]
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, self.uncached_list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, self.uncached_retrieve, *args, **kwargs)
+
+    # Override these (not list/retrieve) to customise what gets cached
+    def uncached_list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    def uncached_retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    def _is_cacheable(self, request):
+        return (
+            getattr(settings, "API_CACHE_ENABLED", True)
+            and request.method in ("GET", "HEAD")
+            and (self.cache_all_users or not request.user.is_authenticated)
+            and getattr(request.accepted_renderer, "format", None) == "json"
+        )
+
+    def _cache_key(self, request):
+        # Sorted so ?a=1&b=2 and ?b=2&a=1 share an entry; hashed to bound length
+        query = urlencode(sorted((k, v) for k, values in request.GET.lists() for v in values))
+        digest = hashlib.sha1(f"{request.path}?{query}".encode()).hexdigest()
+        return versioned_key(self.cache_resource, digest)
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        if not self._is_cacheable(request):
+            response = handler(request, *args, **kwargs)
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ("Authorization",))
+            return response
+
+        def build():
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                raise _Uncacheable(response)
+            entry = make_entry(JSONRenderer().render(response.data))
+            if self.cache_object_resource:
+                entry["objects"] = object_versions(self.cache_object_resource, self.cached_object_ids(response.data))
+            return entry
+
+        # get_or_set on the tiered cache lets one worker build a cold entry
+        # while concurrent requests for it wait (see store/cache_backends.py)
+        key = self._cache_key(request)
+        timeout = getattr(settings, "API_CACHE_TIMEOUT", 300)
+        try:
+            entry = cache.get_or_set(key, build, timeout)
+            objects = entry.get("objects")
+            if objects and object_versions(self.cache_object_resource, objects) != objects:
+                cache.delete(key)  # one of its objects changed since it was built
+                entry = cache.get_or_set(key, build, timeout)
+        except _Uncacheable as e:
+            return e.response
+        return entry_response(request, entry, max_age=getattr(settings, "API_CACHE_MAX_AGE", 30))
+
+
+class _Uncacheable(Exception):
+    """Carries a non-200 response out of get_or_set without caching it."""
+
+    def __init__(self, response):
+        self.response = response
@@ -0,0 +1,168 @@
+"""
+Cart writes as set-based diffs.
+
+sync_items() makes a cart hold exactly the given {variant_id: quantity}:
+it reads the current lines once and applies the difference with at most one
+DELETE, one bulk_update and one bulk_create, however many lines the cart
+has. set_quantity() is the single-line version for a quantity tap, and
+cart_total() prices a cart with one aggregate query.
+
+Both writers first touch the cart row's updated_at, which also locks it, so
+two tabs syncing the same cart apply one after the other instead of racing
+on the (cart, variant) unique constraint.
+
+Guest carts are ordinary Cart rows with no user. The client holds them as a
+signed token (`guest_token()`), sent back in the X-Cart-Token header; the
+signature carries its issue time, so a token stops working GUEST_CART_TTL_DAYS
+after it was last handed out, and every write hands out a fresh one. Guest
+carts untouched for that long are deleted by purge_guest_carts(). On login
+the guest cart is folded into the user's own with merge_guest_cart().
+"""
+import secrets
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+from django.db.models import DecimalField, F, Prefetch, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Cart, CartItem
+
+_MONEY = DecimalField(max_digits=12, decimal_places=2)
+_GUEST_TOKEN_SALT = 'store.carts.guest'
+GUEST_TOKEN_HEADER = 'HTTP_X_CART_TOKEN'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def guest_cart_ttl():
+    return timedelta(days=_setting('GUEST_CART_TTL_DAYS', 30))
+
+
+def quantities(items):
+    """
+    [{'variant_id': .., 'quantity': ..}, ...] -> {variant_id: quantity}.
+    A later line for the same variant wins; zero quantities are dropped.
+    """
+    result = {}
+    for item in items:
+        result[item['variant_id']] = item['quantity']
+    return {variant_id: quantity for variant_id, quantity in result.items() if quantity > 0}
+
+
+def items_prefetch():
+    """Prefetch for a cart's lines with their variants, as CartSerializer renders them."""
+    return Prefetch('items', queryset=CartItem.objects.select_related('variant').order_by('id'))
+
+
+def _touch(cart):
+    """Bump updated_at; the UPDATE also holds the cart row lock until commit."""
+    cart.updated_at = timezone.now()
+    Cart.objects.filter(pk=cart.pk).update(updated_at=cart.updated_at)
+
+
+@transaction.atomic
+def sync_items(cart, wanted):
+    """Make `cart` hold exactly `wanted` ({variant_id: quantity}). Returns the change counts."""
+    _touch(cart)
+    current = {item.variant_id: item for item in CartItem.objects.filter(cart=cart).only('id', 'variant_id', 'quantity')}
+
+    stale = [item.pk for variant_id, item in current.items() if variant_id not in wanted]
+    changed = []
+    for variant_id, quantity in wanted.items():
+        item = current.get(variant_id)
+        if item is not None and item.quantity != quantity:
+            item.quantity = quantity
+            changed.append(item)
+    new = [CartItem(cart=cart, variant_id=variant_id, quantity=quantity)
+           for variant_id, quantity in wanted.items() if variant_id not in current]
+
+    if stale:
+        CartItem.objects.filter(pk__in=stale).delete()
+    if changed:
+        CartItem.objects.bulk_update(changed, ['quantity'])
+    if new:
+        CartItem.objects.bulk_create(new)
+    return {'created': len(new), 'updated': len(changed), 'deleted': len(stale)}
+
+
+@transaction.atomic
+def set_quantity(cart, variant_id, quantity):
+    """Set one line of `cart`; a quantity of 0 removes it. Returns the CartItem or None."""
+    _touch(cart)
+    if quantity <= 0:
+        CartItem.objects.filter(cart=cart, variant_id=variant_id).delete()
+        return None
+    item, _ = CartItem.objects.update_or_create(cart=cart, variant_id=variant_id, defaults={'quantity': quantity})
+    return item
+
+
+def cart_total(cart):
+    """Sum of quantity * variant price over the cart's lines, from one query."""
+    return CartItem.objects.filter(cart=cart).aggregate(
+        total=Coalesce(Sum(F('quantity') * F('variant__price'), output_field=_MONEY), Decimal('0'), output_field=_MONEY)
+    )['total']
+
+
+# --- Guest carts ------------------------------------------------------------
+
+def create_guest_cart():
+    return Cart.objects.create(guest_key=secrets.token_urlsafe(24))
+
+
+def guest_token(cart):
+    return signing.TimestampSigner(salt=_GUEST_TOKEN_SALT).sign(cart.guest_key)
+
+
+def guest_cart_from_token(token):
+    """The guest cart a token names, or None if it is forged, expired or gone."""
+    if not token:
+        return None
+    try:
+        key = signing.TimestampSigner(salt=_GUEST_TOKEN_SALT).unsign(token, max_age=guest_cart_ttl())
+    except signing.BadSignature:  # includes SignatureExpired
+        return None
+    return Cart.objects.filter(guest_key=key, user__isnull=True).first()
+
+
+def request_guest_cart(request):
+    """The guest cart named by the request's X-Cart-Token header or cart_token field."""
+    token = request.META.get(GUEST_TOKEN_HEADER)
+    if not token and isinstance(request.data, dict):
+        token = request.data.get('cart_token')
+    return guest_cart_from_token(token)
+
+
+@transaction.atomic
+def merge_guest_cart(guest, user):
+    """
+    Fold `guest` into `user`'s cart and delete it. A variant in both keeps
+    the larger quantity. Reads both carts in one query and applies the result
+    with sync_items' bulk writes. Returns the user's cart.
+    """
+    cart, _ = Cart.objects.get_or_create(user=user)
+    merged = {}
+    for variant_id, quantity in CartItem.objects.filter(cart__in=[cart, guest]).values_list('variant_id', 'quantity'):
+        merged[variant_id] = max(merged.get(variant_id, 0), quantity)
+    sync_items(cart, merged)
+    guest.delete()
+    return cart
+
+
+def purge_guest_carts(batch_size=1000):
+    """Delete guest carts idle for longer than the TTL, in batches. Returns the count."""
+    cutoff = timezone.now() - guest_cart_ttl()
+    purged = 0
+    while True:
+        ids = list(
+            Cart.objects.filter(user__isnull=True, updated_at__lt=cutoff).values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return purged
+        Cart.objects.filter(id__in=ids).delete()  # items go with them
+        purged += len(ids)
@@ -0,0 +1,111 @@
+"""
+Database connection settings: system checks and the startup self-check.
+
+settings.DATABASES keeps connections open for DB_CONN_MAX_AGE seconds and
+health-checks them before reuse, so a request no longer pays for a fresh
+TCP + TLS + auth handshake with the hosted Postgres. DB_POOLER=pgbouncer
+adapts the connection for a transaction-pooling PgBouncer (or a hosted
+pooler in that mode): server-side cursors are disabled, since the cursor and
+its transaction may land on different server connections.
+
+log_database_settings() is called from backend/wsgi.py when the app loads;
+it logs the effective settings, then times one connection on the first
+request each worker serves.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.checks import Warning, register
+from django.core.signals import request_started
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+POOLER_MODES = ('', 'pgbouncer')
+
+
+def describe(db):
+    """The connection-reuse settings of one DATABASES entry, for logs and checks."""
+    return {
+        'engine': db.get('ENGINE', '').rsplit('.', 1)[-1],
+        'host': db.get('HOST') or 'local',
+        'conn_max_age': db.get('CONN_MAX_AGE', 0),
+        'health_checks': db.get('CONN_HEALTH_CHECKS', False),
+        'server_side_cursors': not db.get('DISABLE_SERVER_SIDE_CURSORS', False),
+        'pooler': getattr(settings, 'DB_POOLER', '') or 'none',
+    }
+
+
+def check_database_settings(db, pooler=''):
+    """Warnings for one DATABASES entry (see register_checks)."""
+    warnings = []
+    if pooler not in POOLER_MODES:
+        warnings.append(Warning(
+            f"DB_POOLER={pooler!r} is not recognised; expected one of {POOLER_MODES}.",
+            id='store.W001',
+        ))
+    conn_max_age = db.get('CONN_MAX_AGE', 0)
+    if (conn_max_age is None or conn_max_age > 0) and not db.get('CONN_HEALTH_CHECKS', False):
+        warnings.append(Warning(
+            "Persistent connections are enabled without health checks.",
+            hint="Set DB_CONN_HEALTH_CHECKS=True so a connection dropped by the "
+                 "server is replaced instead of failing the next request.",
+            id='store.W002',
+        ))
+    if pooler == 'pgbouncer' and not db.get('DISABLE_SERVER_SIDE_CURSORS', False):
+        warnings.append(Warning(
+            "Server-side cursors are enabled behind a transaction-pooling PgBouncer.",
+            hint="Set DISABLE_SERVER_SIDE_CURSORS; .iterator() cursors break "
+                 "when PgBouncer moves the transaction to another connection.",
+            id='store.W003',
+        ))
+    return warnings
+
+
+@register()
+def database_settings_check(app_configs, **kwargs):
+    return check_database_settings(settings.DATABASES['default'], getattr(settings, 'DB_POOLER', ''))
+
+
+def log_database_settings(alias='default'):
+    """Log the effective connection settings, without connecting.
+
+    Runs at import time in backend/wsgi.py, possibly in a gunicorn --preload
+    master, so the connection check waits for the first request each worker
+    serves; a connection opened before the fork would be shared by workers.
+    """
+    info = describe(settings.DATABASES[alias])
+    summary = " ".join(f"{k}={v}" for k, v in info.items())
+    logger.info("Database %s: %s", alias, summary)
+
+    def on_first_request(sender, **kwargs):
+        request_started.disconnect(dispatch_uid=uid)
+        check_database_connection(alias)
+
+    uid = f'store.db.check_connection.{alias}'
+    request_started.connect(on_first_request, weak=False, dispatch_uid=uid)
+
+
+def check_database_connection(alias='default'):
+    """Time one connection and check the server settings the pooler relies on."""
+    connection = connections[alias]
+    try:
+        start = time.monotonic()
+        connection.ensure_connection()
+        elapsed_ms = (time.monotonic() - start) * 1000
+    except Exception as e:
+        logger.error("Database %s unreachable: %s", alias, e)
+        return
+    logger.info("Database %s connect_ms=%.1f", alias, elapsed_ms)
+    if getattr(settings, 'DB_POOLER', '') == 'pgbouncer' and connection.vendor == 'postgresql':
+        # Per-connection SETs don't survive transaction pooling; Django only
+        # issues SET TIME ZONE when the server default differs from UTC
+        with connection.cursor() as cursor:
+            cursor.execute("SHOW TIME ZONE")
+            server_tz = cursor.fetchone()[0]
+        if settings.USE_TZ and server_tz.upper() not in ('UTC', 'ETC/UTC'):
+            logger.warning(
+                "Database %s time zone is %s behind PgBouncer; set it to UTC "
+                "so Django needs no per-session SET TIME ZONE.", alias, server_tz,
+            )
@@ -1,13 +1,17 @@
 """
 Email utility functions for sending notifications
 """
+import logging
+
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
 from django.utils.html import strip_tags
 
+from .instrumentation import log_event, timed
+
 
-def send_password_reset_email(user, reset_token):
+def send_password_reset_email(user, reset_token, fail_silently=True):
     """
     Send password reset email to user
     """
@@ -69,21 +73,24 @@ def send_password_reset_email(user, reset_token):
     """
     
     try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
+        with timed("smtp"):
+            send_mail(
+                subject=subject,
+                message=message,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                recipient_list=[user.email],
+                html_message=html_message,
+                fail_silently=False,
+            )
         return True
     except Exception as e:
-        print(f"Error sending password reset email: {e}")
+        if not fail_silently:
+            raise
+        log_event("email.password_reset_failed", logging.ERROR, user_id=user.pk, error=str(e))
         return False
 
 
-def send_order_confirmation_email(order):
+def send_order_confirmation_email(order, fail_silently=True):
     """
     Send order confirmation email to customer (supports both authenticated and guest orders)
     """
@@ -92,7 +99,7 @@ def send_order_confirmation_email(order):
     customer_name = order.guest_name if order.is_guest else (order.user.username if order.user else "Customer")
     
     if not recipient_email:
-        print(f"Warning: No email found for order #{order.id}")
+        log_event("email.no_recipient", logging.WARNING, order_id=order.id)
         return False
     
     subject = f"Order Confirmation - Order #{order.id}"
@@ -238,21 +245,24 @@ def send_order_confirmation_email(order):
     """
     
     try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
+        with timed("smtp"):
+            send_mail(
+                subject=subject,
+                message=message,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                recipient_list=[recipient_email],
+                html_message=html_message,
+                fail_silently=False,
+            )
         return True
     except Exception as e:
-        print(f"Error sending order confirmation email: {e}")
+        if not fail_silently:
+            raise
+        log_event("email.order_confirmation_failed", logging.ERROR, order_id=order.id, error=str(e))
         return False
 
 
-def send_order_status_update_email(order):
+def send_order_status_update_email(order, fail_silently=True):
     """
     Send order status update email to customer (supports both authenticated and guest orders)
     """
@@ -261,7 +271,7 @@ def send_order_status_update_email(order):
     customer_name = order.guest_name if order.is_guest else (order.user.username if order.user else "Customer")
     
     if not recipient_email:
-        print(f"Warning: No email found for order #{order.id}")
+        log_event("email.no_recipient", logging.WARNING, order_id=order.id)
         return False
     
     status_messages = {
@@ -328,16 +338,19 @@ def send_order_status_update_email(order):
     """
     
     try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
+        with timed("smtp"):
+            send_mail(
+                subject=subject,
+                message=message,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                recipient_list=[recipient_email],
+                html_message=html_message,
+                fail_silently=False,
+            )
         return True
     except Exception as e:
-        print(f"Error sending order status update email: {e}")
+        if not fail_silently:
+            raise
+        log_event("email.order_status_failed", logging.ERROR, order_id=order.id, error=str(e))
         return False
 
@@ -0,0 +1,134 @@
+"""
+Catalog filters for ProductViewSet.
+
+    /api/products/?variants__color=613&variants__color=1B&variants__length=28"
+                  &min_price=100&max_price=400&category__slug=wigs&facets=1
+
+Repeated values of one facet are ORed. Different facets and the price range
+are ANDed and must hold on the *same* variant, so "613, 28 inch" won't match
+a product whose 613 variant only comes in 20 inch.
+
+With ?facets=1 the response also carries per-facet product counts, computed
+in a single UNION ALL query. Each facet is counted with every other active
+filter applied but not its own, so the shopper can still see (and widen to)
+the sibling values.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import CharField, Count, Exists, F, Max, Min, OuterRef, Q, Value
+from django.db.models.functions import Cast
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Category, ProductVariant
+
+VARIANT_FACETS = ('length', 'color', 'texture', 'lace_type', 'density', 'wig_size', 'bundle_deal')
+FACET_PARAM_PREFIX = 'variants__'
+PRICE_PARAMS = ('min_price', 'max_price')
+
+
+def _decimal(value):
+    try:
+        return Decimal(value) if value not in (None, '') else None
+    except InvalidOperation:
+        return None
+
+
+def variant_filters(params):
+    """{facet: Q} for every variant facet or price bound present in `params`."""
+    filters = {}
+    for facet in VARIANT_FACETS:
+        values = [v for v in params.getlist(FACET_PARAM_PREFIX + facet) if v != '']
+        if facet == 'bundle_deal':
+            values = [int(v) for v in values if v.isdigit()]
+        if values:
+            filters[facet] = Q(**{f'{facet}__in': values})
+    min_price, max_price = (_decimal(params.get(p)) for p in PRICE_PARAMS)
+    price = Q()
+    if min_price is not None:
+        price &= Q(price__gte=min_price)
+    if max_price is not None:
+        price &= Q(price__lte=max_price)
+    if price:
+        filters['price'] = price
+    return filters
+
+
+def _combine(filters, skip=None):
+    q = Q()
+    for facet, condition in filters.items():
+        if facet != skip:
+            q &= condition
+    return q
+
+
+def matching_variants(filters, skip=None):
+    return ProductVariant.objects.filter(_combine(filters, skip))
+
+
+class ProductFacetFilter(BaseFilterBackend):
+    """Variant facet and price-range filtering (see module docstring)."""
+
+    def filter_queryset(self, request, queryset, view):
+        filters = variant_filters(request.query_params)
+        if not filters:
+            return queryset
+        return queryset.filter(Exists(matching_variants(filters).filter(product=OuterRef('pk'))))
+
+
+class CategorySlugFilter(BaseFilterBackend):
+    """?category__slug=<slug> (repeatable); a parent slug includes its subcategories."""
+
+    def filter_queryset(self, request, queryset, view):
+        slugs = [s for s in request.query_params.getlist('category__slug') if s]
+        if not slugs:
+            return queryset
+        categories = Category.objects.filter(Q(slug__in=slugs) | Q(parent__slug__in=slugs)).values('pk')
+        return queryset.filter(category__in=categories)
+
+
+def facet_counts(products, params):
+    """
+    Product counts per value of every variant facet, plus the price range,
+    for `products` (the catalog after all non-facet filters) narrowed by the
+    facet filters in `params`.
+
+    Returns {"color": [{"value": "613", "count": 4}, ...], ...,
+             "price": {"min": "120.00", "max": "480.00"}}
+    """
+    filters = variant_filters(params)
+    product_ids = products.order_by().values('pk')
+
+    branches = []
+    for facet in VARIANT_FACETS:
+        branches.append(
+            matching_variants(filters, skip=facet)
+            .filter(product__in=product_ids)
+            .exclude(**{f'{facet}__isnull': True})
+            .values(value=Cast(F(facet), CharField()))
+            .annotate(facet=Value(facet, output_field=CharField()), count=Count('product', distinct=True))
+            .exclude(value='')
+            .order_by()
+        )
+    for facet, aggregate in (('price_min', Min), ('price_max', Max)):
+        branches.append(
+            matching_variants(filters, skip='price')
+            .filter(product__in=product_ids)
+            .annotate(facet=Value(facet, output_field=CharField()))
+            .values('facet')
+            .annotate(value=Cast(aggregate('price'), CharField()), count=Count('product', distinct=True))
+            .values('value', 'facet', 'count')
+            .order_by()
+        )
+
+    facets = {facet: [] for facet in VARIANT_FACETS}
+    price = {'min': None, 'max': None}
+    for row in branches[0].union(*branches[1:], all=True):
+        if row['facet'] in ('price_min', 'price_max'):
+            if row['value'] is not None:
+                price[row['facet'][len('price_'):]] = str(Decimal(row['value']).quantize(Decimal('0.01')))
+        else:
+            facets[row['facet']].append({'value': row['value'], 'count': row['count']})
+    for values in facets.values():
+        values.sort(key=lambda v: (-v['count'], v['value']))
+    facets['price'] = price
+    return facets
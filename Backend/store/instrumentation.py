@@ -0,0 +1,202 @@
+"""
+Per-request instrumentation and structured events.
+
+RequestMetricsMiddleware records, for every request:
+
+    - DB queries and total SQL time (via connection.execute_wrapper)
+    - repeated query signatures, i.e. the same SQL with different
+      parameters run DUPLICATE_QUERY_THRESHOLD+ times: usually an N+1
+    - time spent in outbound calls, by service: paystack, mckot,
+      cloudinary, smtp (wrap a call in `timed("<service>")` to add one)
+
+and reports them as a `Server-Timing` response header (readable in the
+browser's network panel) and, when the "store.instrumentation" logger is at
+INFO, one JSON log line for REQUEST_LOG_SAMPLE_RATE of requests:
+
+    {"event": "request", "method": "GET", "path": "/api/orders/", "status": 200,
+     "duration_ms": 84.2, "queries": 31, "sql_ms": 40.1,
+     "duplicates": [{"sql": "SELECT ... WHERE order_id = %s", "count": 24}],
+     "external_ms": {"paystack": 0.0, ...}}
+
+Requests slower than SLOW_REQUEST_MS are also logged as a "slow_request"
+warning with the most expensive SQL, for SLOW_REQUEST_SAMPLE_RATE of them.
+
+log_event() writes application events to the same logger in the same shape,
+tagged with the current request's method and path.
+"""
+import functools
+import json
+import logging
+import random
+import re
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('store_request_metrics', default=None)
+
+_IN_LIST_RE = re.compile(r' IN \((?:%s, )*%s\)')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def query_signature(sql):
+    """SQL with parameter lists collapsed, so `IN (%s, %s)` and `IN (%s)` match."""
+    return _WHITESPACE_RE.sub(' ', _IN_LIST_RE.sub(' IN (...)', sql)).strip()
+
+
+class RequestMetrics:
+
+    def __init__(self, request):
+        self.method = request.method
+        self.path = request.path
+        self.started = time.monotonic()
+        self.queries = 0
+        self.sql_ms = 0.0
+        self.signatures = defaultdict(lambda: [0, 0.0])  # signature -> [count, ms]
+        self.external_ms = defaultdict(float)
+
+    def record_query(self, sql, elapsed_ms):
+        self.queries += 1
+        self.sql_ms += elapsed_ms
+        entry = self.signatures[query_signature(sql)]
+        entry[0] += 1
+        entry[1] += elapsed_ms
+
+    def duplicates(self):
+        threshold = _setting('DUPLICATE_QUERY_THRESHOLD', 3)
+        repeated = [(sql, count) for sql, (count, _) in self.signatures.items() if count >= threshold]
+        return [{'sql': sql[:300], 'count': count} for sql, count in sorted(repeated, key=lambda r: -r[1])]
+
+    def top_queries(self, limit=5):
+        ranked = sorted(self.signatures.items(), key=lambda item: -item[1][1])[:limit]
+        return [{'sql': sql[:500], 'count': count, 'ms': round(ms, 1)} for sql, (count, ms) in ranked]
+
+    def elapsed_ms(self):
+        return (time.monotonic() - self.started) * 1000
+
+
+def current():
+    """The RequestMetrics of the request being handled, or None."""
+    return _current.get()
+
+
+@contextmanager
+def timed(service):
+    """Add the wall time of the block to `service` on the current request."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        metrics.external_ms[service] += (time.monotonic() - start) * 1000
+
+
+def log_event(event, level=logging.INFO, **fields):
+    """One JSON line on the instrumentation logger, tagged with the current request."""
+    metrics = _current.get()
+    record = {'event': event}
+    if metrics is not None:
+        record.update(method=metrics.method, path=metrics.path)
+    record.update(fields)
+    logger.log(level, json.dumps(record, default=str))
+
+
+def _query_timer(metrics):
+    def wrapper(execute, sql, params, many, context):
+        start = time.monotonic()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            metrics.record_query(sql, (time.monotonic() - start) * 1000)
+    return wrapper
+
+
+@contextmanager
+def _wrap_queries(wrapper):
+    """Install `wrapper` on every configured database connection."""
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(wrapper))
+        yield
+
+
+def _server_timing(metrics, total_ms):
+    parts = [
+        f'db;dur={metrics.sql_ms:.1f};desc="{metrics.queries} queries"',
+        *(f'{service};dur={ms:.1f}' for service, ms in metrics.external_ms.items()),
+        f'total;dur={total_ms:.1f}',
+    ]
+    return ', '.join(parts)
+
+
+class RequestMetricsMiddleware:
+    """See module docstring. Enabled by REQUEST_METRICS_ENABLED."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not _setting('REQUEST_METRICS_ENABLED', True):
+            return self.get_response(request)
+
+        metrics = RequestMetrics(request)
+        token = _current.set(metrics)
+        try:
+            with _wrap_queries(_query_timer(metrics)):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        total_ms = metrics.elapsed_ms()
+        if _setting('REQUEST_METRICS_SERVER_TIMING', True):
+            response['Server-Timing'] = _server_timing(metrics, total_ms)
+
+        record = {
+            'event': 'request',
+            'method': metrics.method,
+            'path': metrics.path,
+            'status': response.status_code,
+            'duration_ms': round(total_ms, 1),
+            'queries': metrics.queries,
+            'sql_ms': round(metrics.sql_ms, 1),
+            'duplicates': metrics.duplicates(),
+            'external_ms': {service: round(ms, 1) for service, ms in metrics.external_ms.items()},
+        }
+        if logger.isEnabledFor(logging.INFO) and random.random() < _setting('REQUEST_LOG_SAMPLE_RATE', 1.0):
+            logger.info(json.dumps(record, default=str))
+
+        slow_ms = _setting('SLOW_REQUEST_MS', 1000)
+        if slow_ms and total_ms >= slow_ms and random.random() < _setting('SLOW_REQUEST_SAMPLE_RATE', 1.0):
+            record.update(event='slow_request', top_queries=metrics.top_queries())
+            logger.warning(json.dumps(record, default=str))
+        return response
+
+
+def install():
+    """Time Cloudinary uploads, which happen inside CloudinaryField.pre_save."""
+    import cloudinary.uploader
+
+    call_api = cloudinary.uploader.call_api
+    if getattr(call_api, '_store_timed', False):
+        return
+
+    @functools.wraps(call_api)
+    def timed_call_api(*args, **kwargs):
+        with timed('cloudinary'):
+            return call_api(*args, **kwargs)
+
+    timed_call_api._store_timed = True
+    cloudinary.uploader.call_api = timed_call_api
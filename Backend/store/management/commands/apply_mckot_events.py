@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from store import webhooks
+from store.models import MckotEvent
+
+
+class Command(BaseCommand):
+    help = 'Fold unapplied Mckot webhook events into their deliveries (the task worker normally does this)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Events applied per transaction')
+        parser.add_argument('--purge-days', type=int, default=None,
+                            help='Also delete applied events received more than this many days ago')
+
+    def handle(self, *args, **options):
+        applied, updated = webhooks.apply_mckot_events(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Applied {applied} Mckot events to {updated} deliveries'))
+        if options['purge_days'] is not None:
+            cutoff = timezone.now() - timedelta(days=options['purge_days'])
+            purged, _ = MckotEvent.objects.filter(applied_at__isnull=False, received_at__lt=cutoff).delete()
+            self.stdout.write(f'Purged {purged} applied events')
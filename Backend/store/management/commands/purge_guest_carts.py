@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from store import carts
+from store.models import Cart
+
+
+class Command(BaseCommand):
+    help = 'Delete guest carts idle for longer than GUEST_CART_TTL_DAYS (the task worker runs this daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Carts deleted per statement')
+
+    def handle(self, *args, **options):
+        purged = carts.purge_guest_carts(batch_size=options['batch_size'])
+        remaining = Cart.objects.filter(user__isnull=True).count()
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} expired guest carts; {remaining} still open'))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from django.db.models import Avg, Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from store.models import Product, ProductLike, Review
+
+
+def _per_product(queryset, aggregate, output_field):
+    """Correlated subquery returning `aggregate` over the rows for one product."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(product=OuterRef('pk'))
+            .order_by()
+            .values('product')
+            .annotate(value=aggregate)
+            .values('value'),
+            output_field=output_field,
+        ),
+        Value(0),
+        output_field=output_field,
+    )
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized rating_avg, rating_count and like_count columns on Product'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = Product.objects.update(
+                like_count=_per_product(ProductLike.objects.all(), Count('id'), models.IntegerField()),
+                rating_count=_per_product(Review.objects.all(), Count('id'), models.IntegerField()),
+                rating_avg=_per_product(
+                    Review.objects.all(), Avg('rating'), models.DecimalField(max_digits=3, decimal_places=2)
+                ),
+            )
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt counters for {updated} products'))
@@ -0,0 +1,28 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from store import analytics
+from store.models import DailySalesRollup, Order
+
+
+class Command(BaseCommand):
+    help = 'Backfill the daily sales rollup tables used by the analytics dashboard'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Only rebuild days on or after this date (YYYY-MM-DD)')
+        parser.add_argument(
+            '--if-empty', action='store_true',
+            help='Do nothing unless the rollups are empty (safe to run on every deploy)',
+        )
+
+    def handle(self, *args, **options):
+        if options['if_empty'] and (DailySalesRollup.objects.exists() or not Order.objects.exists()):
+            return
+        since = None
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError('--since must be a date like 2025-01-31')
+        days = analytics.rebuild_rollups(since=since)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt sales rollups for {days} days'))
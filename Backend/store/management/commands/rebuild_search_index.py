@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from store import caching, search
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Rebuild Product.search_document (and with it the search index) for every product'
+
+    def handle(self, *args, **options):
+        ids = list(Product.objects.values_list('pk', flat=True))
+        for start in range(0, len(ids), 500):
+            search.refresh_search_documents(ids[start:start + 500])
+        caching.bump_version('search')
+        self.stdout.write(self.style.SUCCESS(f'Reindexed {len(ids)} products'))
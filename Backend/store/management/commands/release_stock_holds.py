@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from store import reservations
+from store.models import StockHold
+
+
+class Command(BaseCommand):
+    help = 'Cancel unpaid orders whose stock holds lapsed and give the stock back (the task worker runs this every minute)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Orders expired per transaction')
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Also recompute every variant\'s reserved count from the open holds')
+
+    def handle(self, *args, **options):
+        expired = reservations.release_expired(batch_size=options['batch_size'])
+        if options['rebuild']:
+            updated = reservations.rebuild_reserved()
+            self.stdout.write(f'Recomputed reserved stock for {updated} variants')
+        remaining = StockHold.objects.count()
+        self.stdout.write(self.style.SUCCESS(f'Expired {expired} unpaid orders; {remaining} stock holds still open'))
@@ -0,0 +1,69 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+from store.benchmarks import runner
+from store.benchmarks.fakes import FakeServices
+from store.benchmarks.scenarios import SCENARIOS, Context
+from store.seeding import SCALES, Seeder
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the hot API endpoints against a freshly seeded throwaway database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--requests', type=int, default=200, help='Timed requests per scenario')
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            choices=[s.name for s in SCENARIOS], help='Only run these (repeatable)')
+        parser.add_argument('--fake-latency-ms', type=float, default=0,
+                            help='Delay added to every fake Paystack/Mckot response')
+        parser.add_argument('--baseline', default=str(runner.DEFAULT_BASELINE))
+        parser.add_argument('--save-baseline', action='store_true', help='Write this run as the new baseline')
+        parser.add_argument('--no-compare', action='store_true', help='Only report; skip the baseline check')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p95 slowdown (0.25 = 25%%)')
+
+    def handle(self, *args, **options):
+        scenarios = [s for s in SCENARIOS if not options['scenarios'] or s.name in options['scenarios']]
+
+        # A test database, so the real one is never touched
+        setup_test_environment(debug=False)
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            cache.clear()
+            self.stdout.write(f"Seeding '{options['scale']}' dataset (seed {options['seed']})...")
+            Seeder(seed=options['seed'], stdout=self.stdout).run(**SCALES[options['scale']])
+            ctx = Context()
+            with FakeServices(latency_ms=options['fake_latency_ms']):
+                report = runner.run(scenarios, ctx, options['requests'], stdout=self.stdout, meta={
+                    'scale': options['scale'], 'seed': options['seed'], 'requests': options['requests'],
+                })
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        if options['save_baseline']:
+            runner.save_baseline(report, options['baseline'])
+            self.stdout.write(self.style.SUCCESS(f"Saved baseline to {options['baseline']}"))
+            return
+
+        if options['no_compare']:
+            return
+
+        baseline = runner.load_baseline(options['baseline'])
+        if baseline is None:
+            raise CommandError(
+                f"No baseline at {options['baseline']}; run with --save-baseline to create one, "
+                f"or --no-compare to only report"
+            )
+        recorded = (baseline.get('_meta', {}).get('scale'), baseline.get('_meta', {}).get('seed'))
+        if recorded != (options['scale'], options['seed']):
+            raise CommandError(
+                f'Baseline was recorded at scale {recorded[0]!r}, seed {recorded[1]!r}; '
+                f'rerun with those or pass --no-compare'
+            )
+        regressions = runner.compare(report, baseline, options['tolerance'])
+        if regressions:
+            raise CommandError('Benchmark regressions:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS('No regressions'))
@@ -0,0 +1,54 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from store import tasks
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (emails, third-party calls) from the BackgroundJob table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process the jobs that are due now, then exit')
+        parser.add_argument('--batch-size', type=int, default=10, help='Jobs to claim per poll')
+        parser.add_argument('--no-periodic', action='store_true',
+                            help="Don't enqueue periodic housekeeping tasks (stock holds, guest carts)")
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **options):
+        self._stopping = False
+        previous = {sig: signal.signal(sig, self._stop) for sig in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            processed = self._work(options)
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+        self.stdout.write(self.style.SUCCESS(f'Worker stopped after {processed} jobs'))
+
+    def _work(self, options):
+        requeued = tasks.requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale jobs'))
+
+        processed = 0
+        last_run = {}
+        while not self._stopping:
+            close_old_connections()
+            if not options['no_periodic']:
+                tasks.enqueue_periodic(last_run)
+            jobs = tasks.claim_jobs(limit=options['batch_size'])
+            for job in jobs:
+                ok = tasks.run_job(job)
+                processed += 1
+                if options['verbosity'] > 1:
+                    status = 'done' if ok else job.status
+                    self.stdout.write(f'{job.task_name} #{job.pk}: {status}')
+            if options['once'] and not jobs:
+                break
+            if not jobs:
+                time.sleep(options['sleep'])
+        return processed
+
+    def _stop(self, signum, frame):
+        self._stopping = True
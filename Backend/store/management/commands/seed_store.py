@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from store.models import Order, Product
+from store.seeding import SCALES, Seeder
+
+
+class Command(BaseCommand):
+    help = 'Fill an empty database with synthetic store data (catalog, customers, carts, orders, ...)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=list(SCALES), default='small',
+                            help='Preset volumes; the per-entity options below override it')
+        parser.add_argument('--seed', type=int, default=42, help='Same seed, same data')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per bulk INSERT')
+        parser.add_argument('--days', type=int, default=365, help='How far back order history goes')
+        for entity in SCALES['tiny']:
+            parser.add_argument(f"--{entity.replace('_', '-')}", type=int, dest=entity, metavar='N')
+
+    def handle(self, *args, **options):
+        if Product.objects.exists() or Order.objects.exists():
+            raise CommandError(
+                'The database already has store data; seed_store only fills an empty one '
+                '(python manage.py flush clears it).'
+            )
+        volumes = {
+            entity: options[entity] if options[entity] is not None else default
+            for entity, default in SCALES[options['scale']].items()
+        }
+        self.stdout.write('Volumes: ' + ', '.join(f'{entity}={count}' for entity, count in volumes.items()))
+
+        started = time.monotonic()
+        seeder = Seeder(seed=options['seed'], chunk_size=options['chunk_size'], stdout=self.stdout, days=options['days'])
+        with transaction.atomic():
+            seeder.run(**volumes)
+        self.stdout.write(self.style.SUCCESS(f'Seeded in {time.monotonic() - started:.1f}s'))
@@ -7,6 +7,10 @@ The merchant API key is a SERVER-SIDE SECRET (settings.MCKOT_MERCHANT_API_KEY)
 and must never reach the storefront. The Next.js client talks only to our own
 Django endpoints, which proxy to Mckot through this module.
 
+All calls share one pooled keep-alive requests.Session with connect/read
+timeouts; idempotent calls are retried with jittered backoff. Latency, retry
+and error-code counters are available from get_stats().
+
 Response envelope:
     success -> {"success": true,  "data": {...}}
     error   -> {"success": false, "error": {"message", "code"}}
@@ -14,12 +18,26 @@ Response envelope:
 import hmac
 import hashlib
 import logging
+import random
+import threading
+import time
+from collections import Counter
 
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
+from django.core.cache import cache
+
+from .instrumentation import timed
 
 logger = logging.getLogger(__name__)
 
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+_cached_headers = (None, None)  # (api key, headers)
+
 
 class MckotError(Exception):
     """Raised when Mckot returns an error envelope or the request fails."""
@@ -35,52 +53,158 @@ class MckotConfigError(MckotError):
     """Raised when the integration is not configured (missing API key)."""
 
 
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
 def _base_url():
-    return getattr(
-        settings, "MCKOT_BASE_URL", "https://api.mckot.com/merchant/v1"
-    ).rstrip("/")
+    return _setting("MCKOT_BASE_URL", "https://api.mckot.com/merchant/v1").rstrip("/")
+
+
+def get_session():
+    """The process-wide keep-alive session, created on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=_setting("MCKOT_POOL_SIZE", 10))
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def reset_session():
+    """Drop pooled connections (e.g. after settings change in tests)."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
 
 
 def _headers():
-    key = getattr(settings, "MCKOT_MERCHANT_API_KEY", "") or ""
+    global _cached_headers
+    key = _setting("MCKOT_MERCHANT_API_KEY", "") or ""
     if not key:
         raise MckotConfigError(
             "MCKOT_MERCHANT_API_KEY is not configured", code="not_configured"
         )
-    return {
-        "Authorization": f"Bearer {key}",
-        "Content-Type": "application/json",
-        "Accept": "application/json",
-    }
+    cached_key, headers = _cached_headers
+    if cached_key != key:
+        headers = {
+            "Authorization": f"Bearer {key}",
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        }
+        _cached_headers = (key, headers)
+    return headers
+
+
+def _timeout():
+    return (_setting("MCKOT_CONNECT_TIMEOUT", 5), _setting("MCKOT_READ_TIMEOUT", 30))
+
+
+# --- Metrics ---------------------------------------------------------------
+# In-process counters; read them with get_stats() (e.g. from a shell or a
+# health endpoint). Each worker process keeps its own.
 
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "retries": 0, "latency_ms_total": 0.0, "latency_ms_max": 0.0,
+          "errors": Counter()}
 
-def _request(method, path, payload=None, timeout=30):
+
+def _record(elapsed_ms=None, error=None, retry=False):
+    with _stats_lock:
+        if elapsed_ms is not None:
+            _stats["requests"] += 1
+            _stats["latency_ms_total"] += elapsed_ms
+            _stats["latency_ms_max"] = max(_stats["latency_ms_max"], elapsed_ms)
+        if error:
+            _stats["errors"][error] += 1
+        if retry:
+            _stats["retries"] += 1
+
+
+def get_stats():
+    """Snapshot of request count, retries, latency and error counts by code."""
+    with _stats_lock:
+        count = _stats["requests"]
+        return {
+            "requests": count,
+            "retries": _stats["retries"],
+            "latency_ms_avg": round(_stats["latency_ms_total"] / count, 1) if count else 0.0,
+            "latency_ms_max": round(_stats["latency_ms_max"], 1),
+            "errors": dict(_stats["errors"]),
+        }
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.update(requests=0, retries=0, latency_ms_total=0.0, latency_ms_max=0.0, errors=Counter())
+
+
+def _backoff(attempt):
+    base = _setting("MCKOT_RETRY_BACKOFF_SECONDS", 0.5)
+    return base * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+@timed("mckot")
+def _request(method, path, payload=None, idempotent=None):
+    """
+    Send one API call through the pooled session.
+
+    Idempotent calls (GETs by default) are retried with jittered backoff on
+    network errors, 429 and 502-504.
+    """
     url = f"{_base_url()}{path}"
-    try:
-        resp = requests.request(
-            method, url, json=payload, headers=_headers(), timeout=timeout
-        )
-    except requests.RequestException as e:
-        logger.error("Mckot request failed: %s %s -> %s", method, path, e)
-        raise MckotError(
-            f"Could not reach the delivery service: {e}", code="network_error"
+    headers = _headers()
+    if idempotent is None:
+        idempotent = method == "GET"
+    retries = _setting("MCKOT_MAX_RETRIES", 2) if idempotent else 0
+
+    for attempt in range(retries + 1):
+        started = time.monotonic()
+        try:
+            resp = get_session().request(
+                method, url, json=payload, headers=headers, timeout=_timeout()
+            )
+        except requests.RequestException as e:
+            _record((time.monotonic() - started) * 1000, error="network_error")
+            if attempt < retries:
+                _record(retry=True)
+                logger.warning("Mckot %s %s failed (%s), retrying", method, path, e)
+                time.sleep(_backoff(attempt))
+                continue
+            logger.error("Mckot request failed: %s %s -> %s", method, path, e)
+            raise MckotError(
+                f"Could not reach the delivery service: {e}", code="network_error"
+            )
+        elapsed_ms = (time.monotonic() - started) * 1000
+
+        if resp.status_code in RETRYABLE_STATUS_CODES and attempt < retries:
+            _record(elapsed_ms, error=f"http_{resp.status_code}", retry=True)
+            logger.warning("Mckot %s %s -> HTTP %s, retrying", method, path, resp.status_code)
+            time.sleep(_backoff(attempt))
+            continue
+
+        try:
+            body = resp.json()
+        except ValueError:
+            body = {}
+
+        if resp.ok and isinstance(body, dict) and body.get("success"):
+            _record(elapsed_ms)
+            return body.get("data", {}) or {}
+
+        err = body.get("error") or {} if isinstance(body, dict) else {}
+        message = err.get("message") or f"Mckot API error (HTTP {resp.status_code})"
+        code = err.get("code")
+        _record(elapsed_ms, error=code or f"http_{resp.status_code}")
+        logger.warning(
+            "Mckot API error: %s %s -> %s (%s)", method, path, message, code
         )
-
-    try:
-        body = resp.json()
-    except ValueError:
-        body = {}
-
-    if resp.ok and isinstance(body, dict) and body.get("success"):
-        return body.get("data", {}) or {}
-
-    err = body.get("error") or {} if isinstance(body, dict) else {}
-    message = err.get("message") or f"Mckot API error (HTTP {resp.status_code})"
-    code = err.get("code")
-    logger.warning(
-        "Mckot API error: %s %s -> %s (%s)", method, path, message, code
-    )
-    raise MckotError(message, code=code, status_code=resp.status_code)
+        raise MckotError(message, code=code, status_code=resp.status_code)
 
 
 # --- Public API ------------------------------------------------------------
@@ -103,7 +227,106 @@ def quote(dropoff_coordinates, pickup_coordinates=None, ride_type_id=None):
         payload["pickup"] = {"coordinates": list(pickup_coordinates)}
     if ride_type_id is not None:
         payload["ride_type_id"] = ride_type_id
-    return _request("POST", "/deliveries/quote", payload)
+    return _request("POST", "/deliveries/quote", payload, idempotent=True)  # no side effects
+
+
+# --- Quote cache -----------------------------------------------------------
+# Customers in the same neighbourhood (and the same customer re-opening
+# checkout) ask for the same quote over and over. Quotes are cached for a few
+# minutes keyed by the drop-off rounded to MCKOT_QUOTE_CACHE_PRECISION decimal
+# places (3 ~ 110 m), the pickup and the ride type. The TTL is capped well
+# inside Mckot's 15-minute quote validity so a cached quote_id can still be
+# booked. Concurrent misses for the same key in one process share a single
+# upstream call.
+
+QUOTE_VALIDITY_SECONDS = 15 * 60
+QUOTE_SAFETY_MARGIN_SECONDS = 2 * 60
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+class _InFlightQuote:
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry = None
+        self.error = None
+
+
+def _quote_cache_ttl():
+    ttl = int(getattr(settings, "MCKOT_QUOTE_CACHE_SECONDS", 300))
+    return max(0, min(ttl, QUOTE_VALIDITY_SECONDS - QUOTE_SAFETY_MARGIN_SECONDS))
+
+
+def quote_cache_key(dropoff_coordinates, pickup_coordinates=None, ride_type_id=None):
+    precision = int(getattr(settings, "MCKOT_QUOTE_CACHE_PRECISION", 3))
+    lat, lng = (round(float(c), precision) for c in dropoff_coordinates)
+    pickup = (
+        ",".join(f"{float(c):.6f}" for c in pickup_coordinates)
+        if pickup_coordinates else "base"
+    )
+    ride = ride_type_id if ride_type_id is not None else "any"
+    return f"mckot:quote:{lat:.{precision}f},{lng:.{precision}f}:{pickup}:{ride}"
+
+
+def cached_quote(dropoff_coordinates, pickup_coordinates=None, ride_type_id=None,
+                 exact=False):
+    """
+    quote() behind the short-TTL cache.
+
+    With exact=True a cached quote is only reused if it was made for exactly
+    these drop-off coordinates — use this when booking, since the courier is
+    sent to the quoted drop-off, not the one on our Delivery row.
+    """
+    coords = [float(c) for c in dropoff_coordinates]
+    key = quote_cache_key(coords, pickup_coordinates, ride_type_id)
+    ttl = _quote_cache_ttl()
+
+    def usable(entry):
+        return entry is not None and (not exact or entry["coordinates"] == coords)
+
+    entry = cache.get(key) if ttl else None
+    if usable(entry):
+        return entry["data"]
+
+    with _inflight_lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = _inflight[key] = _InFlightQuote()
+
+    if not leader:
+        call.done.wait(timeout=60)
+        if call.error is not None:
+            raise call.error
+        if usable(call.entry):
+            return call.entry["data"]
+        # Leader quoted different exact coordinates; fetch our own
+        return _fetch_quote(key, coords, pickup_coordinates, ride_type_id, ttl)["data"]
+
+    try:
+        call.entry = _fetch_quote(key, coords, pickup_coordinates, ride_type_id, ttl)
+        return call.entry["data"]
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        call.done.set()
+
+
+def _fetch_quote(key, coords, pickup_coordinates, ride_type_id, ttl):
+    data = quote(coords, pickup_coordinates=pickup_coordinates, ride_type_id=ride_type_id)
+    entry = {"coordinates": coords, "data": data, "fetched_at": time.time()}
+    if ttl and data.get("quote_id"):
+        cache.set(key, entry, ttl)
+    return entry
+
+
+def invalidate_quote(dropoff_coordinates, pickup_coordinates=None, ride_type_id=None):
+    """Drop a cached quote, e.g. after Mckot rejects its quote_id."""
+    cache.delete(quote_cache_key(dropoff_coordinates, pickup_coordinates, ride_type_id))
 
 
 def create_delivery(quote_id, order_ref, customer, goods=None,
@@ -125,7 +348,7 @@ def create_delivery(quote_id, order_ref, customer, goods=None,
         "goods": goods or {"payment": "prepaid"},
         "fee_payer": fee_payer,
     }
-    return _request("POST", "/deliveries", payload)
+    return _request("POST", "/deliveries", payload, idempotent=True)  # keyed by order_ref
 
 
 def get_delivery(delivery_id_or_ref):
@@ -139,6 +362,37 @@ def cancel(delivery_id_or_ref, reason=None):
     return _request("POST", f"/deliveries/{delivery_id_or_ref}/cancel", payload)
 
 
+def delivery_fields(data):
+    """
+    Delivery model fields carried by a Mckot delivery object, as a dict of
+    only the ones present (objects from webhooks are often partial).
+    """
+    if not isinstance(data, dict):
+        return {}
+    fields = {}
+    if data.get("id"):
+        fields["mckot_delivery_id"] = data["id"]
+    if data.get("status"):
+        fields["status"] = data["status"]
+    if data.get("collection_status"):
+        fields["collection_status"] = data["collection_status"]
+    courier = data.get("courier") or {}
+    if courier.get("name"):
+        fields["courier_name"] = courier["name"]
+    if courier.get("phone"):
+        fields["courier_phone"] = courier["phone"]
+    if data.get("tracking_url"):
+        fields["tracking_url"] = data["tracking_url"]
+    fee = data.get("delivery_fee") or {}
+    if isinstance(fee, dict) and fee.get("amount") is not None:
+        fields["delivery_fee"] = fee["amount"]
+    if data.get("distance_km") is not None:
+        fields["distance_km"] = data["distance_km"]
+    if data.get("duration_minutes") is not None:
+        fields["duration_minutes"] = data["duration_minutes"]
+    return fields
+
+
 def verify_webhook_signature(raw_body, signature_header):
     """
     Verify the X-Mckot-Signature header ("sha256=<hex>").
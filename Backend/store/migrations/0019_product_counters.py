@@ -0,0 +1,42 @@
+# Generated by Django 6.0 on 2026-10-17 22:00
+
+from django.db import migrations, models
+
+
+def backfill_counters(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    ProductLike = apps.get_model('store', 'ProductLike')
+    Review = apps.get_model('store', 'Review')
+    for product in Product.objects.all().iterator():
+        stats = Review.objects.filter(product=product).aggregate(avg=models.Avg('rating'), count=models.Count('id'))
+        Product.objects.filter(pk=product.pk).update(
+            like_count=ProductLike.objects.filter(product=product).count(),
+            rating_count=stats['count'],
+            rating_avg=round(stats['avg'] or 0, 2),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0018_delivery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
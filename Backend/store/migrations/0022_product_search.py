@@ -0,0 +1,69 @@
+# Generated by Django 6.0 on 2026-10-17 22:14
+
+from django.db import migrations, models
+
+
+VARIANT_FIELDS = ('color', 'texture', 'length', 'lace_type', 'density', 'wig_size')
+
+
+def backfill_search_documents(apps, schema_editor):
+    # Mirrors store.search.build_search_document at the time of writing
+    Product = apps.get_model('store', 'Product')
+    products = Product.objects.select_related('category').prefetch_related('variants')
+    for product in products.iterator(chunk_size=500):
+        parts = [product.category.name] if product.category_id else []
+        for variant in product.variants.all():
+            parts.extend(str(getattr(variant, f)) for f in VARIANT_FIELDS if getattr(variant, f))
+            if variant.bundle_deal:
+                parts.append(f'{variant.bundle_deal} bundles')
+        parts.append(product.description or '')
+        seen, words = set(), []
+        for word in ' '.join(parts).split():
+            if word.lower() not in seen:
+                seen.add(word.lower())
+                words.append(word)
+        Product.objects.filter(pk=product.pk).update(search_document=' '.join(words))
+
+
+# PostgreSQL only: a generated tsvector column (title weighted above the
+# rest) with a GIN index. Other databases use the Python index in
+# store/search.py. Note: altering store_product.title/search_document later
+# requires dropping and re-adding this column on PostgreSQL.
+SEARCH_VECTOR_SQL = [
+    """
+    ALTER TABLE store_product ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(search_document, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX store_product_search_gin ON store_product USING gin (search_vector)",
+]
+
+
+def add_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in SEARCH_VECTOR_SQL:
+            schema_editor.execute(sql)
+
+
+def drop_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("ALTER TABLE store_product DROP COLUMN IF EXISTS search_vector")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0021_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(add_search_vector, drop_search_vector),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.0 on 2026-10-17 22:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0024_guest_carts'),
+    ]
+
+    operations = [
+        # Orders placed before holds existed already took their stock at
+        # checkout, so existing rows start out committed; new ones don't.
+        migrations.AddField(
+            model_name='order',
+            name='stock_committed',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='stock_committed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='productvariant',
+            name='reserved',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='StockHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_holds', to='store.order')),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='store.productvariant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['expires_at'], name='store_hold_expires_at')],
+            },
+        ),
+    ]
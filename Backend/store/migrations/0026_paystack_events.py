@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-17 22:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0025_stock_holds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaystackEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.CharField(help_text='e.g. charge.success', max_length=50)),
+                ('reference', models.CharField(max_length=100)),
+                ('paystack_id', models.CharField(blank=True, help_text='data.id from the payload', max_length=50)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('received', 'Received'), ('processed', 'Processed'), ('ignored', 'Ignored')], default='received', max_length=20)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-received_at'],
+                'constraints': [models.UniqueConstraint(fields=('event', 'reference'), name='store_paystack_event_unique')],
+            },
+        ),
+    ]
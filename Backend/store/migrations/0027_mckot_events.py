@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-17 22:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0026_paystack_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='delivery',
+            name='last_event_at',
+            field=models.DateTimeField(blank=True, help_text='Time of the newest webhook event applied', null=True),
+        ),
+        migrations.AddField(
+            model_name='delivery',
+            name='status_history',
+            field=models.JSONField(blank=True, default=list, help_text='[{status, at}] from webhook events, oldest first'),
+        ),
+        migrations.CreateModel(
+            name='MckotEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.CharField(blank=True, help_text='e.g. delivery.assigned', max_length=50)),
+                ('delivery_ref', models.CharField(blank=True, help_text='Mckot delivery id', max_length=100)),
+                ('order_ref', models.PositiveIntegerField(blank=True, help_text='Our order id, as sent to Mckot', null=True)),
+                ('payload', models.JSONField(blank=True, default=dict, help_text="The event's delivery object")),
+                ('occurred_at', models.DateTimeField(help_text='Event time from the payload, else when it arrived')),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('applied_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(condition=models.Q(('applied_at__isnull', True)), fields=['id'], name='store_mckot_event_pending')],
+            },
+        ),
+    ]
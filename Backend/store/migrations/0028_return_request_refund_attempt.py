@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 23:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0027_mckot_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='returnrequest',
+            name='refund_attempted_at',
+            field=models.DateTimeField(blank=True, help_text='When a refund was sent to Paystack; set before the call', null=True),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils.text import slugify
 from django.conf import settings
+from django.utils import timezone
 from decimal import Decimal
 from cloudinary.models import CloudinaryField
 
@@ -50,10 +51,30 @@ class Product(models.Model):
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True)
     base_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     is_active = models.BooleanField(default=True)
+    # Denormalized counters, kept in step by the ProductLike/Review signals
+    # (store/signals.py). `manage.py rebuild_product_counters` recomputes
+    # them after writes that skip signals (bulk_create, raw SQL, loaddata).
+    rating_avg = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    like_count = models.PositiveIntegerField(default=0)
+    # Category, variant attributes and description for full-text search
+    # (store/search.py); maintained by signals.
+    search_document = models.TextField(blank=True, default='', editable=False)
 
     def __str__(self):
         return self.title
 
+    def refresh_rating_stats(self):
+        """
+        Recompute rating_avg/rating_count from this product's reviews.
+        Call inside the transaction that changed the reviews, after locking
+        the product row, so concurrent writers can't overwrite each other.
+        """
+        stats = self.reviews.aggregate(avg=models.Avg('rating'), count=models.Count('id'))
+        self.rating_count = stats['count']
+        self.rating_avg = Decimal(str(round(stats['avg'] or 0, 2)))
+        Product.objects.filter(pk=self.pk).update(rating_avg=self.rating_avg, rating_count=self.rating_count)
+
 
 # ============================
 # PRODUCT VARIANT
@@ -72,6 +93,27 @@ class ProductVariant(models.Model):
 
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.IntegerField(default=0)
+    # Units held for unpaid orders; kept in step with StockHold by store/reservations.py
+    reserved = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # (attribute, product) serves both the facet filters and the grouped
+        # facet counts in store/filters.py; (product, price) the price range.
+        indexes = [
+            models.Index(fields=["length", "product"], name="store_variant_length"),
+            models.Index(fields=["color", "product"], name="store_variant_color"),
+            models.Index(fields=["texture", "product"], name="store_variant_texture"),
+            models.Index(fields=["lace_type", "product"], name="store_variant_lace_type"),
+            models.Index(fields=["density", "product"], name="store_variant_density"),
+            models.Index(fields=["wig_size", "product"], name="store_variant_wig_size"),
+            models.Index(fields=["bundle_deal", "product"], name="store_variant_bundle_deal"),
+            models.Index(fields=["product", "price"], name="store_variant_product_price"),
+        ]
+
+    @property
+    def available(self):
+        """Stock that can still be sold: on hand minus what unpaid orders hold."""
+        return self.stock - self.reserved
 
     def __str__(self):
         return f"{self.product.title} - Variant #{self.id}"
@@ -95,10 +137,22 @@ class ProductImage(models.Model):
 # CART
 # ============================
 class Cart(models.Model):
-    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Guest carts have no user; they are found by guest_key, which the client
+    # holds as a signed token (see store/carts.py).
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
+    guest_key = models.CharField(max_length=32, unique=True, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, help_text="Last write; guest carts expire from here")
+
+    class Meta:
+        indexes = [
+            # The guest cart purge scans only abandoned guest carts
+            models.Index(fields=["updated_at"], condition=models.Q(user__isnull=True), name="store_cart_guest_updated_at"),
+        ]
 
     def __str__(self):
+        if self.user_id is None:
+            return f"Cart (guest #{self.pk})"
         return f"Cart ({self.user.username})"
 
 # ============================
@@ -193,6 +247,27 @@ class DiscountCode(models.Model):
         
         return True, "Valid"
     
+    def redeem(self):
+        """
+        Claim one use of this code with a single conditional UPDATE.
+
+        Returns True if a use was claimed. The usage limit is enforced by the
+        database, so concurrent checkouts can't push times_used past it or
+        overwrite each other's increments. Call inside the checkout
+        transaction so a failed checkout releases the claim.
+        """
+        has_capacity = (
+            models.Q(usage_limit__isnull=True)
+            | models.Q(usage_limit=0)  # 0 is treated as unlimited, as in is_valid
+            | models.Q(times_used__lt=models.F('usage_limit'))
+        )
+        claimed = DiscountCode.objects.filter(has_capacity, pk=self.pk, is_active=True).update(
+            times_used=models.F('times_used') + 1
+        )
+        if claimed:
+            self.refresh_from_db(fields=['times_used'])
+        return bool(claimed)
+
     def calculate_discount(self, cart_total):
         """Calculate discount amount based on cart total"""
         if self.discount_type == 'percentage':
@@ -241,8 +316,17 @@ class Order(models.Model):
     guest_address_city = models.CharField(max_length=100, null=True, blank=True)
     guest_address_region = models.CharField(max_length=100, null=True, blank=True)
     guest_address_country = models.CharField(max_length=100, default="Ghana", null=True, blank=True)
+    # False while the order's stock is only held (StockHold); set when payment
+    # takes the items out of stock for good
+    stock_committed = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Date-range scans (analytics edges, rollup rebuilds, cursor pages)
+            models.Index(fields=["created_at"], name="store_order_created_at"),
+        ]
+
     def __str__(self):
         if self.user:
             return f"Order #{self.id} - {self.user.username}"
@@ -262,6 +346,30 @@ class OrderItem(models.Model):
         return f"Item {self.variant} (x{self.quantity})"
 
 
+# ============================
+# STOCK HOLD
+# ============================
+class StockHold(models.Model):
+    """
+    Stock set aside for an order awaiting payment, until expires_at. Counted
+    in ProductVariant.reserved while the row exists; see store/reservations.py.
+    """
+    variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, related_name="holds")
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="stock_holds")
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # The sweeper's range scan for expired holds
+            models.Index(fields=["expires_at"], name="store_hold_expires_at"),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.variant_id} for Order #{self.order_id} until {self.expires_at}"
+
+
 # ============================
 # RETURN REQUEST
 # ============================
@@ -293,6 +401,7 @@ class ReturnRequest(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
     admin_notes = models.TextField(blank=True, help_text="Admin notes (internal)")
     refund_reference = models.CharField(max_length=255, blank=True, null=True, help_text="Paystack refund reference")
+    refund_attempted_at = models.DateTimeField(null=True, blank=True, help_text="When a refund was sent to Paystack; set before the call")
     requested_at = models.DateTimeField(auto_now_add=True)
     processed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -445,6 +554,8 @@ class Delivery(models.Model):
     dropoff_lat = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     dropoff_lng = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     raw_response = models.JSONField(null=True, blank=True, help_text="Last Mckot payload, for debugging")
+    status_history = models.JSONField(default=list, blank=True, help_text="[{status, at}] from webhook events, oldest first")
+    last_event_at = models.DateTimeField(null=True, blank=True, help_text="Time of the newest webhook event applied")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -454,3 +565,144 @@ class Delivery(models.Model):
 
     def __str__(self):
         return f"Delivery for Order #{self.order_id} - {self.status}"
+
+
+
+# ============================
+# MCKOT WEBHOOK EVENTS
+# ============================
+class MckotEvent(models.Model):
+    """
+    Append-only log of Mckot webhook events. The webhook only inserts here;
+    webhooks.apply_mckot_events() folds unapplied rows into Delivery in
+    batches and stamps applied_at.
+    """
+    event = models.CharField(max_length=50, blank=True, help_text="e.g. delivery.assigned")
+    delivery_ref = models.CharField(max_length=100, blank=True, help_text="Mckot delivery id")
+    order_ref = models.PositiveIntegerField(null=True, blank=True, help_text="Our order id, as sent to Mckot")
+    payload = models.JSONField(default=dict, blank=True, help_text="The event's delivery object")
+    occurred_at = models.DateTimeField(help_text="Event time from the payload, else when it arrived")
+    received_at = models.DateTimeField(auto_now_add=True)
+    applied_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(applied_at__isnull=True), name='store_mckot_event_pending'),
+        ]
+
+    def __str__(self):
+        return f"{self.event or 'event'} {self.delivery_ref or self.order_ref} #{self.id}"
+
+
+# ============================
+# PAYSTACK WEBHOOK EVENTS
+# ============================
+class PaystackEvent(models.Model):
+    """
+    Ledger of Paystack webhook deliveries, one row per (event, reference).
+    Paystack redelivers an event until it gets a 2xx, so the unique
+    constraint is what makes a retry a no-op; the follow-up work runs once
+    in the process_paystack_event task.
+    """
+    STATUS_CHOICES = [
+        ("received", "Received"),
+        ("processed", "Processed"),
+        ("ignored", "Ignored"),
+    ]
+
+    event = models.CharField(max_length=50, help_text="e.g. charge.success")
+    reference = models.CharField(max_length=100)
+    paystack_id = models.CharField(max_length=50, blank=True, help_text="data.id from the payload")
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="received")
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-received_at']
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'reference'], name='store_paystack_event_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.event} {self.reference} - {self.status}"
+
+
+# ============================
+# BACKGROUND JOB
+# ============================
+class BackgroundJob(models.Model):
+    """
+    A queued call to a task registered in store/tasks.py. Rows are deleted
+    once the task succeeds; jobs that exhaust their retries are kept with
+    status "dead" as the dead-letter record.
+    """
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("dead", "Dead"),
+    ]
+
+    task_name = models.CharField(max_length=100)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now, help_text="Earliest time the next attempt may run")
+    locked_at = models.DateTimeField(null=True, blank=True, help_text="When a worker claimed the job")
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['run_at']
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='store_job_status_run_at'),
+        ]
+
+    def __str__(self):
+        return f"{self.task_name} #{self.id} - {self.status}"
+
+
+# ============================
+# SALES ROLLUPS
+# ============================
+class DailySalesRollup(models.Model):
+    """
+    Order totals for one day and status, maintained by store/analytics.py
+    whenever an order changes. Rebuild with `manage.py rebuild_sales_rollups`.
+    """
+    date = models.DateField()
+    status = models.CharField(max_length=20)
+    order_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    discount_order_count = models.PositiveIntegerField(default=0)
+    discount_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['date', 'status']
+        constraints = [
+            models.UniqueConstraint(fields=["date", "status"], name="store_sales_rollup_date_status"),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.status}: {self.order_count} orders"
+
+
+class DailyProductSales(models.Model):
+    """Units and revenue per product per day, for paid orders only."""
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True, related_name="daily_sales")
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['date']
+        indexes = [
+            models.Index(fields=["date", "product"], name="store_product_sales_date"),
+        ]
+
+    def __str__(self):
+        return f"{self.date} product {self.product_id}: {self.quantity}"
@@ -0,0 +1,70 @@
+"""
+Pagination for the list endpoints.
+
+Storefront and customer lists use keyset (cursor) pagination so a page costs
+the same at 100k rows as at 100: the database seeks to the cursor position on
+an indexed, stable ordering instead of counting and skipping rows.
+
+The admin UI still needs page numbers and a total count, so passing
+?page=<n> on any of these endpoints switches to classic offset pagination.
+Search results (?search=) are ordered by relevance, which is not a stable
+keyset, so they are offset-paginated too.
+"""
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+MAX_PAGE_SIZE = 100
+
+
+class AdminPageNumberPagination(PageNumberPagination):
+    """Offset pagination with a total count, for the admin tables."""
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+
+
+class StoreCursorPagination(CursorPagination):
+    """
+    Cursor pagination on -id with a bounded page size.
+
+    Falls back to AdminPageNumberPagination when the request carries a
+    ?page= or ?search= parameter.
+    """
+    ordering = '-id'
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+    offset_paginator_class = AdminPageNumberPagination
+    offset_query_params = ('page', 'search')
+
+    def __init__(self):
+        self.offset_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if any(request.query_params.get(param) for param in self.offset_query_params):
+            self.offset_paginator = self.offset_paginator_class()
+            # Keep offset pages deterministic with the same ordering as the cursor
+            if not queryset.ordered:
+                queryset = queryset.order_by(*self.get_ordering(request, queryset, view))
+            page = self.offset_paginator.paginate_queryset(queryset, request, view)
+            self.display_page_controls = self.offset_paginator.display_page_controls
+            return page
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.offset_paginator is not None:
+            return self.offset_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_html_context(self):
+        if self.offset_paginator is not None:
+            return self.offset_paginator.get_html_context()
+        return super().get_html_context()
+
+    def to_html(self):
+        if self.offset_paginator is not None:
+            return self.offset_paginator.to_html()
+        return super().to_html()
+
+
+class CreatedAtCursorPagination(StoreCursorPagination):
+    """Newest first, for tables that carry a created_at timestamp."""
+    ordering = ('-created_at', '-id')
@@ -0,0 +1,173 @@
+"""
+Server-side client for the Paystack API.
+
+Docs / base: https://api.paystack.co (settings.PAYSTACK_BASE_URL)
+
+All calls share one pooled requests.Session, so requests from a worker reuse
+a kept-alive TCP+TLS connection to Paystack instead of opening a new one each
+time. Every call has connect and read timeouts; idempotent GETs are retried
+with jittered backoff on network errors, 429 and 5xx.
+
+Response envelope:
+    success -> {"status": true,  "message": "...", "data": {...}}
+    error   -> {"status": false, "message": "..."}
+"""
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+from .instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class PaystackError(Exception):
+    """Raised when Paystack returns an error envelope or the request fails."""
+
+    def __init__(self, message, status_code=None, body=None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.body = body or {}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _base_url():
+    return _setting("PAYSTACK_BASE_URL", "https://api.paystack.co").rstrip("/")
+
+
+def get_session():
+    """The process-wide keep-alive session, created on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            pool_size = _setting("PAYSTACK_POOL_SIZE", 10)
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def reset_session():
+    """Drop pooled connections (e.g. after settings change in tests)."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def _headers():
+    return {
+        "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+    }
+
+
+def _timeout():
+    return (
+        _setting("PAYSTACK_CONNECT_TIMEOUT", 5),
+        _setting("PAYSTACK_READ_TIMEOUT", 20),
+    )
+
+
+def _backoff(attempt):
+    base = _setting("PAYSTACK_RETRY_BACKOFF_SECONDS", 0.5)
+    return base * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+@timed("paystack")
+def _request(method, path, payload=None):
+    url = f"{_base_url()}{path}"
+    # Only GETs are safe to replay; a retried POST could double-charge/refund
+    retries = _setting("PAYSTACK_MAX_RETRIES", 2) if method == "GET" else 0
+
+    for attempt in range(retries + 1):
+        try:
+            resp = get_session().request(
+                method, url, json=payload, headers=_headers(), timeout=_timeout()
+            )
+        except requests.RequestException as e:
+            if attempt < retries:
+                logger.warning("Paystack %s %s failed (%s), retrying", method, path, e)
+                time.sleep(_backoff(attempt))
+                continue
+            logger.error("Paystack request failed: %s %s -> %s", method, path, e)
+            raise PaystackError(f"Could not reach Paystack: {e}")
+
+        if resp.status_code in RETRYABLE_STATUS_CODES and attempt < retries:
+            logger.warning("Paystack %s %s -> HTTP %s, retrying", method, path, resp.status_code)
+            time.sleep(_backoff(attempt))
+            continue
+        return _parse(resp, method, path)
+
+
+def _parse(resp, method, path):
+    try:
+        body = resp.json()
+    except ValueError:
+        body = {}
+
+    if resp.ok and isinstance(body, dict) and body.get("status"):
+        return body.get("data") or {}
+
+    message = (body.get("message") if isinstance(body, dict) else None) or resp.text or \
+        f"Paystack API error (HTTP {resp.status_code})"
+    logger.warning("Paystack API error: %s %s -> %s (HTTP %s)", method, path, message, resp.status_code)
+    raise PaystackError(message, status_code=resp.status_code, body=body)
+
+
+# --- Public API ------------------------------------------------------------
+
+def initialize_transaction(email, amount, reference, callback_url=None, channels=None):
+    """
+    POST /transaction/initialize
+
+    amount is in the smallest currency unit (pesewas). Returns data containing
+    authorization_url, access_code and reference.
+    """
+    payload = {"email": email, "amount": amount, "reference": reference}
+    if callback_url:
+        payload["callback_url"] = callback_url
+    if channels:
+        payload["channels"] = list(channels)
+    return _request("POST", "/transaction/initialize", payload)
+
+
+def verify_transaction(reference):
+    """GET /transaction/verify/{reference} — data["status"] is "success" when paid."""
+    return _request("GET", f"/transaction/verify/{reference}")
+
+
+def create_refund(transaction, amount=None, currency="GHS", customer_note=None, merchant_note=None):
+    """POST /refund — amount in pesewas; omit to refund the full transaction."""
+    payload = {"transaction": transaction, "currency": currency}
+    if amount is not None:
+        payload["amount"] = amount
+    if customer_note:
+        payload["customer_note"] = customer_note
+    if merchant_note:
+        payload["merchant_note"] = merchant_note
+    return _request("POST", "/refund", payload)
+
+
+def list_refunds(transaction):
+    """GET /refund?transaction= — refunds already made against a transaction."""
+    return _request("GET", f"/refund?{urlencode({'transaction': transaction})}")
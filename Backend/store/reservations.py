@@ -0,0 +1,203 @@
+"""
+Stock reservations for orders awaiting payment.
+
+Checkout no longer takes stock outright. place_holds() writes a StockHold per
+line that expires after STOCK_HOLD_MINUTES, and adds its quantity to
+ProductVariant.reserved in the same transaction, so what can still be sold
+is simply `stock - reserved` (ProductVariant.available): no per-request sum
+over holds.
+
+    - payment (the order reaching a paid status, see signals.py):
+      commit_order() takes the items out of `stock` and drops the holds
+    - cancellation or deletion: release_order() gives the holds back
+    - expiry: release_expired() cancels orders whose holds lapsed and gives
+      the stock back, in batches; the task worker runs it every minute (see
+      tasks.release_expired_stock_holds). Checkout also expires orders holding the variants it is about
+      to buy.
+    - payment starting: renew_holds() holds the items again for a fresh
+      STOCK_HOLD_MINUTES, or refuses if they have sold in the meantime
+
+`reserved` only changes together with StockHold rows, so delete holds with
+release_holds(), never queryset.delete(). rebuild_reserved() recomputes it
+from the table if something ever bypasses this module.
+
+Availability is in the cached catalog. Each function that moves `stock` or
+`reserved` invalidates the cached responses showing those variants only
+(caching.bump_objects), not the whole catalog.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import caching
+from .instrumentation import log_event
+from .models import Order, ProductVariant, StockHold
+
+PAID_STATUSES = ('paid', 'processing', 'shipped', 'delivered')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def hold_duration():
+    return timedelta(minutes=_setting('STOCK_HOLD_MINUTES', 30))
+
+
+def _shift(field, deltas):
+    """CASE expression adding deltas[variant_id] to `field`, for one UPDATE over many variants."""
+    return Case(
+        *[When(pk=variant_id, then=F(field) + delta) for variant_id, delta in deltas.items() if delta],
+        default=F(field),
+        output_field=IntegerField(),
+    )
+
+
+def place_holds(order, quantities):
+    """
+    Reserve {variant_id: quantity} for `order` with one guarded UPDATE and
+    one INSERT. Returns False, having reserved nothing that will survive, if
+    any variant lacks the available stock: the caller must be inside a
+    transaction and roll it back.
+    """
+    enough = Q()
+    for variant_id, quantity in quantities.items():
+        enough |= Q(pk=variant_id, stock__gte=F('reserved') + quantity)
+    updated = ProductVariant.objects.filter(enough).update(reserved=_shift('reserved', quantities))
+    if updated != len(quantities):
+        return False
+    caching.bump_objects('variants', quantities)
+    expires_at = timezone.now() + hold_duration()
+    StockHold.objects.bulk_create([
+        StockHold(order=order, variant_id=variant_id, quantity=quantity, expires_at=expires_at)
+        for variant_id, quantity in quantities.items()
+    ])
+    return True
+
+
+def release_holds(holds):
+    """Delete the `holds` queryset and give its quantities back. Returns how many were released."""
+    rows = list(holds.values_list('id', 'variant_id', 'quantity'))
+    if not rows:
+        return 0
+    deltas = defaultdict(int)
+    for _, variant_id, quantity in rows:
+        deltas[variant_id] -= quantity
+    StockHold.objects.filter(pk__in=[hold_id for hold_id, _, _ in rows]).delete()
+    ProductVariant.objects.filter(pk__in=deltas).update(reserved=_shift('reserved', deltas))
+    caching.bump_objects('variants', deltas)
+    return len(rows)
+
+
+def release_expired(variant_ids=None, batch_size=500):
+    """
+    Expire unpaid orders whose holds have lapsed (only those holding one of
+    `variant_ids`, if given): give back all their holds and cancel them, so
+    they can no longer be sent to payment. Returns how many were expired.
+    """
+    now = timezone.now()
+    expired = 0
+    while True:
+        with transaction.atomic():
+            lapsed = StockHold.objects.filter(expires_at__lte=now)
+            if variant_ids is not None:
+                lapsed = lapsed.filter(variant_id__in=variant_ids)
+            order_ids = list(lapsed.order_by().values_list('order_id', flat=True).distinct()[:batch_size])
+            # An order locked elsewhere is being paid or cancelled right now; leave it to that
+            orders = list(Order.objects.select_for_update(skip_locked=True).filter(pk__in=order_ids))
+            if orders:
+                release_holds(StockHold.objects.filter(order__in=orders))
+            for order in orders:
+                if order.status == 'pending' and not order.stock_committed:
+                    order.status = 'cancelled'
+                    order.save(update_fields=['status'])
+        expired += len(orders)
+        if not orders or len(order_ids) < batch_size:
+            break
+    return expired
+
+
+class _SoldOut(Exception):
+    """Rolls back a place_holds() that could not hold everything."""
+
+
+@transaction.atomic
+def renew_holds(order):
+    """
+    Hold an unpaid order's items afresh for another STOCK_HOLD_MINUTES
+    before it is sent to payment, whether its holds are live or have lapsed.
+    Returns False, holding nothing, if the stock is no longer there.
+    """
+    if order.stock_committed:
+        return True
+    # Holds are placed and released per order, so live ones are all there:
+    # pushing their expiry back is enough
+    now = timezone.now()
+    if order.stock_holds.filter(expires_at__gt=now).update(expires_at=now + hold_duration()):
+        return True
+    release_holds(order.stock_holds.select_for_update())
+    quantities = defaultdict(int)
+    for variant_id, quantity in order.items.filter(variant__isnull=False).values_list('variant_id', 'quantity'):
+        quantities[variant_id] += quantity
+    try:
+        with transaction.atomic():
+            if quantities and not place_holds(order, quantities):
+                raise _SoldOut
+    except _SoldOut:
+        return False
+    return True
+
+
+@transaction.atomic
+def release_order(order):
+    """Give back whatever `order` still holds (cancelled or deleted before payment)."""
+    return release_holds(order.stock_holds.select_for_update())
+
+
+@transaction.atomic
+def commit_order(order):
+    """
+    Make the sale permanent: take the order's items out of stock and drop its
+    holds, in one UPDATE. Safe to call repeatedly; only the first call for an
+    order does anything. Returns whether this call committed it.
+    """
+    if not Order.objects.filter(pk=order.pk, stock_committed=False).update(stock_committed=True):
+        return False
+    order.stock_committed = True
+
+    held, sold = defaultdict(int), defaultdict(int)
+    for variant_id, quantity in order.stock_holds.select_for_update().values_list('variant_id', 'quantity'):
+        held[variant_id] += quantity
+    for variant_id, quantity in order.items.filter(variant__isnull=False).values_list('variant_id', 'quantity'):
+        sold[variant_id] += quantity
+    ProductVariant.objects.filter(pk__in=set(held) | set(sold)).update(
+        stock=_shift('stock', {variant_id: -quantity for variant_id, quantity in sold.items()}),
+        reserved=_shift('reserved', {variant_id: -quantity for variant_id, quantity in held.items()}),
+    )
+    order.stock_holds.all().delete()
+
+    # Paid after its holds lapsed and someone else bought the last units
+    oversold = list(ProductVariant.objects.filter(pk__in=sold, stock__lt=0).values_list('id', flat=True))
+    if oversold:
+        log_event('stock.oversold', logging.WARNING, order_id=order.pk, variant_ids=oversold)
+    caching.bump_objects('variants', set(held) | set(sold))
+    return True
+
+
+def rebuild_reserved():
+    """Recompute every variant's `reserved` from StockHold. Returns the rows updated."""
+    held = (
+        StockHold.objects.filter(variant=OuterRef('pk')).order_by().values('variant')
+        .annotate(total=Sum('quantity')).values('total')
+    )
+    updated = ProductVariant.objects.update(
+        reserved=Coalesce(Subquery(held, output_field=IntegerField()), Value(0))
+    )
+    caching.bump_version('products')
+    return updated
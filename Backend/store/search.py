@@ -0,0 +1,182 @@
+"""
+Full-text product search.
+
+Every product carries a denormalized `search_document` (category name,
+variant attributes such as color / texture / length / lace type, and the
+description), kept current by signal handlers in store/signals.py.
+
+On PostgreSQL, migration 0022 adds a generated `search_vector` tsvector column
+(title weighted A, search_document weighted B) with a GIN index; queries use
+prefix tsquery terms and are ranked with ts_rank. On other databases (SQLite
+in dev and tests) the same documents feed a pure-Python inverted index held
+in the cache, with the same AND-of-prefixes semantics.
+
+"613 body wave 28" therefore matches a Body Wave product with a 613 / 28"
+variant, and "bod" already matches while the shopper is still typing.
+"""
+import bisect
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Case, IntegerField, When
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+from . import caching
+from .models import Product
+
+SEARCH_CONFIG = 'simple'  # hair jargon and sizes don't stem well
+VARIANT_SEARCH_FIELDS = ('color', 'texture', 'length', 'lace_type', 'density', 'wig_size')
+TITLE_WEIGHT = 1.0
+DOCUMENT_WEIGHT = 0.4
+
+_TOKEN_RE = re.compile(r'[^\W_]+')
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall((text or '').lower())
+
+
+def build_search_document(product):
+    """Text indexed alongside the title: category, variant attributes, description."""
+    parts = []
+    if product.category_id:
+        parts.append(product.category.name)
+    for variant in product.variants.all():
+        parts.extend(str(getattr(variant, field)) for field in VARIANT_SEARCH_FIELDS if getattr(variant, field))
+        if variant.bundle_deal:
+            parts.append(f'{variant.bundle_deal} bundles')
+    parts.append(product.description or '')
+    # Drop repeated words so products with many variants don't outrank others
+    seen, words = set(), []
+    for word in ' '.join(parts).split():
+        if word.lower() not in seen:
+            seen.add(word.lower())
+            words.append(word)
+    return ' '.join(words)
+
+
+def refresh_search_documents(product_ids):
+    """Rebuild search_document for the given products (one UPDATE each)."""
+    products = Product.objects.filter(pk__in=product_ids).select_related('category').prefetch_related('variants')
+    for product in products:
+        Product.objects.filter(pk=product.pk).update(search_document=build_search_document(product))
+
+
+def uses_postgres(queryset):
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+# --- PostgreSQL --------------------------------------------------------------
+
+def _prefix_tsquery(terms):
+    # Tokens are [^\W_]+ so they need no escaping inside quotes
+    return ' & '.join(f"'{term}':*" for term in terms)
+
+
+def _postgres_search(queryset, terms):
+    vector = RawSQL(f'{Product._meta.db_table}.search_vector', [], output_field=SearchVectorField())
+    query = SearchQuery(_prefix_tsquery(terms), config=SEARCH_CONFIG, search_type='raw')
+    return (
+        queryset.alias(search_vector=vector)
+        .filter(search_vector=query)
+        .annotate(search_rank=SearchRank(vector, query))
+        .order_by('-search_rank', '-id')
+    )
+
+
+# --- Python fallback ---------------------------------------------------------
+
+def build_index():
+    """
+    Inverted index over active and inactive products:
+    {'tokens': sorted vocabulary, 'postings': {token: {product_id: weight}}}
+    """
+    postings = defaultdict(dict)
+    for pk, title, document in Product.objects.values_list('id', 'title', 'search_document'):
+        for token in tokenize(document):
+            postings[token][pk] = max(postings[token].get(pk, 0), DOCUMENT_WEIGHT)
+        for token in tokenize(title):
+            postings[token][pk] = TITLE_WEIGHT
+    return {'tokens': sorted(postings), 'postings': dict(postings)}
+
+
+def get_index():
+    key = caching.versioned_key('search', 'index')
+    index = cache.get(key)
+    if index is None:
+        index = build_index()
+        cache.set(key, index, getattr(settings, 'SEARCH_INDEX_CACHE_SECONDS', 300))
+    return index
+
+
+def rank_products(terms, index=None):
+    """Product ids matching every term (as a prefix), best match first."""
+    index = index or get_index()
+    tokens, postings = index['tokens'], index['postings']
+    scores = None
+    for term in terms:
+        term_scores = {}
+        start = bisect.bisect_left(tokens, term)
+        for token in tokens[start:]:
+            if not token.startswith(term):
+                break
+            # Whole-word hits count fully, prefix hits half
+            factor = 1.0 if token == term else 0.5
+            for pk, weight in postings[token].items():
+                term_scores[pk] = max(term_scores.get(pk, 0), weight * factor)
+        if scores is None:
+            scores = term_scores
+        else:
+            scores = {pk: score + term_scores[pk] for pk, score in scores.items() if pk in term_scores}
+        if not scores:
+            return []
+    return sorted(scores, key=lambda pk: (-scores[pk], -pk))
+
+
+def _python_search(queryset, terms):
+    ranked = rank_products(terms)
+    if not ranked:
+        return queryset.none()
+    position = Case(*[When(pk=pk, then=i) for i, pk in enumerate(ranked)], output_field=IntegerField())
+    return queryset.filter(pk__in=ranked).annotate(search_rank=-position).order_by('-search_rank')
+
+
+# --- API ---------------------------------------------------------------------
+
+def search_products(queryset, text):
+    """Filter `queryset` to products matching `text`, ordered by relevance."""
+    terms = tokenize(text)
+    if not terms:
+        return queryset
+    if uses_postgres(queryset):
+        return _postgres_search(queryset, terms)
+    return _python_search(queryset, terms)
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    """
+    ?search=<text> for ProductViewSet, in place of DRF's SearchFilter.
+    An explicit ?ordering= still takes precedence over relevance.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '').strip()
+        if not text:
+            return queryset
+        return search_products(queryset, text)
+
+
+class RelevanceOrderingFilter(OrderingFilter):
+    """OrderingFilter that leaves search results in relevance order unless ?ordering= is given."""
+
+    def get_default_ordering(self, view):
+        request = getattr(view, 'request', None)
+        if request is not None and request.query_params.get(ProductSearchFilter.search_param, '').strip():
+            return None
+        return super().get_default_ordering(view)
@@ -0,0 +1,444 @@
+"""
+Synthetic store data for benchmarks, load tests and query-plan work.
+
+Seeder generates a catalog, customers and order history with shapes close to
+the real store: a handful of parent categories with subcategories, products
+with 1-6 hair variants each, sales, likes and favorites concentrated on a
+minority of popular products, mostly delivered orders spread over the past
+year (a fifth of them guest checkouts, some with a discount code, most
+couriered by Mckot), open carts, and ratings skewed towards 4-5 stars.
+
+Rows are written with bulk_create in chunks, and the large tables are
+generated chunk by chunk too, so memory stays flat at millions of rows.
+Model signals do not fire; run() rebuilds the derived data (product
+counters, search documents, sales rollups) and invalidates the catalog
+cache at the end. The same seed always produces the same data.
+
+    Seeder(seed=42).run(**SCALES['small'])
+
+`python manage.py seed_store` is the command-line front end.
+"""
+import random
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from itertools import accumulate, islice
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.utils import timezone
+from django.utils.text import slugify
+
+from . import caching
+from .reservations import PAID_STATUSES
+from .models import (
+    Address, Cart, CartItem, Category, Delivery, DiscountCode, Favorite, Order, OrderItem, Product,
+    ProductImage, ProductLike, ProductVariant, Review, ShippingMethod,
+)
+
+# Row counts per entity. Variants (~3.5 per product), images (~2.5 per
+# product) and order items (~1.8 per order) follow from these.
+SCALES = {
+    'tiny': dict(products=40, users=30, addresses=40, carts=10, discount_codes=5, orders=200,
+                 deliveries=100, reviews=100, likes=150, favorites=60),
+    'small': dict(products=500, users=1000, addresses=1300, carts=300, discount_codes=20, orders=10_000,
+                  deliveries=5000, reviews=3000, likes=5000, favorites=2000),
+    'full': dict(products=3000, users=20_000, addresses=26_000, carts=5000, discount_codes=50, orders=100_000,
+                 deliveries=50_000, reviews=30_000, likes=60_000, favorites=40_000),
+    'large': dict(products=10_000, users=200_000, addresses=260_000, carts=40_000, discount_codes=200,
+                  orders=1_000_000, deliveries=500_000, reviews=200_000, likes=500_000, favorites=300_000),
+}
+
+CATEGORY_TREE = {
+    'Wigs': ['Lace Front Wigs', 'Full Lace Wigs', 'Headband Wigs', 'Bob Wigs'],
+    'Bundles': ['Straight Bundles', 'Wavy Bundles', 'Curly Bundles'],
+    'Closures & Frontals': ['Closures', 'Frontals'],
+    'Crochet Hair': ['Braids', 'Locs', 'Twists'],
+    'Accessories': ['Wig Care', 'Tools'],
+}
+TEXTURES = ['Straight', 'Bone Straight', 'Body Wave', 'Deep Wave', 'Water Wave', 'Kinky Curly', 'Loose Wave', 'Yaki']
+COLORS = ['1B', '613', '2', '4', '27', '30', '99J', 'Burgundy', 'Ombre 1B/27', 'Ginger']
+LENGTHS = [f'{n}"' for n in range(10, 32, 2)]
+LACE_TYPES = ['HD', 'Transparent', 'Swiss', None]
+DENSITIES = ['150%', '180%', '200%', '250%']
+WIG_SIZES = ['21.5"', '22.5"', '23.5"']
+CITIES = [('Accra', 'Greater Accra'), ('Tema', 'Greater Accra'), ('Kumasi', 'Ashanti'),
+          ('Takoradi', 'Western'), ('Cape Coast', 'Central'), ('Tamale', 'Northern')]
+FIRST_NAMES = ['Ama', 'Akosua', 'Abena', 'Efua', 'Adwoa', 'Yaa', 'Afua', 'Esi', 'Grace', 'Gifty',
+               'Priscilla', 'Nana', 'Kwame', 'Kofi', 'Serwaa', 'Dede', 'Naa', 'Mercy', 'Linda', 'Joyce']
+LAST_NAMES = ['Mensah', 'Owusu', 'Boateng', 'Asante', 'Osei', 'Addo', 'Quaye', 'Ansah', 'Appiah',
+              'Darko', 'Tetteh', 'Agyeman', 'Amoah', 'Ofori', 'Sarpong']
+REVIEW_COMMENTS = ['Love it!', 'Great quality, no shedding.', 'Exactly as pictured.', 'Soft and full.',
+                   'Took a while to arrive but worth it.', 'Lace melted perfectly.', 'A bit thinner than expected.',
+                   'Will buy again.', '']
+# Share of orders by status; most history is delivered
+STATUS_WEIGHTS = {'delivered': 55, 'shipped': 12, 'processing': 8, 'paid': 10, 'pending': 8, 'cancelled': 7}
+DELIVERY_STATUS = {'processing': 'assigned', 'shipped': 'in_transit', 'delivered': 'delivered'}
+RATING_WEIGHTS = [3, 4, 10, 30, 53]  # 1..5 stars
+GUEST_SHARE = 0.2
+DISCOUNT_SHARE = 0.1
+DISCOUNT_PREFIXES = ['WELCOME', 'GLOW', 'SLAY', 'VIP', 'FLASH', 'BUNDLE']
+STREETS = ['Oxford Street', 'Ring Road', 'Liberation Road', 'Spintex Road', 'Lagos Avenue', 'Cantonments Road']
+COURIERS = ['Kwesi Otoo', 'Yaw Badu', 'Ebo Quansah', 'Selasi Agbeko', 'Issah Mahama']
+
+
+@contextmanager
+def historical_timestamps(model, field_name='created_at'):
+    """Let bulk_create keep explicit values for an auto_now_add field."""
+    field = model._meta.get_field(field_name)
+    auto_now_add = field.auto_now_add
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = auto_now_add
+
+
+class Seeder:
+
+    def __init__(self, seed=0, chunk_size=2000, stdout=None, days=365):
+        self.rng = random.Random(seed)
+        self.chunk_size = chunk_size
+        self.stdout = stdout
+        self.days = days
+        self.now = timezone.now()
+        self._weights = {}
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def bulk_create(self, model, objects):
+        """bulk_create in chunks; returns the saved objects (with pks)."""
+        created = []
+        for start in range(0, len(objects), self.chunk_size):
+            created += model.objects.bulk_create(objects[start:start + self.chunk_size])
+        self.log(f'  {model.__name__}: {len(created)}')
+        return created
+
+    def stream(self, model, objects):
+        """bulk_create from an iterable, one chunk in memory at a time; returns the row count."""
+        objects, count = iter(objects), 0
+        while chunk := list(islice(objects, self.chunk_size)):
+            model.objects.bulk_create(chunk)
+            count += len(chunk)
+        self.log(f'  {model.__name__}: {count}')
+        return count
+
+    def past(self, max_days=None):
+        """A random moment in the last `max_days` days, busier towards now."""
+        days = (max_days or self.days) * (self.rng.random() ** 1.5)
+        return self.now - timedelta(days=days)
+
+    def popular(self, items, k):
+        """k picks from items with a long-tail (Zipf-like) popularity."""
+        # Cumulative weights make each pick a bisect rather than a pass over items
+        cum_weights = self._weights.get(len(items))
+        if cum_weights is None:
+            cum_weights = self._weights[len(items)] = list(accumulate(1 / (rank + 1) ** 0.9 for rank in range(len(items))))
+        return self.rng.choices(items, cum_weights=cum_weights, k=k)
+
+    def pairs(self, count, users, products):
+        """Up to `count` distinct (user, product) pairs, favouring popular products."""
+        seen = set()
+        if not users or not products:
+            return
+        for _ in range(count * 2):
+            if len(seen) >= count:
+                return
+            user, product = self.rng.choice(users), self.popular(products, 1)[0]
+            if (user.pk, product.pk) not in seen:
+                seen.add((user.pk, product.pk))
+                yield user, product
+
+    def phone(self):
+        return f'0{self.rng.choice((20, 24, 26, 27, 50, 54, 55, 59))}{self.rng.randrange(10 ** 7):07d}'
+
+    # --- Entities ---------------------------------------------------------
+
+    def categories(self):
+        categories = []
+        for order, (parent_name, children) in enumerate(CATEGORY_TREE.items()):
+            parent = Category(name=parent_name, slug=slugify(parent_name), is_nav_link=True, nav_order=order)
+            categories.append(parent)
+        parents = self.bulk_create(Category, categories)
+        children = [
+            Category(name=name, slug=slugify(name), parent=parent, nav_order=i)
+            for parent, names in zip(parents, CATEGORY_TREE.values())
+            for i, name in enumerate(names)
+        ]
+        return self.bulk_create(Category, children)
+
+    def shipping_methods(self):
+        return self.bulk_create(ShippingMethod, [
+            ShippingMethod(name='Standard Delivery', price=Decimal('25.00')),
+            ShippingMethod(name='Express Delivery', price=Decimal('60.00')),
+            ShippingMethod(name='Store Pickup', price=Decimal('0.00')),
+        ])
+
+    def products(self, count, categories):
+        rng = self.rng
+        products, textures = [], []
+        for i in range(count):
+            texture = rng.choice(TEXTURES)
+            textures.append(texture)
+            category = rng.choice(categories)
+            kind = category.name.rstrip('s')
+            products.append(Product(
+                title=f'{texture} {kind} #{i + 1}',
+                description=f'{texture} {category.name.lower()} made from 100% virgin human hair. '
+                            f'Pre-plucked, bleached knots, can be dyed and restyled.',
+                category=category,
+                base_price=Decimal(rng.randrange(120, 2500, 10)),
+                is_active=rng.random() > 0.03,
+            ))
+        products = self.bulk_create(Product, products)
+
+        variants, images = [], []
+        for product, texture in zip(products, textures):
+            for _ in range(rng.randint(1, 6)):
+                is_wig = 'Wig' in product.title
+                variants.append(ProductVariant(
+                    product=product,
+                    length=rng.choice(LENGTHS),
+                    color=rng.choice(COLORS),
+                    texture=texture,
+                    bundle_deal=None if is_wig else rng.choice([1, 3, 4]),
+                    wig_size=rng.choice(WIG_SIZES) if is_wig else None,
+                    lace_type=rng.choice(LACE_TYPES) if is_wig else None,
+                    density=rng.choice(DENSITIES) if is_wig else None,
+                    price=product.base_price + Decimal(rng.randrange(0, 600, 10)),
+                    stock=rng.choice([0, 2, 5, 10, 25, 50, 100]),
+                ))
+            for position in range(rng.randint(1, 4)):
+                images.append(ProductImage(
+                    product=product, image=f'seed/products/{product.pk}_{position}', is_main=position == 0,
+                ))
+        self.bulk_create(ProductVariant, variants)
+        self.bulk_create(ProductImage, images)
+        return products
+
+    def users(self, count, prefix='customer'):
+        password = make_password('password123')  # hashing once keeps this fast
+        users = []
+        for i in range(count):
+            first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+            users.append(User(
+                username=f'{prefix}{i + 1}', email=f'{prefix}{i + 1}@example.com', password=password,
+                first_name=first, last_name=last, date_joined=self.past(),
+            ))
+        return self.bulk_create(User, users)
+
+    def addresses(self, count, users):
+        """Every customer up to `count` gets a default address; the rest are extras."""
+        rng = self.rng
+        if not users:
+            return {}
+        owners = rng.sample(users, min(count, len(users)))
+        owners += rng.choices(users, k=count - len(owners))
+
+        def build():
+            has_default = set()
+            for user in owners:
+                city, region = rng.choice(CITIES)
+                yield Address(
+                    user=user, full_name=user.get_full_name(), phone_number=self.phone(),
+                    address_line=f'{rng.randint(1, 250)} {rng.choice(STREETS)}', city=city, region=region,
+                    is_default=user.pk not in has_default,
+                )
+                has_default.add(user.pk)
+
+        self.stream(Address, build())
+        by_user = defaultdict(list)
+        for user_id, address_id in Address.objects.filter(user__in=owners).values_list('user_id', 'id').iterator():
+            by_user[user_id].append(address_id)
+        return by_user
+
+    def carts(self, count, users):
+        rng = self.rng
+        variant_ids = list(ProductVariant.objects.filter(product__is_active=True, stock__gt=0).values_list('id', flat=True))
+        carts = self.bulk_create(Cart, [Cart(user=user) for user in rng.sample(users, min(count, len(users)))])
+        self.stream(CartItem, (
+            CartItem(cart=cart, variant_id=variant_id, quantity=rng.choices([1, 2, 3], weights=[75, 20, 5])[0])
+            for cart in carts
+            for variant_id in set(self.popular(variant_ids, rng.randint(1, 5)))
+        ))
+        return carts
+
+    def discount_codes(self, count):
+        rng = self.rng
+        codes = []
+        for i in range(count):
+            percentage = rng.random() < 0.7
+            valid_from = self.past()
+            codes.append(DiscountCode(
+                code=f'{rng.choice(DISCOUNT_PREFIXES)}{i + 1}',
+                description='Seeded promotion',
+                discount_type='percentage' if percentage else 'fixed',
+                discount_value=Decimal(rng.choice([5, 10, 15, 20, 25]) if percentage else rng.choice([10, 20, 50, 100])),
+                min_purchase_amount=Decimal(rng.choice([0, 0, 200, 500])),
+                max_discount_amount=Decimal(rng.choice([100, 200])) if percentage and rng.random() < 0.5 else None,
+                is_active=rng.random() > 0.2,
+                valid_from=valid_from,
+                valid_until=valid_from + timedelta(days=rng.choice([7, 30, 90])) if rng.random() < 0.6 else None,
+            ))
+        return self.bulk_create(DiscountCode, codes)
+
+    def orders(self, count, users, shipping_methods, addresses=None, discount_codes=()):
+        """
+        Orders and their items, one chunk at a time. Registered customers'
+        orders ship to one of their addresses; guests' carry it inline.
+        """
+        rng = self.rng
+        addresses = addresses or {}
+        variants = list(ProductVariant.objects.filter(product__is_active=True).values_list('id', 'price'))
+        rng.shuffle(variants)
+        statuses, weights = zip(*STATUS_WEIGHTS.items())
+        redemptions = Counter()
+        order_count = item_count = 0
+
+        for start in range(0, count, self.chunk_size):
+            orders, lines = [], []
+            for n in range(start, min(count, start + self.chunk_size)):
+                guest = rng.random() < GUEST_SHARE
+                user = None if guest else rng.choice(users)
+                city, region = rng.choice(CITIES)
+                shipping = rng.choice(shipping_methods)
+                items = []
+                for variant_id, price in self.popular(variants, rng.choices([1, 2, 3, 4], weights=[50, 30, 15, 5])[0]):
+                    quantity = rng.choices([1, 2, 3], weights=[80, 15, 5])[0]
+                    items.append((variant_id, quantity, price * quantity))
+                subtotal = sum(total for _, _, total in items)
+                code, discount = None, Decimal('0')
+                if discount_codes and rng.random() < DISCOUNT_SHARE:
+                    code = rng.choice(discount_codes)
+                    discount = code.calculate_discount(subtotal).quantize(Decimal('0.01'))
+                    redemptions[code.pk] += 1
+                name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+                status = rng.choices(statuses, weights=weights)[0]
+                user_addresses = addresses.get(user.pk) if user else None
+                orders.append(Order(
+                    user=user,
+                    is_guest=guest,
+                    guest_email=f'guest{n + 1}@example.com' if guest else None,
+                    guest_name=name if guest else None,
+                    guest_address_full_name=name if guest else None,
+                    guest_address_phone=self.phone() if guest else None,
+                    guest_address_line=f'{rng.randint(1, 250)} {rng.choice(STREETS)}' if guest else None,
+                    guest_address_city=city if guest else None,
+                    guest_address_region=region if guest else None,
+                    address_id=rng.choice(user_addresses) if user_addresses else None,
+                    subtotal=subtotal,
+                    discount_code=code,
+                    discount_amount=discount,
+                    shipping_method=shipping,
+                    shipping_cost=shipping.price,
+                    total=subtotal - discount + shipping.price,
+                    status=status,
+                    # Seeded stock levels are already net of paid history
+                    stock_committed=status in PAID_STATUSES,
+                    created_at=self.past(),
+                ))
+                lines.append(items)
+
+            with historical_timestamps(Order):
+                orders = Order.objects.bulk_create(orders)
+            items = [
+                OrderItem(order=order, variant_id=variant_id, quantity=quantity, item_total=total)
+                for order, order_lines in zip(orders, lines)
+                for variant_id, quantity, total in order_lines
+            ]
+            OrderItem.objects.bulk_create(items, batch_size=self.chunk_size)
+            order_count += len(orders)
+            item_count += len(items)
+
+        for code in discount_codes:
+            if redemptions[code.pk]:
+                code.times_used = redemptions[code.pk]
+                if code.usage_limit is not None:
+                    code.usage_limit = max(code.usage_limit, code.times_used)
+                code.save(update_fields=['times_used', 'usage_limit'])
+        self.log(f'  Order: {order_count}')
+        self.log(f'  OrderItem: {item_count}')
+        return order_count
+
+    def deliveries(self, count):
+        """Mckot deliveries for up to `count` of the shipped-to-door orders."""
+        rng = self.rng
+        eligible = list(
+            Order.objects.filter(status__in=DELIVERY_STATUS, shipping_cost__gt=0)
+            .order_by('id').values_list('id', 'status', 'created_at')
+        )
+        chosen = sorted(rng.sample(eligible, min(count, len(eligible))))
+
+        def build():
+            for order_id, status, created_at in chosen:
+                fee = Decimal(rng.randrange(2000, 9000)) / 100
+                yield Delivery(
+                    order_id=order_id,
+                    mckot_delivery_id=f'dlv_{rng.getrandbits(48):012x}',
+                    status=DELIVERY_STATUS[status],
+                    collection_status='not_required',
+                    ride_type_id=1,
+                    ride_type_label='Motorbike',
+                    delivery_fee=fee,
+                    distance_km=Decimal(rng.randrange(100, 3500)) / 100,
+                    duration_minutes=rng.randint(10, 90),
+                    courier_name=rng.choice(COURIERS),
+                    courier_phone=self.phone(),
+                    dropoff_lat=Decimal(f'{rng.uniform(5.53, 5.72):.6f}'),
+                    dropoff_lng=Decimal(f'{rng.uniform(-0.30, -0.05):.6f}'),
+                    created_at=created_at + timedelta(hours=rng.randint(1, 48)),
+                )
+
+        with historical_timestamps(Delivery):
+            return self.stream(Delivery, build())
+
+    def reviews(self, count, users, products):
+        rng = self.rng
+        return self.stream(Review, (
+            Review(user=user, product=product, rating=rng.choices(range(1, 6), weights=RATING_WEIGHTS)[0],
+                   comment=rng.choice(REVIEW_COMMENTS))
+            for user, product in self.pairs(count, users, products)
+        ))
+
+    def likes(self, count, users, products):
+        return self.stream(ProductLike, (
+            ProductLike(user=user, product=product) for user, product in self.pairs(count, users, products)
+        ))
+
+    def favorites(self, count, users, products):
+        with historical_timestamps(Favorite):
+            return self.stream(Favorite, (
+                Favorite(user=user, product=product, created_at=self.past())
+                for user, product in self.pairs(count, users, products)
+            ))
+
+    # --- Everything ---------------------------------------------------------
+
+    def run(self, products, users, orders, reviews, likes, addresses=0, carts=0, discount_codes=0,
+            deliveries=0, favorites=0):
+        self.log('Seeding store data')
+        categories = self.categories()
+        shipping_methods = self.shipping_methods()
+        product_rows = self.products(products, categories)
+        codes = self.discount_codes(discount_codes)
+        user_rows = self.users(users)
+        address_ids = self.addresses(addresses, user_rows)
+        self.carts(carts, user_rows)
+        self.orders(orders, user_rows, shipping_methods, address_ids, codes)
+        self.deliveries(deliveries)
+        self.reviews(reviews, user_rows, product_rows)
+        self.likes(likes, user_rows, product_rows)
+        self.favorites(favorites, user_rows, product_rows)
+        self.rebuild_derived()
+
+    def rebuild_derived(self):
+        """Recompute what signals would have maintained for non-bulk writes."""
+        for command in ('rebuild_product_counters', 'rebuild_search_index', 'rebuild_sales_rollups'):
+            call_command(command, stdout=self.stdout or StringIO())
+        for resource in ('categories', 'products', 'shipping-methods'):
+            caching.bump_version(resource)
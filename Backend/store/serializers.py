@@ -1,6 +1,11 @@
+import logging
+
 from rest_framework import serializers
 from .models import Category, Product, ProductVariant, ProductImage, Order, OrderItem, Cart, CartItem, Address, ShippingMethod, Favorite, ProductLike, HeroSlide, PromoBanner, Review, DiscountCode, ReturnRequest, Delivery
+from . import carts
+from .instrumentation import log_event
 from django.conf import settings
+from django.db.models import prefetch_related_objects
 from urllib.parse import urljoin
 
 
@@ -22,10 +27,30 @@ class CategorySerializer(serializers.ModelSerializer):
         return None 
     
     def get_subcategories(self, obj):
-        subcats = obj.subcategories.all().order_by('nav_order', 'name')
+        # When the view has loaded the whole tree up front (see
+        # build_category_children), walk that instead of querying per node.
+        children = self.context.get('category_children')
+        if children is not None:
+            subcats = children.get(obj.id, [])
+        else:
+            subcats = obj.subcategories.all()  # Meta.ordering is nav_order, name
         return CategorySerializer(subcats, many=True, context=self.context).data
 
 
+def build_category_children(categories=None):
+    """
+    Map parent id -> ordered list of child categories, built from a single
+    query. Pass it as the 'category_children' serializer context so nested
+    CategorySerializers don't hit the database once per node.
+    """
+    if categories is None:
+        categories = Category.objects.all()
+    children = {}
+    for category in categories:
+        children.setdefault(category.parent_id, []).append(category)
+    return children
+
+
 class ProductImageSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
 
@@ -42,13 +67,16 @@ class ProductImageSerializer(serializers.ModelSerializer):
 
 
 class ProductVariantSerializer(serializers.ModelSerializer):
+    # stock minus what unpaid orders are holding
+    available = serializers.IntegerField(read_only=True)
+
     class Meta:
         model = ProductVariant
         fields = [
             'id',
             'product',
             'length', 'color', 'texture', 'bundle_deal', 'wig_size', 'lace_type', 'density',
-            'price', 'stock'
+            'price', 'stock', 'available'
         ]
 
 
@@ -69,48 +97,41 @@ class ProductSerializer(serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     variants = ProductVariantSerializer(many=True, read_only=True)
     images = ProductImageSerializer(many=True, read_only=True)
-    like_count = serializers.SerializerMethodField()
+    like_count = serializers.IntegerField(read_only=True)
     is_liked = serializers.SerializerMethodField()
     reviews = ReviewSerializer(many=True, read_only=True)
     average_rating = serializers.SerializerMethodField()
-    review_count = serializers.SerializerMethodField()
+    review_count = serializers.IntegerField(source='rating_count', read_only=True)
     can_review = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
         fields = ['id', 'title', 'description', 'category', 'base_price', 'is_active', 'variants', 'images', 'like_count', 'is_liked', 'reviews', 'average_rating', 'review_count', 'can_review']
 
-    def get_like_count(self, obj):
-        return obj.likes.count()
-
     def get_is_liked(self, obj):
+        if hasattr(obj, 'liked_by_user'):
+            return obj.liked_by_user
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return ProductLike.objects.filter(user=request.user, product=obj).exists()
         return False
 
     def get_average_rating(self, obj):
-        reviews = obj.reviews.all()
-        if reviews.exists():
-            return round(sum(review.rating for review in reviews) / reviews.count(), 1)
-        return 0.0
-
-    def get_review_count(self, obj):
-        return obj.reviews.count()
+        return round(float(obj.rating_avg), 1)
 
     def get_can_review(self, obj):
+        if hasattr(obj, 'user_can_review'):
+            return obj.user_can_review
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return False
-        # Check if user has purchased this product
-        user_orders = Order.objects.filter(user=request.user, status__in=['paid', 'processing', 'shipped', 'delivered'])
-        for order in user_orders:
-            for item in order.items.all():
-                if item.variant and item.variant.product == obj:
-                    # Check if user hasn't already reviewed this product
-                    if not Review.objects.filter(user=request.user, product=obj).exists():
-                        return True
-        return False
+        # User must have purchased this product and not reviewed it yet
+        has_purchased = OrderItem.objects.filter(
+            order__user=request.user,
+            order__status__in=['paid', 'processing', 'shipped', 'delivered'],
+            variant__product=obj,
+        ).exists()
+        return has_purchased and not Review.objects.filter(user=request.user, product=obj).exists()
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -135,9 +156,10 @@ class OrderSerializer(serializers.ModelSerializer):
 
 class CartItemSerializer(serializers.ModelSerializer):
     variant = ProductVariantSerializer(read_only=True)
-    variant_id = serializers.PrimaryKeyRelatedField(
-        queryset=ProductVariant.objects.all(), source='variant', write_only=True
-    )
+    # Checked against the database for the whole cart at once in
+    # CartSerializer.validate_items, not one query per line.
+    variant_id = serializers.IntegerField(write_only=True)
+    quantity = serializers.IntegerField(min_value=0, required=False, default=1)
 
     class Meta:
         model = CartItem
@@ -145,7 +167,7 @@ class CartItemSerializer(serializers.ModelSerializer):
 
 
 class CartSerializer(serializers.ModelSerializer):
-    user = serializers.ReadOnlyField(source='user.username')
+    user = serializers.ReadOnlyField(source='user.username', default=None)  # None for guest carts
     items = CartItemSerializer(many=True)
     total_price = serializers.SerializerMethodField()
 
@@ -153,89 +175,39 @@ class CartSerializer(serializers.ModelSerializer):
         model = Cart
         fields = ['id', 'user', 'items', 'total_price']
 
-    def get_total_price(self, obj):
-        total = 0
-        for item in obj.items.all():
-            total += item.variant.price * item.quantity
-        return total
-
-    def create(self, validated_data):
-        items_data = validated_data.pop('items')
-        user = validated_data.get('user')
+    def validate_items(self, items):
+        wanted = carts.quantities(items)
+        known = set(ProductVariant.objects.filter(id__in=wanted).values_list('id', flat=True))
+        missing = sorted(set(wanted) - known)
+        if missing:
+            raise serializers.ValidationError(f"Invalid product variant ID(s): {', '.join(map(str, missing))}")
+        return wanted
 
-        # Prevent duplicate cart error — get or create cart
-        cart, created = Cart.objects.get_or_create(user=user)
+    def to_representation(self, instance):
+        # Lines and their variants in one query (no-op if the view prefetched them)
+        prefetch_related_objects([instance], carts.items_prefetch())
+        return super().to_representation(instance)
 
-        # Clear existing items if cart already existed
-        if not created:
-            cart.items.all().delete()
-
-        # Add items fresh
-        for item_data in items_data:
-            CartItem.objects.create(cart=cart, **item_data)
+    def get_total_price(self, obj):
+        return carts.cart_total(obj)
 
+    def create(self, validated_data):
+        # One cart per user: posting again replaces its contents
+        cart, _ = Cart.objects.get_or_create(user=validated_data['user'])
+        carts.sync_items(cart, validated_data['items'])
         return cart
 
     def update(self, instance, validated_data):
-        items_data = validated_data.pop('items')
-        instance.save()
+        # The client sends the whole cart; apply only what changed
+        if 'items' in validated_data:
+            carts.sync_items(instance, validated_data['items'])
+        return instance
 
-        # Process each item - items_data comes from nested serializer validation
-        # variant_id should already be transformed to variant object via source='variant'
-        keep_items = []
-        processed_variants = set()  # Track variants we've processed
-        
-        for item_data in items_data:
-            item_id = item_data.get('id', None)
-            quantity = item_data.get('quantity', 1)
-            variant = item_data.get('variant')  # Should be ProductVariant object after nested validation
-            
-            if not variant:
-                continue  # Skip if variant is missing
-            
-            # Track that we've processed this variant
-            variant_id = variant.id if hasattr(variant, 'id') else variant
-            processed_variants.add(variant_id)
-            
-            if item_id:
-                # Try to update existing item by ID
-                try:
-                    item = CartItem.objects.get(id=item_id, cart=instance)
-                    # Update quantity to the value provided (frontend sends total quantity)
-                    item.quantity = quantity
-                    item.save()
-                    keep_items.append(item.id)
-                except CartItem.DoesNotExist:
-                    # Item ID doesn't exist, check if variant already exists
-                    try:
-                        existing_item = CartItem.objects.get(cart=instance, variant=variant)
-                        # Update quantity to the value provided (frontend sends total quantity)
-                        existing_item.quantity = quantity
-                        existing_item.save()
-                        keep_items.append(existing_item.id)
-                    except CartItem.DoesNotExist:
-                        # Create new item
-                        item = CartItem.objects.create(cart=instance, variant=variant, quantity=quantity)
-                        keep_items.append(item.id)
-            else:
-                # New item without ID - check if variant already exists in cart
-                try:
-                    existing_item = CartItem.objects.get(cart=instance, variant=variant)
-                    # Variant already exists - frontend sends total quantity, so use it directly
-                    existing_item.quantity = quantity
-                    existing_item.save()
-                    keep_items.append(existing_item.id)
-                except CartItem.DoesNotExist:
-                    # Variant doesn't exist, create new item
-                    item = CartItem.objects.create(cart=instance, variant=variant, quantity=quantity)
-                keep_items.append(item.id)
-
-        # Remove items not included in the update (items that weren't in the request)
-        for item in instance.items.all():
-            if item.id not in keep_items:
-                item.delete()
 
-        return instance
+class CartItemQuantitySerializer(serializers.Serializer):
+    """Body of PATCH /api/cart/items/: set one variant's quantity (0 removes it)."""
+    variant_id = serializers.PrimaryKeyRelatedField(queryset=ProductVariant.objects.all(), source='variant')
+    quantity = serializers.IntegerField(min_value=0)
 
 
 class OrderItemDetailSerializer(serializers.ModelSerializer):
@@ -252,8 +224,10 @@ class OrderItemDetailSerializer(serializers.ModelSerializer):
     def get_product(self, obj):
         if obj.variant and obj.variant.product:
             product = obj.variant.product
-            images = product.images.all()[:1]
-            request = self.context.get('request')
+            # first_images is prefetched by the order views
+            images = getattr(product, 'first_images', None)
+            if images is None:
+                images = product.images.all()[:1]
             image_urls = []
             for img in images:
                 if img.image:
@@ -265,26 +239,32 @@ class OrderItemDetailSerializer(serializers.ModelSerializer):
             }
         return None
 
-    def get_has_review(self, obj):
+    def _review(self, obj):
+        """The requesting user's review of this order item, or None."""
         request = self.context.get('request')
-        if request and request.user.is_authenticated and obj.variant and obj.variant.product:
-            return Review.objects.filter(
+        if not (request and request.user.is_authenticated and obj.variant and obj.variant.product):
+            return None
+        # When the view has loaded the reviews up front (see
+        # build_order_item_reviews), answer from that instead of querying.
+        reviews = self.context.get('order_item_reviews')
+        if reviews is not None:
+            review = reviews.get(obj.id)
+            return review if review and review.product_id == obj.variant.product_id else None
+        if not hasattr(obj, '_user_review'):
+            obj._user_review = Review.objects.filter(
                 user=request.user,
                 product=obj.variant.product,
                 order_item=obj
-            ).exists()
-        return False
+            ).first()
+        return obj._user_review
+
+    def get_has_review(self, obj):
+        return self._review(obj) is not None
 
     def get_review(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated and obj.variant and obj.variant.product:
-            review = Review.objects.filter(
-                user=request.user,
-                product=obj.variant.product,
-                order_item=obj
-            ).first()
-            if review:
-                return ReviewSerializer(review, context=self.context).data
+        review = self._review(obj)
+        if review:
+            return ReviewSerializer(review, context=self.context).data
         return None
 
     def get_can_review(self, obj):
@@ -297,11 +277,19 @@ class OrderItemDetailSerializer(serializers.ModelSerializer):
         if obj.order.status not in ['paid', 'processing', 'shipped', 'delivered']:
             return False
         # Check if user hasn't already reviewed
-        return not Review.objects.filter(
-            user=request.user,
-            product=obj.variant.product,
-            order_item=obj
-        ).exists()
+        return self._review(obj) is None
+
+
+def build_order_item_reviews(user, order_items):
+    """
+    Map order item id -> `user`'s review of it, built from a single query.
+    Pass it as the 'order_item_reviews' serializer context so
+    OrderItemDetailSerializer doesn't look reviews up once per item.
+    """
+    if not user.is_authenticated:
+        return {}
+    reviews = Review.objects.filter(user=user, order_item__in=[item.id for item in order_items]).select_related('user')
+    return {review.order_item_id: review for review in reviews}
 
 
 class OrderDetailSerializer(serializers.ModelSerializer):
@@ -422,9 +410,7 @@ class ReturnRequestSerializer(serializers.ModelSerializer):
                 'created_at': obj.order.created_at.isoformat() if obj.order and hasattr(obj.order, 'created_at') else None,
             }
         except Exception as e:
-            import traceback
-            print(f"Error in get_order_details for ReturnRequest {obj.id}: {e}")
-            traceback.print_exc()
+            log_event("return_request.order_details_failed", logging.ERROR, return_request_id=obj.id, error=str(e))
             return {
                 'id': None,
                 'total': 0.0,
@@ -601,7 +587,7 @@ class DeliverySerializer(serializers.ModelSerializer):
         fields = [
             'id', 'status', 'collection_status', 'ride_type_label',
             'delivery_fee', 'distance_km', 'duration_minutes',
-            'courier_name', 'courier_phone', 'tracking_url',
+            'courier_name', 'courier_phone', 'tracking_url', 'status_history',
             'created_at', 'updated_at'
         ]
         read_only_fields = fields
\ No newline at end of file
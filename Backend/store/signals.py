@@ -0,0 +1,218 @@
+"""
+Model signal handlers. Connected in StoreConfig.ready().
+"""
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import analytics, caching, reservations, search
+from .models import (
+    Category, DiscountCode, HeroSlide, Order, OrderItem, Product, ProductImage,
+    ProductLike, ProductVariant, PromoBanner, Review, ShippingMethod,
+)
+
+
+# ============================
+# PRODUCT COUNTERS
+# ============================
+# Product.like_count and the rating stats follow every like and review row,
+# including admin bulk deletes and cascades from a deleted user or order
+# item, which never go through the API views.
+
+@receiver(post_save, sender=ProductLike)
+def count_saved_like(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        Product.objects.filter(pk=instance.product_id).update(like_count=F('like_count') + 1)
+
+
+@receiver(post_delete, sender=ProductLike)
+def count_deleted_like(sender, instance, **kwargs):
+    Product.objects.filter(pk=instance.product_id, like_count__gt=0).update(like_count=F('like_count') - 1)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def refresh_review_stats(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    with transaction.atomic():
+        # Lock the product row so concurrent review changes recompute in turn
+        product = Product.objects.select_for_update().filter(pk=instance.product_id).first()
+        if product:
+            product.refresh_rating_stats()
+
+
+# ============================
+# SALES ROLLUPS
+# ============================
+# Any change that can move a figure on the sales dashboard queues a re-roll
+# of the affected day (one job per day, see analytics.schedule_rollup). Bulk
+# queryset .update() calls bypass these; run `manage.py rebuild_sales_rollups`
+# after one.
+
+ROLLUP_ORDER_FIELDS = {'status', 'total', 'discount_amount', 'discount_code', 'created_at'}
+
+
+def _order_day(order):
+    return timezone.localdate(order.created_at) if order.created_at else None
+
+
+def _schedule_days(days):
+    for day in set(days):
+        if day is not None:
+            analytics.schedule_rollup(day)
+
+
+@receiver(post_save, sender=Order)
+def rollup_saved_order(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not ROLLUP_ORDER_FIELDS.intersection(update_fields):
+        return
+    _schedule_days([_order_day(instance)])
+
+
+@receiver(post_delete, sender=Order)
+def rollup_deleted_order(sender, instance, **kwargs):
+    _schedule_days([_order_day(instance)])
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def rollup_order_item(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    order = Order.objects.filter(pk=instance.order_id).only('created_at').first()
+    if order:
+        _schedule_days([_order_day(order)])
+
+
+def _days_of(orders):
+    return [timezone.localdate(created_at) for created_at in orders.values_list('created_at', flat=True).distinct()]
+
+
+@receiver(pre_delete, sender=DiscountCode)
+def rollup_discount_code_orders(sender, instance, **kwargs):
+    # Deleting a code nulls Order.discount_code in bulk, dropping those
+    # orders out of the discount figures
+    _schedule_days(_days_of(Order.objects.filter(discount_code=instance)))
+
+
+@receiver(pre_delete, sender=ProductVariant)
+def rollup_variant_orders(sender, instance, **kwargs):
+    # Deleting a variant nulls OrderItem.variant, moving its sales to
+    # "Unknown Product"
+    _schedule_days(_days_of(Order.objects.filter(items__variant=instance)))
+
+
+# ============================
+# STOCK HOLDS
+# ============================
+# Payment makes an order's held stock a sale; cancelling or deleting it
+# before then gives the holds back (see reservations.py).
+
+@receiver(post_save, sender=Order)
+def settle_order_stock(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if instance.status in reservations.PAID_STATUSES and not instance.stock_committed:
+        reservations.commit_order(instance)
+    elif instance.status == 'cancelled':
+        reservations.release_order(instance)
+
+
+@receiver(pre_delete, sender=Order)
+def release_deleted_order_stock(sender, instance, **kwargs):
+    reservations.release_order(instance)
+
+
+# ============================
+# RESPONSE CACHES
+# ============================
+
+# Each receiver bumps the version of every cached resource whose payload the
+# model appears in. Product payloads nest their category, variants, images
+# and reviews. ProductLike is left out on purpose: likes come from signed-in
+# users (who bypass the cache) and a stale anonymous like_count is harmless
+# until the entry expires. Stock and holds move through .update(), and
+# reservations.py invalidates just the affected variants itself.
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_tree(sender, **kwargs):
+    caching.bump_version('categories')
+    caching.bump_version('products')
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_products(sender, **kwargs):
+    caching.bump_version('products')
+
+
+@receiver(post_save, sender=HeroSlide)
+@receiver(post_delete, sender=HeroSlide)
+def invalidate_hero_slides(sender, **kwargs):
+    caching.bump_version('hero-slides')
+
+
+@receiver(post_save, sender=PromoBanner)
+@receiver(post_delete, sender=PromoBanner)
+def invalidate_promo_banners(sender, **kwargs):
+    caching.bump_version('promo-banners')
+
+
+@receiver(post_save, sender=ShippingMethod)
+@receiver(post_delete, sender=ShippingMethod)
+def invalidate_shipping_methods(sender, **kwargs):
+    caching.bump_version('shipping-methods')
+
+
+# ============================
+# SEARCH INDEX
+# ============================
+# Product.search_document is rebuilt whenever something it is made of
+# changes; on PostgreSQL the generated search_vector follows it. The
+# 'search' version bump drops the Python fallback index.
+
+SEARCH_PRODUCT_FIELDS = {'title', 'description', 'category', 'is_active'}
+
+
+@receiver(post_save, sender=Product)
+def index_saved_product(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not SEARCH_PRODUCT_FIELDS.intersection(update_fields):
+        return
+    search.refresh_search_documents([instance.pk])
+    caching.bump_version('search')
+
+
+@receiver(post_delete, sender=Product)
+def unindex_deleted_product(sender, **kwargs):
+    caching.bump_version('search')
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def index_variant_product(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.refresh_search_documents([instance.product_id])
+    caching.bump_version('search')
+
+
+@receiver(post_save, sender=Category)
+def index_category_products(sender, instance, raw=False, created=False, **kwargs):
+    if raw or created:
+        return
+    search.refresh_search_documents(instance.product_set.values_list('pk', flat=True))
+    caching.bump_version('search')
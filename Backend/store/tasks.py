@@ -0,0 +1,331 @@
+"""
+Background jobs for slow work that shouldn't hold up a request (SMTP,
+third-party APIs).
+
+Call sites enqueue a registered task by name with JSON-serializable args:
+
+    from . import tasks
+    tasks.enqueue("send_order_confirmation_email", order.id)
+
+The backend is chosen by settings.BACKGROUND_TASKS_BACKEND:
+
+    "database"  - store a BackgroundJob row; `manage.py run_task_worker`
+                  claims and runs it. Works locally without Redis.
+    "thread"    - run on an in-process thread pool (development).
+    "immediate" - run synchronously once the transaction commits (tests).
+
+Any other value is treated as a dotted path to a backend class with an
+enqueue(task_name, args, kwargs, max_attempts) method.
+
+Failed attempts are retried with jittered exponential backoff; a job that
+exhausts its attempts is kept as a BackgroundJob with status "dead".
+
+Housekeeping tasks registered with @task(every=<seconds>) are enqueued by
+run_task_worker on that interval, so they need no cron entry.
+"""
+import logging
+import random
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from django.utils.module_loading import import_string
+
+from . import analytics, carts, email_utils, reservations, webhooks
+from .models import BackgroundJob, Order
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+_periodic = {}
+
+
+def task(func=None, *, name=None, every=None):
+    """
+    Register a function so it can be enqueued by name. With `every`
+    (seconds), run_task_worker also enqueues it on that interval.
+    """
+    def decorator(f):
+        _registry[name or f.__name__] = f
+        if every:
+            _periodic[name or f.__name__] = every
+        return f
+    return decorator(func) if func else decorator
+
+
+def get_task(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f"Unknown background task: {name}")
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def retry_delay(attempt):
+    """Seconds to wait before retrying after `attempt` failures (1-based)."""
+    base = _setting("BACKGROUND_TASKS_RETRY_BASE_SECONDS", 10)
+    cap = _setting("BACKGROUND_TASKS_RETRY_MAX_SECONDS", 3600)
+    delay = min(base * (2 ** (attempt - 1)), cap)
+    return delay * random.uniform(0.5, 1.5)
+
+
+def _error_text(exc):
+    return "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))[-4000:]
+
+
+# --- Backends --------------------------------------------------------------
+
+class DatabaseBackend:
+    """Persist jobs as BackgroundJob rows for run_task_worker to pick up."""
+
+    def enqueue(self, task_name, args, kwargs, max_attempts):
+        # Written in the caller's transaction, so the job only becomes
+        # visible to workers if the surrounding work commits.
+        BackgroundJob.objects.create(
+            task_name=task_name, args=args, kwargs=kwargs, max_attempts=max_attempts
+        )
+
+
+class ImmediateBackend:
+    """Run the task in the calling thread once the transaction commits."""
+
+    def enqueue(self, task_name, args, kwargs, max_attempts):
+        transaction.on_commit(
+            lambda: _run_with_retries(task_name, args, kwargs, max_attempts, sleep=False),
+            robust=True,
+        )
+
+
+class ThreadBackend:
+    """Run tasks on a process-local thread pool. Jobs are lost on restart."""
+    _executor = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def executor(cls):
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=_setting("BACKGROUND_TASKS_THREAD_WORKERS", 4),
+                    thread_name_prefix="store-task",
+                )
+            return cls._executor
+
+    def enqueue(self, task_name, args, kwargs, max_attempts):
+        transaction.on_commit(
+            lambda: self.executor().submit(_run_in_thread, task_name, args, kwargs, max_attempts),
+            robust=True,
+        )
+
+
+def _run_in_thread(task_name, args, kwargs, max_attempts):
+    close_old_connections()
+    try:
+        _run_with_retries(task_name, args, kwargs, max_attempts, sleep=True)
+    finally:
+        close_old_connections()
+
+
+def _run_with_retries(task_name, args, kwargs, max_attempts, sleep):
+    """In-process retry loop; records a dead job if every attempt fails."""
+    for attempt in range(1, max_attempts + 1):
+        try:
+            get_task(task_name)(*args, **kwargs)
+            return
+        except Exception as exc:
+            logger.warning("Task %s failed (attempt %s/%s): %s", task_name, attempt, max_attempts, exc)
+            if attempt == max_attempts:
+                BackgroundJob.objects.create(
+                    task_name=task_name, args=args, kwargs=kwargs, status="dead",
+                    attempts=attempt, max_attempts=max_attempts, last_error=_error_text(exc),
+                )
+                logger.error("Task %s moved to dead letter after %s attempts", task_name, attempt)
+            elif sleep:
+                time.sleep(retry_delay(attempt))
+
+
+_BACKENDS = {
+    "database": DatabaseBackend,
+    "thread": ThreadBackend,
+    "immediate": ImmediateBackend,
+}
+
+
+def get_backend():
+    name = _setting("BACKGROUND_TASKS_BACKEND", "database")
+    backend_class = _BACKENDS.get(name) or import_string(name)
+    return backend_class()
+
+
+def enqueue(task_name, *args, max_attempts=None, **kwargs):
+    """Queue a registered task. Args and kwargs must be JSON-serializable."""
+    get_task(task_name)  # fail fast on typos at the call site
+    if max_attempts is None:
+        max_attempts = _setting("BACKGROUND_TASKS_MAX_ATTEMPTS", 5)
+    get_backend().enqueue(task_name, list(args), kwargs, max_attempts)
+
+
+def enqueue_once(task_name, *args):
+    """
+    Queue a task unless the same call is already waiting in the BackgroundJob
+    table, so a burst of requests for the same work runs it once. Returns
+    whether a job was queued.
+    """
+    if BackgroundJob.objects.filter(task_name=task_name, args=list(args), status="pending").exists():
+        return False
+    enqueue(task_name, *args)
+    return True
+
+
+# --- Database worker -------------------------------------------------------
+
+def claim_jobs(limit=10):
+    """
+    Claim up to `limit` due jobs for this worker. Uses SKIP LOCKED where the
+    database supports it so several workers can share the queue.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            BackgroundJob.objects.select_for_update(skip_locked=True)
+            .filter(status="pending", run_at__lte=now)
+            .order_by("run_at")[:limit]
+        )
+        if jobs:
+            BackgroundJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status="running", locked_at=now
+            )
+    return jobs
+
+
+def requeue_stale_jobs(older_than_seconds=None):
+    """Return jobs whose worker died mid-run to the queue."""
+    if older_than_seconds is None:
+        older_than_seconds = _setting("BACKGROUND_TASKS_STALE_SECONDS", 600)
+    cutoff = timezone.now() - timedelta(seconds=older_than_seconds)
+    return BackgroundJob.objects.filter(status="running", locked_at__lt=cutoff).update(
+        status="pending", locked_at=None
+    )
+
+
+def enqueue_periodic(last_run, now=None):
+    """
+    Enqueue each periodic task whose interval has passed since `last_run`
+    ({task name: time.monotonic()}, updated in place), unless a job for it is
+    already queued or running, as it will be when several workers share the
+    queue. Returns the names enqueued.
+    """
+    now = time.monotonic() if now is None else now
+    due = [name for name, every in _periodic.items() if now - last_run.get(name, float("-inf")) >= every]
+    if not due:
+        return []
+    queued = set(
+        BackgroundJob.objects.filter(task_name__in=due, status__in=["pending", "running"])
+        .values_list("task_name", flat=True)
+    )
+    for name in due:
+        last_run[name] = now
+        if name not in queued:
+            BackgroundJob.objects.create(
+                task_name=name, max_attempts=_setting("BACKGROUND_TASKS_MAX_ATTEMPTS", 5)
+            )
+    return [name for name in due if name not in queued]
+
+
+def run_job(job):
+    """Run one claimed job; delete it on success, reschedule or bury it on failure."""
+    job.attempts += 1
+    try:
+        get_task(job.task_name)(*job.args, **job.kwargs)
+    except Exception as exc:
+        job.last_error = _error_text(exc)
+        job.locked_at = None
+        if job.attempts >= job.max_attempts:
+            job.status = "dead"
+            logger.error("Job %s (%s) moved to dead letter after %s attempts", job.pk, job.task_name, job.attempts)
+        else:
+            job.status = "pending"
+            job.run_at = timezone.now() + timedelta(seconds=retry_delay(job.attempts))
+            logger.warning("Job %s (%s) failed, retrying at %s: %s", job.pk, job.task_name, job.run_at, exc)
+        job.save(update_fields=["attempts", "last_error", "locked_at", "status", "run_at", "updated_at"])
+        return False
+    job.delete()
+    return True
+
+
+# --- Tasks -----------------------------------------------------------------
+# Tasks take ids rather than model instances so they serialize cleanly and
+# always work on fresh rows.
+
+@task
+def send_order_confirmation_email(order_id):
+    email_utils.send_order_confirmation_email(Order.objects.get(pk=order_id), fail_silently=False)
+
+
+@task
+def send_order_status_update_email(order_id):
+    email_utils.send_order_status_update_email(Order.objects.get(pk=order_id), fail_silently=False)
+
+
+@task
+def process_paystack_event(event_id):
+    verified = webhooks.verify_paystack_event(event_id)
+    if verified is None:
+        return  # already handled by an earlier attempt
+    with transaction.atomic():
+        order = webhooks.apply_paystack_event(event_id, verified)
+        if order is not None:
+            enqueue("send_order_status_update_email", order.id)
+            enqueue("book_order_delivery", order.id)
+
+
+@task(every=5 * 60)  # also retries events that arrived before their delivery was booked
+def apply_mckot_events():
+    applied, updated = webhooks.apply_mckot_events()
+    if applied:
+        logger.info("Applied %s Mckot events to %s deliveries", applied, updated)
+
+
+@task
+def rollup_sales_day(day):
+    analytics.rollup_day(date.fromisoformat(day))
+
+
+@task
+def book_order_delivery(order_id):
+    from .views import book_delivery_for_order  # views imports this module
+    book_delivery_for_order(Order.objects.select_related("delivery").get(pk=order_id))
+
+
+@task
+def send_password_reset_email(user_id, reset_token=None):
+    # The token is made here rather than passed in, so it never sits in
+    # BackgroundJob.args. `reset_token` only arrives from jobs queued before
+    # that change, and is ignored in favour of a fresh one.
+    user = User.objects.get(pk=user_id)
+    reset_token = f"{urlsafe_base64_encode(force_bytes(user.pk))}:{default_token_generator.make_token(user)}"
+    email_utils.send_password_reset_email(user, reset_token, fail_silently=False)
+
+
+@task(every=24 * 60 * 60)
+def purge_guest_carts():
+    purged = carts.purge_guest_carts()
+    logger.info("Purged %s expired guest carts", purged)
+
+
+@task(every=60)
+def release_expired_stock_holds():
+    expired = reservations.release_expired()
+    logger.info("Expired %s unpaid orders", expired)
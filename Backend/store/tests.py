@@ -1,3 +1,1624 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import re
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import cloudinary
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import CommandError, call_command
+from django.core.signals import request_started
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import analytics, cache_backends, carts, instrumentation, mckot, paystack, reservations, tasks, webhooks
+from . import db as db_checks
+from .benchmarks import runner, scenarios
+from .benchmarks.fakes import FakeServices
+from .cache_backends import TieredCache
+from .models import BackgroundJob, DailySalesRollup, Delivery, Favorite, Category, Product, ProductVariant, ProductImage, ProductLike, Review, Order, OrderItem, Cart, CartItem, Address, ShippingMethod, DiscountCode, MckotEvent, PaystackEvent, ReturnRequest, StockHold
+from .seeding import SCALES, Seeder
+
+
+# Image URLs are built locally from the public id; no API calls are made.
+cloudinary.config(cloud_name='test-cloud')
+
+
+class ProductListQueryCountTests(TestCase):
+    """The product list must cost the same number of queries at any size."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='shopper', password='pass1234')
+        root = Category.objects.create(name='Wigs')
+        child = Category.objects.create(name='Lace Front', parent=root)
+        Category.objects.create(name='HD Lace', parent=child)
+        self.category = child
+
+    def _make_products(self, count):
+        start = Product.objects.count()
+        for i in range(start, start + count):
+            product = Product.objects.create(title=f'Product {i}', category=self.category, base_price=Decimal('100'))
+            variant = ProductVariant.objects.create(product=product, price=Decimal('120'), stock=5, color='1B')
+            ProductVariant.objects.create(product=product, price=Decimal('150'), stock=5, color='613')
+            ProductImage.objects.create(product=product, image='products/sample')
+            buyer = User.objects.create(username=f'buyer{i}')
+            order = Order.objects.create(user=buyer, status='paid', total=Decimal('120'))
+            item = OrderItem.objects.create(order=order, variant=variant, quantity=1, item_total=Decimal('120'))
+            Review.objects.create(user=buyer, product=product, order_item=item, rating=4)
+            ProductLike.objects.create(user=buyer, product=product)
+        call_command('rebuild_product_counters', stdout=StringIO())
+
+    def _count_queries(self, authenticated=False):
+        if authenticated:
+            self.client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/products/')
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_query_count_is_constant(self):
+        self._make_products(2)
+        small, _ = self._count_queries()
+        self._make_products(10)
+        large, response = self._count_queries()
+        self.assertEqual(small, large)
+        self.assertEqual(len(response.json()['results']), 12)
+
+    def test_anonymous_list_query_count(self):
+        self._make_products(5)
+        # products (+category join, like count), category tree, variants, images, reviews (+user)
+        with self.assertNumQueries(5):
+            response = self.client.get('/api/products/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_authenticated_list_query_count(self):
+        self._make_products(5)
+        self.client.force_authenticate(self.user)
+        with self.assertNumQueries(5):
+            response = self.client.get('/api/products/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_serialized_values(self):
+        self._make_products(1)
+        buyer = User.objects.get(username='buyer0')
+        self.client.force_authenticate(buyer)
+        data = self.client.get('/api/products/').json()['results'][0]
+        self.assertEqual(data['like_count'], 1)
+        self.assertTrue(data['is_liked'])
+        self.assertEqual(data['review_count'], 1)
+        self.assertEqual(data['average_rating'], 4.0)
+        self.assertFalse(data['can_review'])  # already reviewed
+        self.assertEqual(data['category']['subcategories'][0]['name'], 'HD Lace')
+
+
+class OrderQueryCountTests(TestCase):
+    """Order history and detail must not query per order or per item."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='shopper', password='pass1234')
+        self.client.force_authenticate(self.user)
+        self.address = Address.objects.create(user=self.user, full_name='Ama Mensah', phone_number='0244000000',
+                                              address_line='12 Oxford Street', city='Accra', region='Greater Accra')
+        self.shipping = ShippingMethod.objects.create(name='Standard', price=Decimal('25'))
+
+    def _make_order(self, items):
+        order = Order.objects.create(user=self.user, status='delivered', total=Decimal('100'),
+                                     address=self.address, shipping_method=self.shipping)
+        for i in range(items):
+            product = Product.objects.create(title=f'Wig {order.id}-{i}', base_price=Decimal('100'))
+            ProductImage.objects.create(product=product, image=f'products/{product.id}_0')
+            ProductImage.objects.create(product=product, image=f'products/{product.id}_1')
+            variant = ProductVariant.objects.create(product=product, price=Decimal('100'))
+            OrderItem.objects.create(order=order, variant=variant, quantity=1, item_total=Decimal('100'))
+        return order
+
+    def _count(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.json()
+
+    def test_history_query_count_is_constant(self):
+        self._make_order(1)
+        small, _ = self._count('/api/orders/history/')
+        for _ in range(5):
+            self._make_order(3)
+        large, data = self._count('/api/orders/history/')
+        self.assertEqual(small, large)
+        self.assertEqual(len(data['results']), 6)
+
+    def test_detail_query_count_is_constant(self):
+        small, _ = self._count(f'/api/orders/{self._make_order(1).id}/')
+        large, data = self._count(f'/api/orders/{self._make_order(8).id}/')
+        self.assertEqual(small, large)
+        self.assertEqual(len(data['items']), 8)
+        self.assertEqual(len(data['items'][0]['product']['images']), 1)
+
+    def test_detail_review_flags(self):
+        order = self._make_order(2)
+        reviewed, open_item = order.items.order_by('id')
+        Review.objects.create(user=self.user, product=reviewed.variant.product, order_item=reviewed, rating=5)
+        other = User.objects.create_user(username='other', password='pass1234')
+        Review.objects.create(user=other, product=open_item.variant.product, order_item=open_item, rating=1)
+        items = {item['id']: item for item in self.client.get(f'/api/orders/{order.id}/').json()['items']}
+        self.assertEqual((items[reviewed.id]['has_review'], items[reviewed.id]['can_review']), (True, False))
+        self.assertEqual(items[reviewed.id]['review']['rating'], 5)
+        self.assertEqual((items[open_item.id]['has_review'], items[open_item.id]['can_review']), (False, True))
+        self.assertIsNone(items[open_item.id]['review'])
+
+
+class PaginationTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        for i in range(5):
+            Product.objects.create(title=f'Product {i}', base_price=Decimal('10'))
+
+    def test_cursor_pages_walk_newest_first(self):
+        first = self.client.get('/api/products/', {'page_size': 2}).json()
+        self.assertNotIn('count', first)
+        self.assertEqual([p['title'] for p in first['results']], ['Product 4', 'Product 3'])
+        second = self.client.get(first['next']).json()
+        self.assertEqual([p['title'] for p in second['results']], ['Product 2', 'Product 1'])
+
+    def test_page_number_mode_for_admin(self):
+        data = self.client.get('/api/products/', {'page': 2, 'page_size': 2}).json()
+        self.assertEqual(data['count'], 5)
+        self.assertEqual([p['title'] for p in data['results']], ['Product 2', 'Product 1'])
+
+    def test_page_size_is_bounded(self):
+        for i in range(5, 120):
+            Product.objects.create(title=f'Product {i}', base_price=Decimal('10'))
+        data = self.client.get('/api/products/', {'page_size': 1000}).json()
+        self.assertEqual(len(data['results']), 100)
+
+
+class ProductCounterTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(username='buyer')
+        self.product = Product.objects.create(title='Body Wave', base_price=Decimal('100'))
+        variant = ProductVariant.objects.create(product=self.product, price=Decimal('100'), stock=5)
+        order = Order.objects.create(user=self.user, status='paid', total=Decimal('100'))
+        self.item = OrderItem.objects.create(order=order, variant=variant, quantity=1, item_total=Decimal('100'))
+        self.client.force_authenticate(self.user)
+
+    def test_like_toggle_updates_like_count(self):
+        url = f'/api/products/{self.product.id}/like/'
+        self.client.post(url)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.like_count, 1)
+        self.client.post(url)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.like_count, 0)
+
+    def test_review_create_and_delete_update_rating(self):
+        response = self.client.post('/api/reviews/', {'product': self.product.id, 'rating': 4}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.rating_avg), (1, Decimal('4.00')))
+        self.client.delete(f"/api/reviews/{response.json()['id']}/")
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.rating_avg), (0, Decimal('0.00')))
+
+    def test_bulk_and_cascade_deletes_update_counters(self):
+        other = User.objects.create(username='other')
+        Review.objects.create(user=self.user, product=self.product, order_item=self.item, rating=5)
+        Review.objects.create(user=other, product=self.product, rating=2)
+        ProductLike.objects.create(user=self.user, product=self.product)
+        ProductLike.objects.create(user=other, product=self.product)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.like_count, self.product.rating_count), (2, 2))
+
+        # Admin "delete selected" is a queryset delete
+        Review.objects.filter(user=other).delete()
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.rating_avg), (1, Decimal('5.00')))
+        # Deleting a user cascades to their likes and reviews
+        self.user.delete()
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.like_count, self.product.rating_count), (1, 0))
+
+    def test_rebuild_command(self):
+        other = User.objects.create(username='other')
+        Review.objects.create(user=self.user, product=self.product, rating=5)
+        Review.objects.create(user=other, product=self.product, rating=2)
+        ProductLike.objects.create(user=other, product=self.product)
+        Product.objects.update(like_count=0, rating_count=0, rating_avg=0)  # drifted by a raw import
+        call_command('rebuild_product_counters', stdout=StringIO())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.like_count, 1)
+        self.assertEqual(self.product.rating_count, 2)
+        self.assertEqual(self.product.rating_avg, Decimal('3.50'))
+
+
+def _guest_checkout_payload(shipping_method, items, **extra):
+    payload = {
+        'guest_email': 'guest@example.com',
+        'guest_name': 'Guest',
+        'guest_address': {'full_name': 'Guest', 'phone_number': '0200000000', 'address_line': '1 Road', 'city': 'Accra', 'region': 'Greater Accra'},
+        'shipping_method_id': shipping_method.id,
+        'cart_items': items,
+    }
+    payload.update(extra)
+    return payload
+
+
+class CartSyncTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='shopper', password='pass1234')
+        self.client.force_authenticate(self.user)
+        product = Product.objects.create(title='Wig', base_price=Decimal('100'))
+        self.variants = [ProductVariant.objects.create(product=product, price=Decimal(10 * (i + 1)), stock=50)
+                         for i in range(12)]
+        self.cart = Cart.objects.create(user=self.user)
+
+    def _put(self, lines):
+        items = [{'variant_id': self.variants[i].id, 'quantity': q} for i, q in lines]
+        return self.client.put(f'/api/cart/{self.cart.id}/', {'items': items}, format='json')
+
+    def _lines(self):
+        index = {v.id: i for i, v in enumerate(self.variants)}
+        return {index[v]: q for v, q in self.cart.items.values_list('variant_id', 'quantity')}
+
+    def test_put_applies_the_diff(self):
+        self._put([(0, 1), (1, 2), (2, 3)])
+        keep = self.cart.items.get(variant=self.variants[0]).id
+        response = self._put([(0, 1), (1, 5), (3, 1), (3, 2)])  # later duplicate wins
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._lines(), {0: 1, 1: 5, 3: 2})
+        self.assertTrue(self.cart.items.filter(id=keep).exists())  # untouched lines keep their row
+        self.assertEqual(Decimal(str(response.json()['total_price'])), Decimal('10') + 5 * Decimal('20') + 2 * Decimal('40'))
+
+    def test_put_query_count_is_constant(self):
+        # Each write removes one line, changes one and adds the rest
+        self._put([(0, 1), (1, 1)])
+        with CaptureQueriesContext(connection) as small:
+            self._put([(1, 2), (2, 1)])
+        self._put([(0, 1), (1, 1)])
+        with CaptureQueriesContext(connection) as large:
+            self._put([(1, 2)] + [(i, 3) for i in range(2, 12)])
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(len(self._lines()), 11)
+
+    def test_unknown_variant_is_rejected(self):
+        response = self.client.put(f'/api/cart/{self.cart.id}/', {'items': [{'variant_id': 999999, 'quantity': 1}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('999999', str(response.json()))
+
+    def test_patch_sets_one_line(self):
+        self._put([(0, 1), (1, 1)])
+        response = self.client.patch('/api/cart/items/', {'variant_id': self.variants[1].id, 'quantity': 4}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._lines(), {0: 1, 1: 4})
+        self.client.patch('/api/cart/items/', {'variant_id': self.variants[5].id, 'quantity': 1}, format='json')
+        response = self.client.patch('/api/cart/items/', {'variant_id': self.variants[0].id, 'quantity': 0}, format='json')
+        self.assertEqual(self._lines(), {1: 4, 5: 1})
+        self.assertEqual(len(response.json()['items']), 2)
+
+
+class GuestCartTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        product = Product.objects.create(title='Wig', base_price=Decimal('100'))
+        self.v1 = ProductVariant.objects.create(product=product, price=Decimal('100'), stock=10)
+        self.v2 = ProductVariant.objects.create(product=product, price=Decimal('50'), stock=10)
+        self.shipping = ShippingMethod.objects.create(name='Standard', price=Decimal('25'))
+
+    def _create(self, items):
+        response = self.client.post('/api/cart/guest/', {'items': items}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def test_create_read_update_with_token(self):
+        data = self._create([{'variant_id': self.v1.id, 'quantity': 2}])
+        self.assertIsNone(data['user'])
+        headers = {'HTTP_X_CART_TOKEN': data['token']}
+        response = self.client.put('/api/cart/guest/', {'items': [{'variant_id': self.v2.id, 'quantity': 1}]},
+                                   format='json', **headers)
+        self.assertEqual([i['variant']['id'] for i in response.json()['items']], [self.v2.id])
+        self.client.patch('/api/cart/items/', {'variant_id': self.v1.id, 'quantity': 3}, format='json', **headers)
+        data = self.client.get('/api/cart/guest/', **headers).json()
+        self.assertEqual(Decimal(str(data['total_price'])), Decimal('350'))
+
+    def test_bad_or_expired_token_is_rejected(self):
+        token = self._create([{'variant_id': self.v1.id, 'quantity': 1}])['token']
+        self.assertEqual(self.client.get('/api/cart/guest/', HTTP_X_CART_TOKEN=token + 'x').status_code, 404)
+        with override_settings(GUEST_CART_TTL_DAYS=0):
+            time.sleep(1.1)  # signatures have one-second resolution
+            self.assertEqual(self.client.get('/api/cart/guest/', HTTP_X_CART_TOKEN=token).status_code, 404)
+
+    def test_purge_deletes_idle_guest_carts_only(self):
+        self._create([{'variant_id': self.v1.id, 'quantity': 1}])
+        fresh = self._create([{'variant_id': self.v1.id, 'quantity': 1}])
+        user_cart = Cart.objects.create(user=User.objects.create_user(username='shopper', password='pass1234'))
+        Cart.objects.exclude(id=fresh['id']).update(updated_at=timezone.now() - timedelta(days=31))
+        self.assertEqual(carts.purge_guest_carts(batch_size=1), 1)
+        self.assertEqual(set(Cart.objects.values_list('id', flat=True)), {fresh['id'], user_cart.id})
+        self.assertEqual(CartItem.objects.count(), 1)
+
+    def test_login_merges_guest_cart(self):
+        user = User.objects.create_user(username='shopper', password='pass1234')
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.create(cart=cart, variant=self.v1, quantity=1)
+        token = self._create([{'variant_id': self.v1.id, 'quantity': 3}, {'variant_id': self.v2.id, 'quantity': 1}])['token']
+        response = self.client.post('/api/token/', {'username': 'shopper', 'password': 'pass1234', 'cart_token': token},
+                                    format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.json())
+        self.assertEqual(dict(cart.items.values_list('variant_id', 'quantity')), {self.v1.id: 3, self.v2.id: 1})
+        self.assertFalse(Cart.objects.filter(user__isnull=True).exists())
+
+    def test_guest_checkout_from_token(self):
+        token = self._create([{'variant_id': self.v1.id, 'quantity': 2}])['token']
+        response = self.client.post('/api/checkout/', {
+            'guest_email': 'guest@example.com', 'guest_name': 'Guest',
+            'guest_address': {'full_name': 'Guest', 'phone_number': '0244000000', 'address_line': '1 Main St',
+                              'city': 'Accra', 'region': 'Greater Accra'},
+            'shipping_method_id': self.shipping.id, 'cart_token': token,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['subtotal'], '200.00')
+        self.assertFalse(Cart.objects.exists())
+        self.v1.refresh_from_db()
+        self.assertEqual((self.v1.stock, self.v1.available), (10, 8))
+
+
+class CheckoutTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.shipping = ShippingMethod.objects.create(name='Standard', price=Decimal('20'))
+        product = Product.objects.create(title='Kinky Curly', base_price=Decimal('100'))
+        self.v1 = ProductVariant.objects.create(product=product, price=Decimal('100'), stock=3)
+        self.v2 = ProductVariant.objects.create(product=product, price=Decimal('50'), stock=1)
+
+    def _guest_checkout(self, items):
+        return self.client.post('/api/checkout/', _guest_checkout_payload(self.shipping, items), format='json')
+
+    def test_guest_checkout_creates_items_and_holds_stock(self):
+        response = self._guest_checkout([
+            {'variant_id': self.v1.id, 'quantity': 2},
+            {'variant_id': self.v2.id, 'quantity': 1},
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Decimal(response.json()['total']), Decimal('270'))
+        order = Order.objects.get(id=response.json()['order_id'])
+        self.assertEqual(order.items.count(), 2)
+        self.v1.refresh_from_db()
+        self.v2.refresh_from_db()
+        self.assertEqual((self.v1.stock, self.v1.available, self.v2.available), (3, 1, 0))
+        self.assertEqual(order.stock_holds.count(), 2)
+
+    def test_insufficient_stock_rolls_back(self):
+        response = self._guest_checkout([
+            {'variant_id': self.v1.id, 'quantity': 1},
+            {'variant_id': self.v2.id, 'quantity': 2},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Order.objects.count(), 0)
+        self.assertFalse(StockHold.objects.exists())
+        self.v1.refresh_from_db()
+        self.assertEqual(self.v1.reserved, 0)
+
+    def test_authenticated_checkout_clears_cart(self):
+        user = User.objects.create(username='shopper', email='shopper@example.com')
+        address = Address.objects.create(user=user, full_name='Shopper', phone_number='020', address_line='2 Road', city='Accra', region='GA')
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.create(cart=cart, variant=self.v1, quantity=3)
+        self.client.force_authenticate(user)
+        response = self.client.post('/api/checkout/', {'address_id': address.id, 'shipping_method_id': self.shipping.id}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(cart.items.exists())
+        self.v1.refresh_from_db()
+        self.assertEqual(self.v1.available, 0)
+
+
+class StockHoldTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.shipping = ShippingMethod.objects.create(name='Standard', price=Decimal('20'))
+        product = Product.objects.create(title='Bone Straight', base_price=Decimal('100'))
+        self.variant = ProductVariant.objects.create(product=product, price=Decimal('100'), stock=2)
+
+    def _checkout(self, quantity=2):
+        payload = _guest_checkout_payload(self.shipping, [{'variant_id': self.variant.id, 'quantity': quantity}])
+        return self.client.post('/api/checkout/', payload, format='json')
+
+    def _expire_holds(self):
+        StockHold.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+
+    def test_held_stock_blocks_the_next_checkout(self):
+        self.assertEqual(self._checkout().status_code, 201)
+        response = self._checkout(quantity=1)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Available: 0', response.json()['error'])
+
+    def _initialize(self, order):
+        data = {'authorization_url': 'https://checkout.paystack.test/x', 'access_code': 'x', 'reference': 'x'}
+        with mock.patch.object(paystack, 'initialize_transaction', return_value=data):
+            return self.client.post(f'/api/paystack/initiate/{order.id}/', {'guest_email': order.guest_email},
+                                    format='json')
+
+    def test_sweeper_expires_orders_whose_holds_lapsed(self):
+        order = Order.objects.get(id=self._checkout().json()['order_id'])
+        self._expire_holds()
+        out = StringIO()
+        call_command('release_stock_holds', stdout=out)
+        self.assertIn('Expired 1 unpaid orders', out.getvalue())
+        self.variant.refresh_from_db()
+        self.assertEqual((self.variant.stock, self.variant.reserved), (2, 0))
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'cancelled')
+        self.assertEqual(self._initialize(order).status_code, 409)
+
+    def test_checkout_reclaims_expired_holds(self):
+        first = Order.objects.get(id=self._checkout().json()['order_id'])
+        self._expire_holds()
+        self.assertEqual(self._checkout().status_code, 201)
+        self.assertFalse(first.stock_holds.exists())
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'cancelled')
+        self.variant.refresh_from_db()
+        self.assertEqual(self.variant.reserved, 2)
+
+    def test_initialize_renews_lapsed_holds(self):
+        order = Order.objects.get(id=self._checkout().json()['order_id'])
+        self._expire_holds()
+        self.assertEqual(self._initialize(order).status_code, 200)
+        self.assertTrue(order.stock_holds.filter(expires_at__gt=timezone.now()).exists())
+        self.variant.refresh_from_db()
+        self.assertEqual(self.variant.reserved, 2)
+
+    def test_initialize_refuses_an_order_whose_stock_sold(self):
+        order = Order.objects.get(id=self._checkout().json()['order_id'])
+        reservations.release_order(order)  # lapsed and reclaimed, but not yet swept
+        ProductVariant.objects.filter(pk=self.variant.pk).update(stock=1)
+        self.assertEqual(self._initialize(order).status_code, 409)
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'cancelled')
+        self.variant.refresh_from_db()
+        self.assertEqual(self.variant.reserved, 0)
+
+    def test_payment_commits_stock_once(self):
+        order = Order.objects.get(id=self._checkout().json()['order_id'])
+        order.status = 'paid'
+        order.save()
+        order.status = 'processing'
+        order.save()
+        self.assertFalse(reservations.commit_order(order))
+        self.variant.refresh_from_db()
+        self.assertEqual((self.variant.stock, self.variant.reserved), (0, 0))
+        self.assertFalse(order.stock_holds.exists())
+
+    def test_cancelling_releases_the_hold(self):
+        order = Order.objects.get(id=self._checkout().json()['order_id'])
+        order.status = 'cancelled'
+        order.save()
+        self.variant.refresh_from_db()
+        self.assertEqual((self.variant.stock, self.variant.available), (2, 2))
+
+    def test_rebuild_reserved_matches_open_holds(self):
+        self._checkout(quantity=1)
+        ProductVariant.objects.update(reserved=7)
+        reservations.rebuild_reserved()
+        self.variant.refresh_from_db()
+        self.assertEqual(self.variant.reserved, 1)
+
+
+class DiscountRedemptionTests(TestCase):
+
+    def test_redeem_stops_at_usage_limit(self):
+        code = DiscountCode.objects.create(code='LIMIT3', discount_value=Decimal('10'), usage_limit=3)
+        results = [code.redeem() for _ in range(5)]
+        self.assertEqual(results, [True, True, True, False, False])
+        code.refresh_from_db()
+        self.assertEqual(code.times_used, 3)
+
+    def test_unlimited_code_always_redeems(self):
+        code = DiscountCode.objects.create(code='OPEN', discount_value=Decimal('10'))
+        self.assertTrue(all(code.redeem() for _ in range(3)))
+        self.assertEqual(code.times_used, 3)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentDiscountRedemptionTests(TransactionTestCase):
+    """
+    Needs a database with row locks (PostgreSQL); SQLite has none and skips it.
+    Each buyer takes a different variant, so only the discount code's row
+    lock stands between them.
+    """
+    LIMIT = 5
+    BUYERS = 20
+
+    def test_parallel_checkouts_redeem_exactly_the_limit(self):
+        shipping = ShippingMethod.objects.create(name='Standard', price=Decimal('20'))
+        product = Product.objects.create(title='Flash Sale Wig', base_price=Decimal('100'))
+        variants = [
+            ProductVariant.objects.create(product=product, length=f'{10 + i}"', price=Decimal('100'), stock=1)
+            for i in range(self.BUYERS)
+        ]
+        code = DiscountCode.objects.create(
+            code='FLASH', discount_type='fixed', discount_value=Decimal('10'), usage_limit=self.LIMIT
+        )
+        barrier = threading.Barrier(self.BUYERS)
+        statuses = []
+
+        def buy(variant):
+            payload = _guest_checkout_payload(
+                shipping, [{'variant_id': variant.id, 'quantity': 1}], discount_code='FLASH'
+            )
+            try:
+                barrier.wait()
+                statuses.append(APIClient().post('/api/checkout/', payload, format='json').status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buy, args=(variant,)) for variant in variants]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        code.refresh_from_db()
+        self.assertEqual(statuses.count(201), self.LIMIT)
+        self.assertEqual(statuses.count(400), self.BUYERS - self.LIMIT)
+        self.assertEqual(code.times_used, self.LIMIT)
+        self.assertEqual(Order.objects.filter(discount_code=code).count(), self.LIMIT)
+
+
+_flaky_calls = []
+
+
+@tasks.task(name='test_flaky')
+def _flaky_task(fail_times):
+    _flaky_calls.append(fail_times)
+    if len(_flaky_calls) <= fail_times:
+        raise RuntimeError('SMTP timeout')
+
+
+@override_settings(BACKGROUND_TASKS_BACKEND='database')
+class BackgroundJobTests(TestCase):
+
+    def setUp(self):
+        _flaky_calls.clear()
+
+    def _claim_one(self):
+        BackgroundJob.objects.update(run_at=timezone.now())
+        jobs = tasks.claim_jobs()
+        self.assertEqual(len(jobs), 1)
+        return jobs[0]
+
+    def test_job_is_retried_with_backoff_then_succeeds(self):
+        tasks.enqueue('test_flaky', 1)
+        self.assertFalse(tasks.run_job(self._claim_one()))
+        job = BackgroundJob.objects.get()
+        self.assertEqual((job.status, job.attempts), ('pending', 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertEqual(tasks.claim_jobs(), [])  # not due yet
+        self.assertTrue(tasks.run_job(self._claim_one()))
+        self.assertFalse(BackgroundJob.objects.exists())
+
+    def test_exhausted_job_is_kept_as_dead_letter(self):
+        tasks.enqueue('test_flaky', 99, max_attempts=2)
+        tasks.run_job(self._claim_one())
+        tasks.run_job(self._claim_one())
+        job = BackgroundJob.objects.get()
+        self.assertEqual((job.status, job.attempts), ('dead', 2))
+        self.assertIn('SMTP timeout', job.last_error)
+
+    def test_periodic_tasks_are_queued_once_per_interval(self):
+        last_run = {}
+        self.assertIn('release_expired_stock_holds', tasks.enqueue_periodic(last_run, now=1000))
+        self.assertEqual(tasks.enqueue_periodic(last_run, now=1030), [])  # not due yet
+        # Due again, but the first job hasn't run: another worker must not queue a second
+        self.assertEqual(tasks.enqueue_periodic({}, now=1030), [])
+        self.assertEqual(BackgroundJob.objects.filter(task_name='release_expired_stock_holds').count(), 1)
+        BackgroundJob.objects.all().delete()
+        self.assertEqual(tasks.enqueue_periodic(last_run, now=1060), ['release_expired_stock_holds'])
+
+    def test_password_reset_is_queued_not_sent(self):
+        User.objects.create(username='forgetful', email='forgetful@example.com')
+        response = APIClient().post('/api/password/reset/request/', {'email': 'forgetful@example.com'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+        job = BackgroundJob.objects.get(task_name='send_password_reset_email')
+        self.assertEqual(job.args, [User.objects.get(username='forgetful').pk])  # no token at rest
+        call_command('run_task_worker', once=True, stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertFalse(BackgroundJob.objects.exists())
+        token = re.search(r'token=([^&\s]+)', mail.outbox[0].body).group(1)
+        response = APIClient().post('/api/password/reset/confirm/', {'token': token, 'new_password': 'n3w-Passw0rd!'},
+                                    format='json')
+        self.assertEqual(response.status_code, 200)
+
+
+class _FakeApiHandler(BaseHTTPRequestHandler):
+    """Serves queued JSON responses; keeps connections alive like the real APIs."""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        server.requests.append((self.command, self.path, self.headers.get('Authorization'), body))
+        server.client_ports.add(self.client_address[1])
+        status_code, payload, delay = server.responses.pop(0)
+        if delay:
+            time.sleep(delay)
+        raw = json.dumps(payload).encode()
+        try:
+            self.send_response(status_code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client gave up (timeout tests)
+
+    do_GET = do_POST = _reply
+
+
+class _FakeApiServerMixin:
+    """Runs a _FakeApiHandler server for the test class on a random port."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _FakeApiHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.server_url = f'http://127.0.0.1:{cls.server.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.requests = []
+        self.server.client_ports = set()
+        self.server.responses = []
+
+    def _queue(self, status_code, payload, delay=0):
+        self.server.responses.append((status_code, payload, delay))
+
+
+@override_settings(
+    PAYSTACK_SECRET_KEY='sk_test_fake', PAYSTACK_READ_TIMEOUT=0.5,
+    PAYSTACK_MAX_RETRIES=2, PAYSTACK_RETRY_BACKOFF_SECONDS=0,
+)
+class PaystackClientTests(_FakeApiServerMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        paystack.reset_session()
+        self.addCleanup(paystack.reset_session)
+        override = override_settings(PAYSTACK_BASE_URL=self.server_url)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_calls_reuse_one_keep_alive_connection(self):
+        for i in range(3):
+            self._queue(200, {'status': True, 'message': 'ok', 'data': {'status': 'success', 'reference': f'r{i}'}})
+        for i in range(3):
+            self.assertEqual(paystack.verify_transaction(f'r{i}')['reference'], f'r{i}')
+        self.assertEqual(len(self.server.client_ports), 1)
+        self.assertEqual(self.server.requests[0][2], 'Bearer sk_test_fake')
+
+    def test_get_is_retried_on_server_error(self):
+        self._queue(502, {'status': False, 'message': 'Bad gateway'})
+        self._queue(200, {'status': True, 'message': 'ok', 'data': {'status': 'success'}})
+        self.assertEqual(paystack.verify_transaction('order_1_abc')['status'], 'success')
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_post_is_not_retried(self):
+        self._queue(503, {'status': False, 'message': 'Unavailable'})
+        with self.assertRaises(paystack.PaystackError) as ctx:
+            paystack.create_refund(transaction='order_1', amount=100)
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_error_envelope_raises_with_message(self):
+        self._queue(400, {'status': False, 'message': 'Invalid key'})
+        with self.assertRaises(paystack.PaystackError) as ctx:
+            paystack.initialize_transaction(email='a@example.com', amount=1000, reference='ref')
+        self.assertEqual(ctx.exception.message, 'Invalid key')
+        self.assertEqual(ctx.exception.body, {'status': False, 'message': 'Invalid key'})
+
+    def test_read_timeout_raises(self):
+        for _ in range(3):
+            self._queue(200, {'status': True, 'data': {}}, delay=1)
+        with self.assertRaises(paystack.PaystackError) as ctx:
+            paystack.verify_transaction('slow')
+        self.assertIsNone(ctx.exception.status_code)
+
+    def _refund_request(self):
+        order = Order.objects.create(is_guest=True, guest_email='guest@example.com', total=Decimal('150.00'))
+        return_request = ReturnRequest.objects.create(
+            order=order, reason='defective', reason_description='Torn lace',
+            approved_refund_amount=Decimal('150.00'), status='approved',
+        )
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='boss', password='pass1234', is_staff=True))
+        url = f'/api/return-requests/{return_request.id}/process-refund/'
+        return return_request, client, url
+
+    def test_refund_retry_after_timeout_does_not_refund_twice(self):
+        return_request, client, url = self._refund_request()
+        self._queue(200, {'status': True, 'data': {}}, delay=1)
+        self.assertEqual(client.post(url).status_code, 500)
+        return_request.refresh_from_db()
+        self.assertEqual(return_request.status, 'approved')
+        self.assertIsNotNone(return_request.refund_attempted_at)
+
+        # The timed-out POST went through: the retry finds it instead of posting again
+        note = f'Return request #{return_request.id} - Order #{return_request.order_id}'
+        self._queue(200, {'status': True, 'data': [{'merchant_note': note, 'status': 'processed'}]})
+        self.assertEqual(client.post(url).status_code, 200)
+        methods = [(method, path.split('?')[0]) for method, path, _, _ in self.server.requests]
+        self.assertEqual(methods, [('POST', '/refund'), ('GET', '/refund')])
+        return_request.refresh_from_db()
+        self.assertEqual(return_request.status, 'refunded')
+
+    def test_refund_retry_posts_when_no_earlier_refund_exists(self):
+        return_request, client, url = self._refund_request()
+        self._queue(200, {'status': True, 'data': {}}, delay=1)
+        client.post(url)
+        self._queue(200, {'status': True, 'data': []})
+        self._queue(200, {'status': True, 'data': {'transaction': {'reference': f'order_{return_request.order_id}'}}})
+        self.assertEqual(client.post(url).status_code, 200)
+        self.assertEqual([m for m, _, _, _ in self.server.requests], ['POST', 'GET', 'POST'])
+        self.assertEqual(self.server.requests[2][3]['merchant_note'], self.server.requests[0][3]['merchant_note'])
+
+    def test_rejected_refund_can_be_retried_directly(self):
+        return_request, client, url = self._refund_request()
+        self._queue(400, {'status': False, 'message': 'Transaction not found'})
+        self.assertEqual(client.post(url).status_code, 400)
+        return_request.refresh_from_db()
+        self.assertIsNone(return_request.refund_attempted_at)
+
+    def test_initialize_view_uses_client(self):
+        order = Order.objects.create(is_guest=True, guest_email='guest@example.com', total=Decimal('150.00'))
+        self._queue(200, {'status': True, 'message': 'Authorization URL created', 'data': {
+            'authorization_url': 'https://checkout.paystack.com/abc', 'access_code': 'abc', 'reference': 'order_x',
+        }})
+        response = APIClient().post(
+            f'/api/paystack/initiate/{order.id}/', {'guest_email': 'guest@example.com'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['authorization_url'], 'https://checkout.paystack.com/abc')
+        method, path, _, body = self.server.requests[0]
+        self.assertEqual((method, path), ('POST', '/transaction/initialize'))
+        self.assertEqual(body['amount'], 15000)
+
+
+@override_settings(PAYSTACK_SECRET_KEY='sk_test_fake', BACKGROUND_TASKS_BACKEND='database')
+class PaystackWebhookTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.order = Order.objects.create(is_guest=True, guest_email='guest@example.com', total=Decimal('150.00'))
+        self.reference = f'order_{self.order.id}_abc123'
+        BackgroundJob.objects.all().delete()  # the order's sales rollup
+
+    def _deliver(self, event='charge.success', signature=None):
+        body = json.dumps({'event': event, 'data': {'id': 42, 'reference': self.reference}}).encode()
+        if signature is None:
+            signature = hmac.new(b'sk_test_fake', body, hashlib.sha512).hexdigest()
+        return self.client.generic('POST', '/api/paystack/webhook/', body, content_type='application/json',
+                                   HTTP_X_PAYSTACK_SIGNATURE=signature)
+
+    def _run_jobs(self):
+        ran = []
+        while jobs := tasks.claim_jobs():
+            for job in jobs:
+                ran.append(job.task_name)
+                tasks.run_job(job)
+        return ran
+
+    def test_redelivery_stops_at_the_ledger(self):
+        with mock.patch.object(paystack, 'verify_transaction') as verify:
+            self.assertEqual(self._deliver().status_code, 200)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self._deliver().status_code, 200)
+        verify.assert_not_called()
+        lookups = [q['sql'] for q in queries if 'SAVEPOINT' not in q['sql']]
+        self.assertEqual(len(lookups), 1)
+        self.assertEqual(PaystackEvent.objects.count(), 1)
+        self.assertEqual(list(BackgroundJob.objects.values_list('task_name', flat=True)), ['process_paystack_event'])
+
+    def test_event_is_processed_once(self):
+        self._deliver()
+        with mock.patch.object(paystack, 'verify_transaction', return_value={'status': 'success'}) as verify:
+            ran = self._run_jobs()
+            tasks.process_paystack_event(PaystackEvent.objects.get().id)
+        verify.assert_called_once_with(self.reference)
+        self.assertEqual(ran, [
+            'process_paystack_event', 'rollup_sales_day', 'send_order_status_update_email', 'book_order_delivery',
+        ])
+        self.order.refresh_from_db()
+        self.assertEqual((self.order.status, self.order.stock_committed), ('paid', True))
+        self.assertEqual(PaystackEvent.objects.get().status, 'processed')
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_failed_verification_is_ignored(self):
+        self._deliver()
+        with mock.patch.object(paystack, 'verify_transaction', return_value={'status': 'failed'}):
+            self.assertEqual(self._run_jobs(), ['process_paystack_event'])
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'pending')
+        self.assertEqual(PaystackEvent.objects.get().status, 'ignored')
+
+    def test_unhandled_events_and_bad_signatures_are_not_recorded(self):
+        self.assertEqual(self._deliver(event='transfer.success').status_code, 200)
+        self.assertEqual(self._deliver(signature='forged').status_code, 400)
+        self.assertFalse(PaystackEvent.objects.exists())
+
+
+@override_settings(MCKOT_QUOTE_CACHE_SECONDS=300, MCKOT_QUOTE_CACHE_PRECISION=3)
+class MckotQuoteCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.calls = []
+
+    def _fake_quote(self, coords, pickup_coordinates=None, ride_type_id=None):
+        self.calls.append(list(coords))
+        return {'quote_id': f'q{len(self.calls)}', 'delivery_fee': {'amount': '25.00'}}
+
+    def test_nearby_dropoffs_share_a_quote(self):
+        with mock.patch.object(mckot, 'quote', side_effect=self._fake_quote):
+            first = mckot.cached_quote([5.60371, -0.18702])
+            second = mckot.cached_quote([5.60368, -0.18698])
+            mckot.cached_quote([5.60371, -0.18702], ride_type_id=2)
+        self.assertEqual(first['quote_id'], second['quote_id'])
+        self.assertEqual(len(self.calls), 2)
+
+    def test_exact_lookup_requires_same_coordinates(self):
+        with mock.patch.object(mckot, 'quote', side_effect=self._fake_quote):
+            mckot.cached_quote([5.60371, -0.18702])
+            mckot.cached_quote([5.60371, -0.18702], exact=True)
+            booked = mckot.cached_quote([5.60368, -0.18698], exact=True)
+        self.assertEqual(self.calls, [[5.60371, -0.18702], [5.60368, -0.18698]])
+        self.assertEqual(booked['quote_id'], 'q2')
+
+    @override_settings(MCKOT_QUOTE_CACHE_SECONDS=3600)
+    def test_ttl_stays_inside_quote_validity(self):
+        self.assertLess(mckot._quote_cache_ttl(), mckot.QUOTE_VALIDITY_SECONDS)
+
+    def test_concurrent_misses_make_one_upstream_call(self):
+        release = threading.Event()
+
+        def slow_quote(*args, **kwargs):
+            release.wait(5)
+            return self._fake_quote(*args, **kwargs)
+
+        results = []
+        with mock.patch.object(mckot, 'quote', side_effect=slow_quote):
+            threads = [
+                threading.Thread(target=lambda: results.append(mckot.cached_quote([5.6037, -0.187])))
+                for _ in range(5)
+            ]
+            for t in threads:
+                t.start()
+            time.sleep(0.2)
+            release.set()
+            for t in threads:
+                t.join()
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual({r['quote_id'] for r in results}, {'q1'})
+
+    def test_errors_are_not_cached(self):
+        with mock.patch.object(mckot, 'quote', side_effect=mckot.MckotError('down', code='network_error')):
+            with self.assertRaises(mckot.MckotError):
+                mckot.cached_quote([5.6037, -0.187])
+        with mock.patch.object(mckot, 'quote', side_effect=self._fake_quote):
+            self.assertEqual(mckot.cached_quote([5.6037, -0.187])['quote_id'], 'q1')
+
+
+@override_settings(
+    MCKOT_MERCHANT_API_KEY='mk_test_fake', MCKOT_READ_TIMEOUT=0.5,
+    MCKOT_MAX_RETRIES=2, MCKOT_RETRY_BACKOFF_SECONDS=0,
+)
+class MckotClientTests(_FakeApiServerMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        mckot.reset_session()
+        mckot.reset_stats()
+        self.addCleanup(mckot.reset_session)
+        override = override_settings(MCKOT_BASE_URL=self.server_url)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_calls_reuse_one_keep_alive_connection(self):
+        for _ in range(3):
+            self._queue(200, {'success': True, 'data': {'id': 'dlv_1', 'status': 'assigned'}})
+        for _ in range(3):
+            self.assertEqual(mckot.get_delivery('dlv_1')['status'], 'assigned')
+        self.assertEqual(len(self.server.client_ports), 1)
+        self.assertEqual(self.server.requests[0][2], 'Bearer mk_test_fake')
+        self.assertEqual(mckot.get_stats()['requests'], 3)
+
+    def test_retries_and_errors_are_counted(self):
+        self._queue(503, {'success': False, 'error': {'message': 'busy'}})
+        self._queue(200, {'success': True, 'data': {'id': 'dlv_1'}})
+        mckot.get_delivery('dlv_1')
+        self._queue(404, {'success': False, 'error': {'message': 'Not found', 'code': 'not_found'}})
+        with self.assertRaises(mckot.MckotError):
+            mckot.get_delivery('missing')
+        stats = mckot.get_stats()
+        self.assertEqual(stats['retries'], 1)
+        self.assertEqual(stats['errors'], {'http_503': 1, 'not_found': 1})
+
+    def test_cancel_is_not_retried(self):
+        self._queue(503, {'success': False, 'error': {'message': 'busy'}})
+        with self.assertRaises(mckot.MckotError):
+            mckot.cancel('dlv_1')
+        self.assertEqual(len(self.server.requests), 1)
+
+
+@override_settings(MCKOT_WEBHOOK_SECRET='whsec_test', BACKGROUND_TASKS_BACKEND='database')
+class MckotWebhookTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.order = Order.objects.create(is_guest=True, guest_email='guest@example.com', total=Decimal('150.00'))
+        self.delivery = Delivery.objects.create(order=self.order, mckot_delivery_id='dlv_1')
+        self.start = timezone.now()
+        BackgroundJob.objects.all().delete()  # the order's sales rollup
+
+    def _deliver(self, event, minutes, signature=None, **data):
+        data.setdefault('id', 'dlv_1')
+        at = (self.start + timedelta(minutes=minutes)).isoformat()
+        body = json.dumps({'event': event, 'occurred_at': at, 'data': data}).encode()
+        if signature is None:
+            signature = 'sha256=' + hmac.new(b'whsec_test', body, hashlib.sha256).hexdigest()
+        return self.client.generic('POST', '/api/mckot/webhook/', body, content_type='application/json',
+                                   HTTP_X_MCKOT_SIGNATURE=signature)
+
+    def test_webhook_appends_without_touching_the_delivery(self):
+        self.assertEqual(self._deliver('delivery.assigned', 1).status_code, 200)
+        self.assertEqual(self._deliver('delivery.assigned', 1, signature='sha256=forged').status_code, 400)
+        self.assertEqual(MckotEvent.objects.count(), 1)
+        self.assertEqual(BackgroundJob.objects.get().task_name, 'apply_mckot_events')
+        self.delivery.refresh_from_db()
+        self.assertEqual(self.delivery.status, 'pending')
+
+    def test_applier_skips_stale_and_backward_events(self):
+        self._deliver('delivery.assigned', 1, courier={'name': 'Yaw Badu', 'phone': '0244111222'})
+        self._deliver('delivery.picked_up', 5)
+        self._deliver('delivery.assigned', 2)  # arrived late
+        self._deliver('delivery.updated', 6, status='assigned')  # newer, but backwards
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(webhooks.apply_mckot_events(), (4, 1))
+        self.assertLessEqual(len([q for q in queries if 'SAVEPOINT' not in q['sql']]), 4)
+        self.delivery.refresh_from_db()
+        self.assertEqual((self.delivery.status, self.delivery.courier_name), ('in_transit', 'Yaw Badu'))
+        self.assertEqual([entry['status'] for entry in self.delivery.status_history], ['assigned', 'in_transit'])
+        self.assertIsNone(self.delivery.raw_response)
+        self.assertFalse(MckotEvent.objects.filter(applied_at__isnull=True).exists())
+
+    def test_final_status_sticks(self):
+        self._deliver('delivery.completed', 1)
+        self._deliver('delivery.cancelled', 2)
+        webhooks.apply_mckot_events()
+        self.delivery.refresh_from_db()
+        self.assertEqual(self.delivery.status, 'delivered')
+
+    def test_event_before_booking_matches_by_order_ref(self):
+        Delivery.objects.filter(pk=self.delivery.pk).update(mckot_delivery_id=None)
+        self._deliver('delivery.created', 1, id='dlv_9', order_ref=str(self.order.id))
+        webhooks.apply_mckot_events()
+        self.delivery.refresh_from_db()
+        self.assertEqual(self.delivery.mckot_delivery_id, 'dlv_9')
+
+    def test_unmatched_event_waits_for_its_delivery(self):
+        other = Order.objects.create(is_guest=True, guest_email='guest@example.com', total=Decimal('80.00'))
+        self._deliver('delivery.assigned', 1, id='dlv_2', order_ref=str(other.id))
+        self.assertEqual(webhooks.apply_mckot_events(), (0, 0))
+        self.assertTrue(MckotEvent.objects.filter(applied_at__isnull=True).exists())
+        delivery = Delivery.objects.create(order=other)
+        self.assertEqual(webhooks.apply_mckot_events(), (1, 1))
+        delivery.refresh_from_db()
+        self.assertEqual((delivery.mckot_delivery_id, delivery.status), ('dlv_2', 'assigned'))
+
+    def test_unmatched_event_is_given_up_after_the_retry_window(self):
+        self._deliver('delivery.assigned', 1, id='dlv_404')
+        MckotEvent.objects.update(received_at=timezone.now() - timedelta(hours=25))
+        self.assertEqual(webhooks.apply_mckot_events(), (0, 0))
+        self.assertFalse(MckotEvent.objects.filter(applied_at__isnull=True).exists())
+
+    def test_tracking_refresh_keeps_newer_webhook_status(self):
+        self._deliver('delivery.picked_up', 1)
+        stale = Delivery.objects.get(pk=self.delivery.pk)
+        webhooks.apply_mckot_events()
+        # The poll answered before the pickup: it must not undo the webhook's work
+        fresh = webhooks.apply_delivery_snapshot(stale, {'id': 'dlv_1', 'status': 'assigned', 'tracking_url': 'https://t/1'})
+        self.assertEqual((fresh.status, fresh.tracking_url), ('in_transit', 'https://t/1'))
+        self.delivery.refresh_from_db()
+        self.assertEqual([entry['status'] for entry in self.delivery.status_history], ['in_transit'])
+        self.assertIsNotNone(self.delivery.last_event_at)
+
+
+class SalesRollupTests(TestCase):
+    """The analytics endpoint must report the same figures as the raw orders."""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='boss', password='pass1234', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        category = Category.objects.create(name='Wigs')
+        self.products = [
+            Product.objects.create(title=f'Wig {i}', category=category, base_price=Decimal('100'))
+            for i in range(3)
+        ]
+        self.variants = [
+            ProductVariant.objects.create(product=p, price=Decimal('100'), stock=50) for p in self.products
+        ]
+        self.code = DiscountCode.objects.create(code='SAVE10', discount_type='percentage', discount_value=Decimal('10'))
+
+    def _order(self, days_ago, status, total, items=(), discount=None, hours_ago=0):
+        order = Order.objects.create(
+            user=self.admin, status=status, total=Decimal(total),
+            discount_code=self.code if discount else None, discount_amount=Decimal(discount or '0'),
+        )
+        for variant, quantity in items:
+            OrderItem.objects.create(order=order, variant=variant, quantity=quantity, item_total=variant.price * quantity)
+        Order.objects.filter(pk=order.pk).update(
+            created_at=timezone.now() - timedelta(days=days_ago, hours=hours_ago)
+        )
+        return order
+
+    def _seed(self):
+        v1, v2, v3 = self.variants
+        self._order(0, 'paid', '200.00', [(v1, 2)])
+        self._order(1, 'pending', '100.00', [(v2, 1)])
+        self._order(3, 'delivered', '270.00', [(v1, 1), (v3, 2)], discount='30.00')
+        self._order(29, 'shipped', '100.00', [(v2, 1)], hours_ago=12)
+        self._order(30, 'paid', '150.00', [(v3, 1)], hours_ago=-1)  # partial first day
+        self._order(30, 'paid', '999.00', [(v3, 9)], hours_ago=1)   # just outside
+        self._order(45, 'cancelled', '80.00', [(v1, 1)])
+        self._order(50, 'processing', '300.00', [(v2, 3)], discount='20.00')
+        self._order(400, 'paid', '50.00', [(v1, 1)])
+        call_command('rebuild_sales_rollups', stdout=StringIO())
+
+    def _run_rollups(self):
+        jobs = tasks.claim_jobs(limit=100)
+        for job in jobs:
+            self.assertTrue(tasks.run_job(job))
+        return len(jobs)
+
+    def test_rollups_follow_status_changes(self):
+        order = Order.objects.create(user=self.admin, status='pending', total=Decimal('120.00'))
+        self.assertFalse(DailySalesRollup.objects.exists())  # left to the worker
+        self.assertEqual(self._run_rollups(), 1)
+        self.assertEqual(list(DailySalesRollup.objects.values_list('status', 'order_count')), [('pending', 1)])
+        order.status = 'paid'
+        order.save()
+        self._run_rollups()
+        rollup = DailySalesRollup.objects.get()
+        self.assertEqual((rollup.status, rollup.revenue), ('paid', Decimal('120.00')))
+
+    def test_changes_to_one_day_share_a_job(self):
+        for total in ('10.00', '20.00', '30.00'):
+            order = Order.objects.create(user=self.admin, status='pending', total=Decimal(total))
+            OrderItem.objects.create(order=order, variant=self.variants[0], quantity=1, item_total=Decimal(total))
+        self.assertEqual(BackgroundJob.objects.filter(task_name='rollup_sales_day').count(), 1)
+        self.assertEqual(self._run_rollups(), 1)
+        self.assertEqual(DailySalesRollup.objects.get().order_count, 3)
+
+    def test_response_matches_raw_orders(self):
+        self._seed()
+        response = self.client.get('/api/analytics/sales/?days=30')
+        self.assertEqual(response.status_code, 200)
+        summary = response.data['summary']
+        self.assertEqual(summary['total_revenue'], 200.0 + 270 + 100 + 150 + 999 + 300 + 50)
+        self.assertEqual(summary['period_revenue'], 200.0 + 270 + 100 + 150)
+        self.assertEqual(summary['previous_period_revenue'], 999.0 + 300)
+        self.assertEqual(summary['period_orders'], 5)
+        self.assertEqual(summary['discount_total'], 30.0)
+        self.assertEqual(summary['discount_orders_count'], 1)
+        start = timezone.now() - timedelta(days=30)
+        expected_daily = [
+            {'date': row['date'].strftime('%Y-%m-%d'), 'revenue': float(row['revenue'])}
+            for row in Order.objects.filter(status__in=analytics.PAID_STATUSES, created_at__gte=start)
+            .annotate(date=TruncDate('created_at')).values('date').annotate(revenue=Sum('total')).order_by('date')
+        ]
+        self.assertEqual(response.data['charts']['daily_revenue'], expected_daily)
+        self.assertEqual(
+            [m['revenue'] for m in response.data['charts']['monthly_revenue']][0], 50.0
+        )
+        top = response.data['top_products']
+        self.assertEqual(
+            sorted((p['product_name'], p['quantity_sold'], p['revenue']) for p in top),
+            [('Wig 0', 3, 300.0), ('Wig 1', 1, 100.0), ('Wig 2', 3, 300.0)],
+        )
+        self.assertEqual(
+            sorted((s['status'], s['count']) for s in response.data['orders_by_status']),
+            [('delivered', 1), ('paid', 2), ('pending', 1), ('shipped', 1)],
+        )
+
+
+    def test_figures_are_current_before_the_worker_runs(self):
+        self._seed()
+        self._run_rollups()
+        before = self.client.get('/api/analytics/sales/?days=30').data
+
+        # Neither change has been rolled up yet: today's order and a
+        # 45-day-old order that is paid after all
+        self._order(0, 'paid', '40.00', [(self.variants[0], 1)])
+        old = Order.objects.get(status='cancelled')
+        old.status = 'paid'
+        old.save()
+        self.assertEqual(BackgroundJob.objects.filter(task_name='rollup_sales_day').count(), 2)
+
+        pending = self.client.get('/api/analytics/sales/?days=30').data
+        self.assertEqual(pending['summary']['total_revenue'], before['summary']['total_revenue'] + 40 + 80)
+        self.assertEqual(pending['summary']['period_revenue'], before['summary']['period_revenue'] + 40)
+        self.assertEqual(
+            sum(m['revenue'] for m in pending['charts']['monthly_revenue']),
+            sum(m['revenue'] for m in before['charts']['monthly_revenue']) + 40 + 80,
+        )
+        quantities = {p['product_name']: p['quantity_sold'] for p in pending['top_products']}
+        self.assertEqual(quantities['Wig 0'], 4)
+
+        self._run_rollups()
+        self.assertEqual(self.client.get('/api/analytics/sales/?days=30').data, pending)
+
+
+class CategoryTreeCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        wigs = Category.objects.create(name='Wigs', is_nav_link=True)
+        lace = Category.objects.create(name='Lace Front', parent=wigs)
+        Category.objects.create(name='HD Lace', parent=lace)
+        Category.objects.create(name='Braids', nav_order=1)
+
+    def test_tree_is_built_in_one_query_then_cached(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/categories/')
+        tree = response.json()
+        self.assertEqual([c['name'] for c in tree], ['Wigs', 'Braids'])
+        self.assertEqual(tree[0]['subcategories'][0]['subcategories'][0]['name'], 'HD Lace')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/categories/').json(), tree)
+        nav = self.client.get('/api/categories/?is_nav_link=true').json()
+        self.assertEqual([c['name'] for c in nav], ['Wigs'])
+
+    def test_etag_revalidation(self):
+        etag = self.client.get('/api/categories/')['ETag']
+        response = self.client.get('/api/categories/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_save_and_delete_invalidate(self):
+        etag = self.client.get('/api/categories/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            braids = Category.objects.get(name='Braids')
+            braids.name = 'Box Braids'
+            braids.save()
+        response = self.client.get('/api/categories/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Box Braids', [c['name'] for c in response.json()])
+        with self.captureOnCommitCallbacks(execute=True):
+            braids.delete()
+        self.assertNotIn('Box Braids', [c['name'] for c in self.client.get('/api/categories/').json()])
+
+
+
+class ResponseCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.product = Product.objects.create(title='Kinky Curly Wig', base_price=Decimal('250'))
+        self.variant = ProductVariant.objects.create(product=self.product, price=Decimal('250'), stock=5)
+        ShippingMethod.objects.create(name='Standard', price=Decimal('20'))
+
+    def test_anonymous_list_served_from_cache(self):
+        first = self.client.get('/api/products/')
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('public', first['Cache-Control'])
+        self.assertIn('max-age=', first['Cache-Control'])
+        self.assertIn('Authorization', first['Vary'])
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/products/')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        for url in (f'/api/products/{self.product.pk}/', '/api/shipping-methods/'):
+            self.client.get(url)
+            with self.assertNumQueries(0):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_conditional_requests(self):
+        first = self.client.get('/api/products/')
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=f'W/{first["ETag"]}')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], first['ETag'])
+        response = self.client.get('/api/products/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_authenticated_requests_bypass_cache(self):
+        self.client.get('/api/products/')
+        self.client.force_authenticate(User.objects.create(username='shopper'))
+        response = self.client.get('/api/products/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_saves_and_deletes_invalidate(self):
+        etag = self.client.get('/api/products/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.variant.stock = 0
+            self.variant.save()
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['variants'][0]['stock'], 0)
+
+        methods = self.client.get('/api/shipping-methods/').json()
+        with self.captureOnCommitCallbacks(execute=True):
+            ShippingMethod.objects.all().delete()
+        self.assertNotEqual(self.client.get('/api/shipping-methods/').json(), methods)
+
+    def test_stock_changes_only_invalidate_their_products(self):
+        other = Product.objects.create(title='Body Wave Bundle', base_price=Decimal('90'))
+        ProductVariant.objects.create(product=other, price=Decimal('90'), stock=5)
+        other_url, url = f'/api/products/{other.pk}/', f'/api/products/{self.product.pk}/'
+        for warm in (other_url, url, '/api/products/'):
+            self.client.get(warm)
+        order = Order.objects.create(is_guest=True, guest_email='guest@example.com', total=Decimal('250.00'))
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            self.assertTrue(reservations.place_holds(order, {self.variant.pk: 2}))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(other_url).status_code, 200)
+        self.assertEqual(self.client.get(url).json()['variants'][0]['available'], 3)
+        listed = self.client.get('/api/products/').json()['results']
+        self.assertEqual({product['id']: product['variants'][0]['available'] for product in listed},
+                         {self.product.pk: 3, other.pk: 5})
+
+    @override_settings(API_CACHE_ENABLED=False)
+    def test_can_be_disabled(self):
+        self.client.get('/api/products/')
+        response = self.client.get('/api/products/')
+        self.assertNotIn('ETag', response)
+
+
+
+class _AtomicAddFileCache(FileBasedCache):
+    """FileBasedCache.add checks then writes; the real L2 (Redis SET NX) is atomic."""
+    _add_lock = threading.Lock()
+
+    def add(self, *args, **kwargs):
+        with self._add_lock:
+            return super().add(*args, **kwargs)
+
+
+class TieredCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        cache_backends.reset_stats()
+        # Two "workers": separate L1s in front of one file-based L2
+        shared = _AtomicAddFileCache(self.tmp.name, {})
+        self.a, self.b = (self._worker(shared, name) for name in ('a', 'b'))
+
+    def _worker(self, shared, name):
+        tiered = TieredCache(None, {'OPTIONS': {'L1_TIMEOUT': 60, 'LOCK_TIMEOUT': 2}})
+        tiered.l1 = LocMemCache(f'tiered-test-{name}', {})
+        tiered.l1.clear()
+        tiered.l2 = shared
+        return tiered
+
+    def test_reads_fall_through_to_shared_tier(self):
+        self.a.set('store:products:1', 'payload')
+        self.assertEqual(self.b.get('store:products:1'), 'payload')
+        self.assertEqual(self.b.get('store:products:1'), 'payload')
+        self.assertIsNone(self.b.get('store:products:2'))
+        stats = cache_backends.get_stats()['store:products']
+        self.assertEqual((stats['l1_hits'], stats['l2_hits'], stats['misses']), (1, 1, 1))
+
+    def test_l1_bounds_cross_worker_staleness(self):
+        self.a.set('store:version:products', 'v1')
+        self.b.get('store:version:products')
+        self.a.set('store:version:products', 'v2')
+        self.assertEqual(self.a.get('store:version:products'), 'v2')
+        self.assertEqual(self.b.get('store:version:products'), 'v1')  # until its L1 entry expires
+        self.b.l1.delete('store:version:products')
+        self.assertEqual(self.b.get('store:version:products'), 'v2')
+
+    def test_get_or_set_computes_once_under_concurrency(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.3)
+            return 'tree'
+
+        results = []
+        threads = [threading.Thread(target=lambda w=w: results.append(w.get_or_set('store:categories:tree', compute)))
+                   for w in (self.a, self.b, self.a, self.b)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, ['tree'] * 4)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache_backends.get_stats()['store:categories']['stampede_waits'], 3)
+
+    def test_none_is_not_cached(self):
+        self.assertIsNone(self.a.get_or_set('mckot:quote:x', lambda: None))
+        self.assertFalse(self.a.has_key('mckot:quote:x'))
+
+    def test_shared_tier_outage_degrades_to_local(self):
+        with mock.patch.object(FileBasedCache, 'get', side_effect=OSError('down')), \
+                mock.patch.object(FileBasedCache, 'set', side_effect=OSError('down')):
+            self.a.set('store:products:1', 'payload')
+            self.assertEqual(self.a.get('store:products:1'), 'payload')
+            self.assertIsNone(self.a.get('store:products:2'))
+        self.assertEqual(cache_backends.get_stats()['store:products']['l2_errors'], 2)
+
+    def test_counters_live_in_shared_tier(self):
+        self.a.set('throttle:ip', 1)
+        self.b.get('throttle:ip')
+        self.a.incr('throttle:ip')
+        self.assertEqual(self.b.l2.get('throttle:ip'), 2)
+
+
+
+class DatabaseSettingsTests(SimpleTestCase):
+    databases = {'default'}
+
+    def _ids(self, db, pooler=''):
+        return [w.id for w in db_checks.check_database_settings(db, pooler)]
+
+    def test_checks(self):
+        pooled = {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True, 'DISABLE_SERVER_SIDE_CURSORS': True}
+        self.assertEqual(self._ids(pooled, 'pgbouncer'), [])
+        self.assertEqual(self._ids({'CONN_MAX_AGE': 0}), [])
+        self.assertEqual(self._ids({'CONN_MAX_AGE': None}), ['store.W002'])
+        self.assertEqual(self._ids({**pooled, 'DISABLE_SERVER_SIDE_CURSORS': False}, 'pgbouncer'), ['store.W003'])
+        self.assertEqual(self._ids(pooled, 'pgpool'), ['store.W001'])
+
+    def test_startup_log_reports_effective_settings(self):
+        with self.assertLogs('store.db', 'INFO') as logs, \
+                mock.patch.object(connection, 'ensure_connection') as connect:
+            db_checks.log_database_settings()
+        self.assertIn('conn_max_age=', logs.output[0])
+        # Loading the app must not connect (gunicorn --preload forks after it)
+        connect.assert_not_called()
+
+        with self.assertLogs('store.db', 'INFO') as logs:
+            request_started.send(sender=None)
+        self.assertIn('connect_ms=', logs.output[0])
+        # Only the first request checks the connection
+        with self.assertNoLogs('store.db', 'INFO'):
+            request_started.send(sender=None)
+
+
+
+class RequestMetricsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        for i in range(3):
+            ProductVariant.objects.create(product=Product.objects.create(title=f'Wig {i}', base_price=Decimal('100')),
+                                          price=Decimal('100'))
+
+    def _request_log(self, logs, event='request'):
+        records = [json.loads(line.split(':', 2)[2]) for line in logs.output]
+        return next(r for r in records if r['event'] == event)
+
+    def test_server_timing_and_request_log(self):
+        with self.assertLogs('store.instrumentation', 'INFO') as logs:
+            response = self.client.get('/api/products/')
+        record = self._request_log(logs)
+        self.assertEqual((record['path'], record['status']), ('/api/products/', 200))
+        self.assertGreater(record['queries'], 0)
+        self.assertIn(f'desc="{record["queries"]} queries"', response['Server-Timing'])
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+    @override_settings(SLOW_REQUEST_MS=1, SLOW_REQUEST_SAMPLE_RATE=1.0)
+    def test_slow_requests_log_top_queries(self):
+        with self.assertLogs('store.instrumentation', 'WARNING') as logs:
+            self.client.get('/api/products/')
+        record = self._request_log(logs, 'slow_request')
+        self.assertTrue(record['top_queries'][0]['sql'].startswith('SELECT'))
+
+    def test_duplicate_query_signatures(self):
+        metrics = instrumentation.RequestMetrics(mock.Mock(method='GET', path='/'))
+        for ids in ('%s', '%s, %s', '%s, %s, %s'):
+            metrics.record_query(f'SELECT * FROM store_review WHERE product_id IN ({ids})', 1.0)
+        metrics.record_query('SELECT 1', 1.0)
+        self.assertEqual(metrics.duplicates(), [{'sql': 'SELECT * FROM store_review WHERE product_id IN (...)', 'count': 3}])
+
+    def test_outbound_time_is_attributed_to_service(self):
+        metrics = instrumentation.RequestMetrics(mock.Mock(method='GET', path='/'))
+        token = instrumentation._current.set(metrics)
+        try:
+            with instrumentation.timed('mckot'):
+                time.sleep(0.01)
+            with self.assertLogs('store.instrumentation', 'INFO') as logs:
+                instrumentation.log_event('checkout.test', order_id=1)
+        finally:
+            instrumentation._current.reset(token)
+        self.assertGreaterEqual(metrics.external_ms['mckot'], 10)
+        self.assertEqual(self._request_log(logs, 'checkout.test'), {'event': 'checkout.test', 'method': 'GET', 'path': '/', 'order_id': 1})
+
+
+class BenchmarkTests(TestCase):
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual([runner.percentile(values, p) for p in (50, 95, 99, 100)], [50, 95, 99, 100])
+        self.assertEqual(runner.percentile([7.0], 99), 7.0)
+        self.assertEqual(runner.percentile([], 50), 0.0)
+
+    def test_compare_flags_errors_latency_and_queries(self):
+        base = {'p95_ms': 10.0, 'queries_per_request': 4.0, 'errors': 0, 'requests': 50}
+        baseline = {'_meta': {}, 'a': base, 'b': base, 'c': base}
+        report = {
+            '_meta': {},
+            'a': {**base, 'p95_ms': 12.0},
+            'b': {**base, 'p95_ms': 20.0, 'queries_per_request': 5.0},
+            'c': {**base, 'errors': 2},
+            'new': {**base},
+        }
+        regressions = runner.compare(report, baseline, tolerance=0.25)
+        self.assertEqual([r.split(':')[0] for r in regressions], ['b', 'b', 'c'])
+        self.assertEqual(runner.compare(report, None), ['c: 2 of 50 requests failed'])
+
+    def test_scenarios_run_against_seeded_data(self):
+        Seeder(seed=1).run(**SCALES['tiny'])
+        self.assertEqual(Product.objects.count(), SCALES['tiny']['products'])
+        ctx = scenarios.Context()
+        with FakeServices() as fakes:
+            report = runner.run(scenarios.SCENARIOS, ctx, requests=2)
+        for scenario in scenarios.SCENARIOS:
+            self.assertEqual(report[scenario.name]['errors'], 0, scenario.name)
+        self.assertEqual(set(fakes.calls), {'paystack', 'mckot'})
+
+
+class SeedStoreTests(TestCase):
+
+    def test_seeds_requested_volumes_consistently(self):
+        call_command('seed_store', scale='tiny', orders=120, favorites=25, stdout=StringIO())
+        self.assertEqual(Order.objects.count(), 120)
+        self.assertEqual(Favorite.objects.count(), 25)
+        self.assertEqual(Product.objects.count(), SCALES['tiny']['products'])
+        # One default address per customer that has any
+        self.assertFalse(Address.objects.filter(is_default=True).values('user').annotate(n=Count('id')).filter(n__gt=1))
+        for code in DiscountCode.objects.all():
+            self.assertEqual(code.times_used, code.orders.count())
+        self.assertFalse(Delivery.objects.exclude(order__status__in=['processing', 'shipped', 'delivered']).exists())
+        self.assertFalse(Order.objects.filter(is_guest=False, address__isnull=False).exclude(address__user=F('user')).exists())
+
+    def test_refuses_a_database_with_store_data(self):
+        Product.objects.create(title='Existing', base_price=Decimal('10'))
+        with self.assertRaises(CommandError):
+            call_command('seed_store', scale='tiny', stdout=StringIO())
+
+
+class ProductSearchTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        wigs = Category.objects.create(name='Wigs')
+        bundles = Category.objects.create(name='Bundles')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.body_wave = Product.objects.create(title='Body Wave Frontal Wig', category=wigs, base_price=Decimal('300'))
+            ProductVariant.objects.create(product=self.body_wave, price=Decimal('300'), color='613', length='28"', lace_type='HD')
+            ProductVariant.objects.create(product=self.body_wave, price=Decimal('250'), color='1B', length='20"')
+            self.straight = Product.objects.create(title='Bone Straight Bundles', category=bundles, base_price=Decimal('200'),
+                                                   description='Silky straight hair, pairs with a body wave closure')
+            ProductVariant.objects.create(product=self.straight, price=Decimal('200'), color='613', length='28"', bundle_deal=3)
+            self.deep = Product.objects.create(title='Deep Wave Wig', category=wigs, base_price=Decimal('280'))
+            ProductVariant.objects.create(product=self.deep, price=Decimal('280'), color='1B', length='28"')
+
+    def _search(self, text):
+        response = self.client.get('/api/products/', {'search': text})
+        self.assertEqual(response.status_code, 200)
+        return [p['id'] for p in response.json()['results']]
+
+    def test_matches_variant_attributes(self):
+        self.assertEqual(self._search('613 body wave 28'), [self.body_wave.id, self.straight.id])
+
+    def test_title_hits_rank_first(self):
+        self.assertEqual(self._search('body wave'), [self.body_wave.id, self.straight.id])
+
+    def test_prefix_matching_for_type_ahead(self):
+        self.assertEqual(set(self._search('wa')), {self.body_wave.id, self.straight.id, self.deep.id})
+        self.assertEqual(self._search('deep wa'), [self.deep.id])
+        self.assertEqual(self._search('3 bund'), [self.straight.id])
+
+    def test_index_follows_variant_changes(self):
+        self.assertEqual(self._search('burgundy'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductVariant.objects.create(product=self.deep, price=Decimal('290'), color='Burgundy')
+        self.assertEqual(self._search('burgundy'), [self.deep.id])
+
+    def test_explicit_ordering_overrides_relevance(self):
+        response = self.client.get('/api/products/', {'search': 'wave', 'ordering': 'base_price'})
+        self.assertEqual([p['id'] for p in response.json()['results']], [self.straight.id, self.deep.id, self.body_wave.id])
+
+
+class ProductFacetTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        wigs = Category.objects.create(name='Wigs')
+        lace = Category.objects.create(name='Lace Front', parent=wigs)
+        braids = Category.objects.create(name='Braids')
+        self.a = Product.objects.create(title='A', category=lace, base_price=Decimal('100'))
+        ProductVariant.objects.create(product=self.a, price=Decimal('150'), color='613', length='28"', texture='Body Wave')
+        ProductVariant.objects.create(product=self.a, price=Decimal('120'), color='1B', length='20"', texture='Body Wave')
+        self.b = Product.objects.create(title='B', category=wigs, base_price=Decimal('100'))
+        ProductVariant.objects.create(product=self.b, price=Decimal('400'), color='613', length='20"', texture='Straight')
+        self.c = Product.objects.create(title='C', category=braids, base_price=Decimal('100'))
+        ProductVariant.objects.create(product=self.c, price=Decimal('80'), color='1B', length='28"', bundle_deal=3)
+
+    def _ids(self, params):
+        response = self.client.get('/api/products/', params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(p['id'] for p in response.json()['results'])
+
+    def test_facets_must_match_on_one_variant(self):
+        self.assertEqual(self._ids({'variants__color': '613', 'variants__length': '28"'}), [self.a.id])
+        self.assertEqual(self._ids({'variants__color': ['613', '1B'], 'variants__length': '20"'}), [self.a.id, self.b.id])
+        self.assertEqual(self._ids({'variants__bundle_deal': '3'}), [self.c.id])
+
+    def test_price_range(self):
+        self.assertEqual(self._ids({'min_price': '100', 'max_price': '200'}), [self.a.id])
+        self.assertEqual(self._ids({'variants__color': '613', 'max_price': '200'}), [self.a.id])
+
+    def test_category_slug_includes_subcategories(self):
+        self.assertEqual(self._ids({'category__slug': 'wigs'}), [self.a.id, self.b.id])
+        self.assertEqual(self._ids({'category__slug': ['lace-front', 'braids']}), [self.a.id, self.c.id])
+
+    def test_facet_counts_in_one_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/products/', {'facets': '1', 'variants__color': '613'})
+        facet_queries = [q for q in ctx.captured_queries if 'UNION' in q['sql']]
+        self.assertEqual(len(facet_queries), 1)
+        facets = response.json()['facets']
+        # color ignores its own filter; the others are narrowed to 613 variants
+        self.assertEqual(facets['color'], [{'value': '1B', 'count': 2}, {'value': '613', 'count': 2}])
+        self.assertEqual(facets['length'], [{'value': '20"', 'count': 1}, {'value': '28"', 'count': 1}])
+        self.assertEqual(facets['texture'], [{'value': 'Body Wave', 'count': 1}, {'value': 'Straight', 'count': 1}])
+        self.assertEqual(facets['bundle_deal'], [])
+        self.assertEqual(facets['price'], {'min': '150.00', 'max': '400.00'})
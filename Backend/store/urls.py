@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CategoryViewSet, ProductViewSet, OrderViewSet, RegisterUserView, CartViewSet, CheckoutView, PaystackInitializeView, PaystackWebhookView, OrderHistoryView, OrderDetailView, GuestOrderTrackView, AddressViewSet, ShippingMethodViewSet, OrderStatusUpdateView, FavoriteViewSet, UserInfoView, ProductLikeView, HeroSlideViewSet, PromoBannerViewSet, UsersStatsView, ProductVariantViewSet, ProductImageViewSet, ReviewViewSet, PasswordResetRequestView, PasswordResetConfirmView, ValidateDiscountCodeView, DiscountCodeViewSet, SalesAnalyticsView, ReturnRequestViewSet, ProcessRefundView, DeliveryQuoteView, OrderDeliveryView, OrderDeliveryBookView, MckotWebhookView
+from .views import CategoryViewSet, ProductViewSet, OrderViewSet, RegisterUserView, CartViewSet, CartItemView, GuestCartView, CheckoutView, PaystackInitializeView, PaystackWebhookView, OrderHistoryView, OrderDetailView, GuestOrderTrackView, AddressViewSet, ShippingMethodViewSet, OrderStatusUpdateView, FavoriteViewSet, UserInfoView, ProductLikeView, HeroSlideViewSet, PromoBannerViewSet, UsersStatsView, ProductVariantViewSet, ProductImageViewSet, ReviewViewSet, PasswordResetRequestView, PasswordResetConfirmView, ValidateDiscountCodeView, DiscountCodeViewSet, SalesAnalyticsView, ReturnRequestViewSet, ProcessRefundView, DeliveryQuoteView, OrderDeliveryView, OrderDeliveryBookView, MckotWebhookView
 
 
 router = DefaultRouter()
@@ -25,6 +25,9 @@ urlpatterns = [
     path('users/stats/', UsersStatsView.as_view(), name='users-stats'),
     path('analytics/sales/', SalesAnalyticsView.as_view(), name='sales-analytics'),
     path('checkout/', CheckoutView.as_view(), name='checkout'),
+    # Before the router, so 'items' is not taken for a cart pk
+    path('cart/items/', CartItemView.as_view(), name='cart-items'),
+    path('cart/guest/', GuestCartView.as_view(), name='guest-cart'),
     path("paystack/initiate/<int:order_id>/", PaystackInitializeView.as_view()),
     path("paystack/webhook/", PaystackWebhookView.as_view()),
     path('products/<int:product_id>/like/', ProductLikeView.as_view(), name='product-like'),
@@ -1,28 +1,35 @@
 from django.shortcuts import render
 from .models import Category, Product, Order, Cart, OrderItem, Address, ShippingMethod, Favorite, ProductLike, HeroSlide, PromoBanner, ProductVariant, ProductImage, Review, DiscountCode, ReturnRequest, Delivery
-from .serializers import CategorySerializer, ProductSerializer, OrderSerializer, CartSerializer, OrderDetailSerializer, AddressSerializer, ShippingMethodSerializer, OrderStatusUpdateSerializer, FavoriteSerializer, HeroSlideSerializer, PromoBannerSerializer, ProductVariantSerializer, ProductImageSerializer, ReviewSerializer, DiscountCodeSerializer, ReturnRequestSerializer, ReturnRequestCreateSerializer, DeliverySerializer
-from . import mckot
+from .serializers import CategorySerializer, ProductSerializer, OrderSerializer, CartSerializer, CartItemQuantitySerializer, OrderDetailSerializer, AddressSerializer, ShippingMethodSerializer, OrderStatusUpdateSerializer, FavoriteSerializer, HeroSlideSerializer, PromoBannerSerializer, ProductVariantSerializer, ProductImageSerializer, ReviewSerializer, DiscountCodeSerializer, ReturnRequestSerializer, ReturnRequestCreateSerializer, DeliverySerializer, build_category_children, build_order_item_reviews
+from . import analytics, caching, carts, mckot, paystack, reservations, tasks, webhooks
+from .pagination import StoreCursorPagination, CreatedAtCursorPagination
+from .search import ProductSearchFilter, RelevanceOrderingFilter
+from .filters import CategorySlugFilter, ProductFacetFilter, facet_counts
+from .instrumentation import log_event
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated, AllowAny
-from rest_framework import generics, filters, viewsets, permissions, parsers
+from rest_framework import generics, viewsets, permissions, parsers
 from django.contrib.auth.models import User
 from rest_framework.serializers import ModelSerializer
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Prefetch
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.exceptions import ValidationError
-import requests
+from rest_framework_simplejwt.views import TokenObtainPairView
 from django.conf import settings
+from django.utils import timezone
 import json
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.contrib.auth.tokens import default_token_generator
-from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
-from django.utils.encoding import force_bytes, force_str
+from django.utils.http import urlsafe_base64_decode
+from django.utils.encoding import force_str
 from decimal import Decimal
-from .email_utils import send_password_reset_email, send_order_confirmation_email, send_order_status_update_email
 import hmac
 import hashlib
+import logging
 import uuid  # add at top if not present
 
 
@@ -45,8 +52,11 @@ class RegisterUserView(generics.CreateAPIView):
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(caching.ResponseCacheMixin, viewsets.ModelViewSet):
     serializer_class = CategorySerializer
+    cache_resource = 'categories'
+    cache_all_users = True  # no per-user fields in the tree
+    pagination_class = None  # the nav tree is small and consumed whole
     parser_classes = [parsers.MultiPartParser, parsers.FormParser, parsers.JSONParser]
 
     def get_queryset(self):
@@ -65,32 +75,98 @@ class CategoryViewSet(viewsets.ModelViewSet):
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
+        if self.request.method in permissions.SAFE_METHODS:
+            context['category_children'] = build_category_children()
         return context
 
+    def uncached_list(self, request, *args, **kwargs):
+        # Assemble the whole tree from one query; the nav reads this on every
+        # storefront page, so ResponseCacheMixin serves it as cached JSON.
+        context = self.get_serializer_context()
+        roots = context['category_children'].get(None, [])
+        is_nav_link = request.query_params.get('is_nav_link')
+        if is_nav_link is not None:
+            roots = [c for c in roots if c.is_nav_link == (is_nav_link.lower() == 'true')]
+        return Response(CategorySerializer(roots, many=True, context=context).data)
+
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [permissions.IsAdminUser()]
         return [permissions.AllowAny()]
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(caching.ResponseCacheMixin, viewsets.ModelViewSet):
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    cache_resource = 'products'
+    # Stock moves on every checkout: entries track their variants' versions
+    # (bumped in reservations.py) instead of the whole catalog being dropped
+    cache_object_resource = 'variants'
+    filter_backends = [DjangoFilterBackend, CategorySlugFilter, ProductSearchFilter, ProductFacetFilter, RelevanceOrderingFilter]
     filterset_fields = ['category', 'is_active']
-    search_fields = ['title', 'description']
     ordering_fields = ['base_price', 'title', 'id']
     ordering = ['-id']  # Order by ID descending (most recent first)
+    pagination_class = StoreCursorPagination
     parser_classes = [parsers.MultiPartParser, parsers.FormParser, parsers.JSONParser]
 
     def get_queryset(self):
-        if self.request.user.is_authenticated and self.request.user.is_staff:
+        user = self.request.user
+        if user.is_authenticated and user.is_staff:
             # Admins can see all products including inactive ones
-            return Product.objects.all()
-        return Product.objects.filter(is_active=True)
+            queryset = Product.objects.all()
+        else:
+            queryset = Product.objects.filter(is_active=True)
+
+        # ?ids=1,2,3 — fetch specific products (e.g. the ones in a cart)
+        # rather than paging through the whole catalog
+        ids = self.request.query_params.get('ids')
+        if ids:
+            queryset = queryset.filter(id__in=[i for i in ids.split(',') if i.strip().isdigit()])
+
+        # Load everything ProductSerializer touches in a fixed number of
+        # queries, however many products are on the page.
+        queryset = queryset.select_related('category').prefetch_related(
+            'variants',
+            'images',
+            Prefetch('reviews', queryset=Review.objects.select_related('user')),
+        )
+
+        if user.is_authenticated:
+            purchased = OrderItem.objects.filter(
+                order__user=user,
+                order__status__in=['paid', 'processing', 'shipped', 'delivered'],
+                variant__product=OuterRef('pk'),
+            )
+            reviewed = Review.objects.filter(user=user, product=OuterRef('pk'))
+            queryset = queryset.annotate(
+                liked_by_user=Exists(ProductLike.objects.filter(user=user, product=OuterRef('pk'))),
+                user_can_review=Exists(purchased) & ~Exists(reviewed),
+            )
+        return queryset
+
+    def cached_object_ids(self, data):
+        return [variant['id'] for product in caching.payload_items(data) for variant in product.get('variants', [])]
+
+    def uncached_list(self, request, *args, **kwargs):
+        response = super().uncached_list(request, *args, **kwargs)
+        # ?facets=1 — counts for the filter sidebar alongside the page
+        if request.query_params.get('facets') and isinstance(response.data, dict):
+            response.data['facets'] = facet_counts(self._facet_base_queryset(), request.query_params)
+        return response
+
+    def _facet_base_queryset(self):
+        """The catalog with every filter except the variant facets applied."""
+        queryset = self.get_queryset()
+        for backend in self.filter_backends:
+            if backend not in (ProductFacetFilter, RelevanceOrderingFilter):
+                queryset = backend().filter_queryset(self.request, queryset, self)
+        return queryset
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
+        if self.request.method in permissions.SAFE_METHODS:
+            # One query for the whole category tree instead of one per node
+            context['category_children'] = build_category_children()
         return context
 
     def get_permissions(self):
@@ -102,6 +178,7 @@ class ProductViewSet(viewsets.ModelViewSet):
 class OrderViewSet(viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
         user = self.request.user
@@ -116,14 +193,102 @@ class OrderViewSet(viewsets.ModelViewSet):
 class CartViewSet(viewsets.ModelViewSet):
     serializer_class = CartSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
 
     def get_queryset(self):
-        return Cart.objects.filter(user=self.request.user)
+        return Cart.objects.filter(user=self.request.user).select_related('user')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 
+def _cart_response(cart, request, status=200):
+    data = CartSerializer(cart, context={'request': request}).data
+    if cart.user_id is None:
+        data['token'] = carts.guest_token(cart)  # refreshed on every response
+    return Response(data, status=status)
+
+
+class GuestCartView(APIView):
+    """
+    Server-side cart for shoppers who aren't signed in.
+
+    POST {"items": [...]} creates one and returns it with a `token`; send the
+    token back as the X-Cart-Token header to GET or PUT (same body as the
+    signed-in cart) it. Responses carry a refreshed token, and it is accepted
+    as `cart_token` by checkout and login.
+    """
+    permission_classes = []
+
+    def post(self, request):
+        serializer = CartSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        cart = carts.create_guest_cart()
+        carts.sync_items(cart, serializer.validated_data['items'])
+        return _cart_response(cart, request, status=201)
+
+    def get(self, request):
+        cart = carts.request_guest_cart(request)
+        if cart is None:
+            return Response({"error": "Cart not found or expired"}, status=404)
+        return _cart_response(cart, request)
+
+    def put(self, request):
+        cart = carts.request_guest_cart(request)
+        if cart is None:
+            return Response({"error": "Cart not found or expired"}, status=404)
+        serializer = CartSerializer(cart, data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return _cart_response(cart, request)
+
+
+class CartItemView(APIView):
+    """
+    PATCH {"variant_id": 12, "quantity": 3} sets one line of the cart (0
+    removes it) without resending the whole cart: the user's own cart when
+    signed in, else the guest cart named by X-Cart-Token. Returns the cart.
+    """
+    permission_classes = []
+
+    def patch(self, request):
+        serializer = CartItemQuantitySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if request.user.is_authenticated:
+            cart, _ = Cart.objects.select_related('user').get_or_create(user=request.user)
+        else:
+            cart = carts.request_guest_cart(request)
+            if cart is None:
+                return Response({"error": "Cart not found or expired"}, status=404)
+        carts.set_quantity(cart, serializer.validated_data['variant'].id, serializer.validated_data['quantity'])
+        return _cart_response(cart, request)
+
+
+class CartMergingTokenObtainPairView(TokenObtainPairView):
+    """
+    JWT login (/api/token/). If the request also names a guest cart (X-Cart-Token
+    or `cart_token`), its lines are merged into the user's cart.
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        self.token_serializer = super().get_serializer(*args, **kwargs)
+        return self.token_serializer
+
+    def post(self, request, *args, **kwargs):
+        response = super().post(request, *args, **kwargs)
+        guest = carts.request_guest_cart(request) if response.status_code == 200 else None
+        if guest is not None:
+            carts.merge_guest_cart(guest, self.token_serializer.user)
+        return response
+
+
+class CheckoutError(Exception):
+    """Aborts the checkout transaction with a customer-facing message."""
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
 
 class CheckoutView(APIView):
     permission_classes = []  # Allow both authenticated and anonymous users
@@ -169,148 +334,150 @@ class CheckoutView(APIView):
 
         shipping_cost = shipping_method.price
 
-        # 4. Load cart or cart items
+        # 4. Load cart or cart items as {variant_id: quantity}
         cart_items_data = request.data.get("cart_items")  # For guest checkout
         cart = None
-        cart_items = []
-        
-        if is_guest:
+        quantities = {}
+
+        if is_guest and request.data.get("cart_token"):
+            # Server-side guest cart: its lines were validated as they were added
+            cart = carts.guest_cart_from_token(request.data["cart_token"])
+            if cart is None:
+                return Response({"error": "Your cart has expired. Please add your items again."}, status=400)
+            quantities = dict(cart.items.values_list("variant_id", "quantity"))
+            if not quantities:
+                return Response({"error": "Cart has no items."}, status=400)
+        elif is_guest:
             # Guest checkout: cart items come from request
             if not cart_items_data or not isinstance(cart_items_data, list) or len(cart_items_data) == 0:
                 return Response({"error": "Cart items are required for guest checkout"}, status=400)
-            cart_items = cart_items_data
+            for item_data in cart_items_data:
+                variant_id = item_data.get("variant_id")
+                try:
+                    variant_id = int(variant_id)
+                    quantity = int(item_data.get("quantity", 1))
+                except (TypeError, ValueError):
+                    return Response({"error": f"Invalid product variant ID: {variant_id}"}, status=400)
+                if quantity < 1:
+                    return Response({"error": "Quantity must be at least 1"}, status=400)
+                quantities[variant_id] = quantities.get(variant_id, 0) + quantity
         else:
             # Authenticated checkout: load from user's cart
             try:
                 cart = Cart.objects.get(user=user)
             except Cart.DoesNotExist:
                 return Response({"error": "Cart is empty."}, status=400)
-            
-            if cart.items.count() == 0:
+
+            quantities = dict(cart.items.values_list("variant_id", "quantity"))
+            if not quantities:
                 return Response({"error": "Cart has no items."}, status=400)
 
-        # 5. Calculate subtotal (before discount and shipping)
-        subtotal = Decimal('0')
-        items_to_process = []
-        
-        if is_guest:
-            # Process guest cart items
-            for item_data in cart_items:
-                variant_id = item_data.get("variant_id")
-                quantity = int(item_data.get("quantity", 1))
-                
-                try:
-                    variant = ProductVariant.objects.get(id=variant_id)
-                except ProductVariant.DoesNotExist:
-                    return Response({"error": f"Invalid product variant ID: {variant_id}"}, status=400)
-                
-                # Stock validation
-                if quantity > variant.stock:
-                    return Response({
-                        "error": f"Not enough stock for {variant}. Available: {variant.stock}"
-                    }, status=400)
-                
-                item_total = variant.price * quantity
-                subtotal += item_total
-                items_to_process.append({"variant": variant, "quantity": quantity, "item_total": item_total})
-        else:
-            # Process authenticated cart items
-            for item in cart.items.all():
-                variant = item.variant
-                
-                # Stock validation
-                if item.quantity > variant.stock:
-                    return Response({
-                        "error": f"Not enough stock for {variant}. Available: {variant.stock}"
-                    }, status=400)
-                
-                item_total = variant.price * item.quantity
-                subtotal += item_total
-                items_to_process.append({"variant": variant, "quantity": item.quantity, "item_total": item_total})
-
-        # 6. Validate and apply discount code if provided
-        discount_code = None
-        discount_amount = Decimal('0')
-        
-        if discount_code_str:
-            try:
-                discount_code_obj = DiscountCode.objects.get(code__iexact=discount_code_str)
-                is_valid, message = discount_code_obj.is_valid(subtotal)
-                
-                if is_valid:
+        try:
+            with transaction.atomic():
+                # 5. Give back lapsed holds on these variants, lock them with
+                # one query, then check availability against the locked rows
+                # so concurrent buyers queue up here instead of both passing
+                # the check on the last unit.
+                reservations.release_expired(variant_ids=list(quantities))
+                variants = (
+                    ProductVariant.objects.select_for_update(of=("self",))
+                    .select_related("product")
+                    .in_bulk(quantities.keys())
+                )
+
+                subtotal = Decimal('0')
+                items_to_process = []
+                for variant_id, quantity in quantities.items():
+                    variant = variants.get(variant_id)
+                    if variant is None:
+                        raise CheckoutError(f"Invalid product variant ID: {variant_id}")
+                    if quantity > variant.available:
+                        raise CheckoutError(f"Not enough stock for {variant}. Available: {variant.available}")
+                    item_total = variant.price * quantity
+                    subtotal += item_total
+                    items_to_process.append({"variant": variant, "quantity": quantity, "item_total": item_total})
+
+                # 6. Validate and apply discount code if provided
+                discount_code = None
+                discount_amount = Decimal('0')
+
+                if discount_code_str:
+                    try:
+                        discount_code_obj = DiscountCode.objects.get(code__iexact=discount_code_str)
+                    except DiscountCode.DoesNotExist:
+                        raise CheckoutError("Invalid discount code")
+                    is_valid, message = discount_code_obj.is_valid(subtotal)
+
+                    if not is_valid:
+                        raise CheckoutError(f"Discount code error: {message}")
+                    # The conditional UPDATE decides whether this checkout gets
+                    # one of the remaining uses; is_valid above may be stale.
+                    if not discount_code_obj.redeem():
+                        raise CheckoutError("Discount code error: This discount code has reached its usage limit")
                     discount_code = discount_code_obj
                     discount_amount = discount_code_obj.calculate_discount(subtotal)
-                    # Increment usage count
-                    discount_code.times_used += 1
-                    discount_code.save()
-                else:
-                    return Response({"error": f"Discount code error: {message}"}, status=400)
-            except DiscountCode.DoesNotExist:
-                return Response({"error": "Invalid discount code"}, status=400)
-
-        # 7. Calculate total (subtotal - discount + shipping)
-        total = subtotal - discount_amount + shipping_cost
-        if total < 0:
-            total = Decimal('0')
-
-        # 8. Create order WITH shipping + address + discount
-        order_data = {
-            "user": user,
-            "is_guest": is_guest,
-            "subtotal": subtotal,
-            "discount_code": discount_code,
-            "discount_amount": discount_amount,
-            "total": total,
-            "shipping_method": shipping_method,
-            "shipping_cost": shipping_cost,
-        }
-        
-        if is_guest:
-            # Guest order: store address directly and guest info
-            order_data.update({
-                "guest_email": guest_email,
-                "guest_name": guest_name,
-                "guest_address_full_name": guest_address.get("full_name"),
-                "guest_address_phone": guest_address.get("phone_number"),
-                "guest_address_line": guest_address.get("address_line"),
-                "guest_address_city": guest_address.get("city"),
-                "guest_address_region": guest_address.get("region"),
-                "guest_address_country": guest_address.get("country", "Ghana"),
-            })
-        else:
-            # Authenticated order: use address FK
-            order_data["address"] = address
-        
-        order = Order.objects.create(**order_data)
-
-        # 9. Create order items and update stock
-        for item_data in items_to_process:
-            variant = item_data["variant"]
-            quantity = item_data["quantity"]
-            item_total = item_data["item_total"]
-            
-            OrderItem.objects.create(
-                order=order,
-                variant=variant,
-                quantity=quantity,
-                item_total=item_total
-            )
-
-            # Update stock
-            variant.stock -= quantity
-            variant.save()
 
-        # 10. Clear cart (only for authenticated users)
-        if not is_guest and cart:
-            cart.items.all().delete()
+                # 7. Calculate total (subtotal - discount + shipping)
+                total = subtotal - discount_amount + shipping_cost
+                if total < 0:
+                    total = Decimal('0')
+
+                # 8. Create order WITH shipping + address + discount
+                order_data = {
+                    "user": user,
+                    "is_guest": is_guest,
+                    "subtotal": subtotal,
+                    "discount_code": discount_code,
+                    "discount_amount": discount_amount,
+                    "total": total,
+                    "shipping_method": shipping_method,
+                    "shipping_cost": shipping_cost,
+                }
 
-        # 11. Send order confirmation email
+                if is_guest:
+                    # Guest order: store address directly and guest info
+                    order_data.update({
+                        "guest_email": guest_email,
+                        "guest_name": guest_name,
+                        "guest_address_full_name": guest_address.get("full_name"),
+                        "guest_address_phone": guest_address.get("phone_number"),
+                        "guest_address_line": guest_address.get("address_line"),
+                        "guest_address_city": guest_address.get("city"),
+                        "guest_address_region": guest_address.get("region"),
+                        "guest_address_country": guest_address.get("country", "Ghana"),
+                    })
+                else:
+                    # Authenticated order: use address FK
+                    order_data["address"] = address
+
+                order = Order.objects.create(**order_data)
+
+                # 9. Create order items in one INSERT and hold their stock
+                # until payment (see reservations.py). The guarded UPDATE is
+                # redundant on databases that honour the row locks above, but
+                # keeps SQLite honest too.
+                OrderItem.objects.bulk_create([
+                    OrderItem(order=order, variant=item["variant"], quantity=item["quantity"], item_total=item["item_total"])
+                    for item in items_to_process
+                ])
+
+                if not reservations.place_holds(order, quantities):
+                    raise CheckoutError("Some items sold out while you were checking out. Please review your cart.")
+
+                # 10. Clear the cart; a guest cart is spent once ordered
+                if cart and cart.user_id is None:
+                    cart.delete()
+                elif cart:
+                    cart.items.all().delete()
+        except CheckoutError as e:
+            return Response({"error": e.message}, status=400)
+
+        # 11. Queue the order confirmation email (sent by the task worker)
         try:
-            print(f"Sending order confirmation email for order id {order.id}, user: {order.user}")
-            send_order_confirmation_email(order)
+            tasks.enqueue("send_order_confirmation_email", order.id)
         except Exception as e:
-            print(f"Error sending order confirmation email: {e}")
             # Don't fail the request if email fails
+            log_event("checkout.confirmation_email_failed", logging.ERROR, order_id=order.id, error=str(e))
 
         return Response({
             "message": "Order created successfully",
@@ -342,68 +509,64 @@ class PaystackInitializeView(APIView):
             return Response({"error": "Order not found."}, status=404)
 
         # Check if order is already paid
-        if order.status == "paid":
+        if order.status in reservations.PAID_STATUSES:
             return Response({
                 "error": "This order has already been paid.",
                 "order_status": order.status
             }, status=400)
+        if order.status == "cancelled":
+            return Response({
+                "error": "This order has expired or was cancelled. Please check out again.",
+                "order_status": order.status
+            }, status=409)
 
         if order.total <= 0:
             return Response({"error": "Invalid order amount."}, status=400)
 
+        # Hold the items again for the time the customer spends paying; if
+        # they sold after this order's holds lapsed, it can't be paid
+        if not reservations.renew_holds(order):
+            order.status = "cancelled"
+            order.save(update_fields=["status"])
+            return Response({
+                "error": "Some items in this order are no longer available. Please check out again.",
+                "order_status": order.status
+            }, status=409)
+
         # Get payment channel from request (card or mobile_money)
         payment_channel = request.data.get("payment_channel", "card")
 
-        # Prepare Paystack payload
         customer_email = user.email if user else order.guest_email
         unique_ref = f"order_{order.id}_{uuid.uuid4().hex[:8]}"
-        payload = {
-            "email": customer_email,
-            "amount": int(order.total * 100),
-            "reference": unique_ref,
-            "callback_url": f"{settings.FRONTEND_URL}/payment-success?reference={unique_ref}",
-            "channels": [payment_channel]
-        }
-
-        headers = {
-            "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
-            "Content-Type": "application/json"
-        }
-
-        url = f"{settings.PAYSTACK_BASE_URL}/transaction/initialize"
 
         # Call Paystack
         try:
-            print(f"Initializing Paystack payment for order id {order.id}, user: {user}, guest_email: {order.guest_email if not user else 'N/A'}")
-            print(f"Paystack payload: {payload}")
-            response = requests.post(url, json=payload, headers=headers)
-            print(f"Paystack response status code: {response.status_code}")
-            print(f"Paystack response text: {response.text}")
-
-            if response.status_code != 200:
-                error_detail = response.text
-                print(f"Paystack API error: {response.status_code} - {error_detail}")
-                return Response({"error": f"Failed to initiate Paystack payment: {error_detail}"}, status=500)
-
-            data = response.json()
+            log_event("paystack.initialize", order_id=order.id, user_id=user.id if user else None,
+                      guest=user is None, channel=payment_channel, amount=int(order.total * 100))
+            data = paystack.initialize_transaction(
+                email=customer_email,
+                amount=int(order.total * 100),
+                reference=unique_ref,
+                callback_url=f"{settings.FRONTEND_URL}/payment-success?reference={unique_ref}",
+                channels=[payment_channel],
+            )
+        except paystack.PaystackError as e:
+            log_event("paystack.initialize_failed", logging.ERROR, order_id=order.id,
+                      status_code=e.status_code, error=e.message)
+            return Response({"error": f"Failed to initiate Paystack payment: {e.message}"}, status=500)
 
-            if "data" not in data or "authorization_url" not in data["data"]:
-                print(f"Unexpected Paystack response: {data}")
-                return Response({"error": "Invalid response from Paystack"}, status=500)
+        if "authorization_url" not in data:
+            log_event("paystack.unexpected_response", logging.ERROR, order_id=order.id, response=data)
+            return Response({"error": "Invalid response from Paystack"}, status=500)
 
-            return Response({
-                "authorization_url": data["data"]["authorization_url"],
-                "access_code": data["data"]["access_code"],
-                "reference": data["data"]["reference"],
-                "public_key": settings.PAYSTACK_PUBLIC_KEY,
-                "amount": int(order.total * 100),
-                "email": customer_email
-            })
-        except Exception as e:
-            print(f"Error initializing Paystack payment: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return Response({"error": f"Error initializing payment: {str(e)}"}, status=500)
+        return Response({
+            "authorization_url": data["authorization_url"],
+            "access_code": data.get("access_code"),
+            "reference": data.get("reference", unique_ref),
+            "public_key": settings.PAYSTACK_PUBLIC_KEY,
+            "amount": int(order.total * 100),
+            "email": customer_email
+        })
     
 
 class PaystackWebhookView(APIView):
@@ -420,7 +583,7 @@ class PaystackWebhookView(APIView):
             paystack_signature = request.headers.get("x-paystack-signature")
             if paystack_signature:
                 computed_signature = self._generate_signature(request.body)
-                if paystack_signature != computed_signature:
+                if not hmac.compare_digest(paystack_signature, computed_signature):
                     return Response({"error": "Invalid signature"}, status=400)
         else:
             # For production, always verify the signature
@@ -428,15 +591,18 @@ class PaystackWebhookView(APIView):
             if not paystack_signature:
                 return Response({"error": "No signature provided"}, status=400)
             computed_signature = self._generate_signature(request.body)
-            if paystack_signature != computed_signature:
+            if not hmac.compare_digest(paystack_signature, computed_signature):
                 return Response({"error": "Invalid signature"}, status=400)
 
-        event = request.data.get("event")
-
-        if event == "charge.success":
-            reference = request.data.get("data", {}).get("reference")
-            if reference:
-                self.handle_payment_success(reference)
+        # Record and queue; verification, the status change, the email and
+        # the delivery booking run in the process_paystack_event task.
+        # Redeliveries stop at the ledger lookup.
+        payload = request.data if isinstance(request.data, dict) else {}
+        with transaction.atomic():
+            record = webhooks.record_paystack_event(payload)
+            if record is not None:
+                tasks.enqueue("process_paystack_event", record.id)
+        log_event("paystack.webhook", paystack_event=payload.get("event"), recorded=record is not None)
 
         return Response({"status": "success"})
 
@@ -444,50 +610,29 @@ class PaystackWebhookView(APIView):
         secret = settings.PAYSTACK_SECRET_KEY.encode('utf-8')
         return hmac.new(secret, payload, hashlib.sha512).hexdigest()
 
-    def handle_payment_success(self, reference):
-        # Example reference format: "order_12"
-        if not reference.startswith("order_"):
-            return
-
-        order_id = int(reference.split("_")[1])
 
-        # Verify transaction with Paystack
-        verify_url = f"https://api.paystack.co/transaction/verify/{reference}"
-        headers = {"Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}"}
-
-        response = requests.get(verify_url, headers=headers)
-        data = response.json()
-
-        if data["status"] is False or data["data"]["status"] != "success":
-            return
-
-        try:
-            order = Order.objects.get(id=order_id)
-            order.status = "paid"
-            order.save()
-            
-            # Send order status update email
-            try:
-                send_order_status_update_email(order)
-            except Exception as e:
-                print(f"Error sending order status update email: {e}")
-
-            # Auto-create the Mckot delivery now that payment has succeeded.
-            # No-op if no drop-off was selected or delivery isn't configured.
-            try:
-                book_delivery_for_order(order)
-            except Exception as e:
-                print(f"Error booking delivery for order {order.id}: {e}")
-        except Order.DoesNotExist:
-            pass
+def with_order_details(queryset):
+    """
+    Load everything OrderDetailSerializer touches (address, shipping method,
+    discount code, items with their variant, product and first image) in a
+    fixed number of queries, however many items the orders have.
+    """
+    return queryset.select_related('address', 'shipping_method', 'discount_code').prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('variant__product')),
+        Prefetch('items__variant__product__images', queryset=ProductImage.objects.order_by('id')[:1],
+                 to_attr='first_images'),
+    )
 
 
 class OrderHistoryView(generics.ListAPIView):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user).order_by('-created_at')
+        return Order.objects.filter(user=self.request.user).order_by('-created_at').select_related(
+            'user', 'discount_code'
+        ).prefetch_related(Prefetch('items', queryset=OrderItem.objects.select_related('variant')))
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -502,7 +647,7 @@ class OrderDetailView(generics.RetrieveAPIView):
     def get_queryset(self):
         user = self.request.user if self.request.user.is_authenticated else None
         if user:
-            return Order.objects.filter(user=user)
+            return with_order_details(Order.objects.filter(user=user))
         # For guest access, check via email in request
         return Order.objects.none()  # Will be handled by get_object
 
@@ -511,6 +656,12 @@ class OrderDetailView(generics.RetrieveAPIView):
         context['request'] = self.request
         return context
 
+    def retrieve(self, request, *args, **kwargs):
+        order = self.get_object()
+        context = self.get_serializer_context()
+        context['order_item_reviews'] = build_order_item_reviews(request.user, order.items.all())
+        return Response(self.get_serializer(order, context=context).data)
+
 
 
 class GuestOrderTrackView(APIView):
@@ -530,7 +681,7 @@ class GuestOrderTrackView(APIView):
             )
 
         try:
-            order = Order.objects.get(
+            order = with_order_details(Order.objects).get(
                 id=order_id,
                 is_guest=True,
                 guest_email__iexact=email
@@ -552,6 +703,7 @@ class GuestOrderTrackView(APIView):
 class AddressViewSet(viewsets.ModelViewSet):
     serializer_class = AddressSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
 
     def get_queryset(self):
         return Address.objects.filter(user=self.request.user)
@@ -560,9 +712,11 @@ class AddressViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
 
 
-class ShippingMethodViewSet(viewsets.ReadOnlyModelViewSet):
+class ShippingMethodViewSet(caching.ResponseCacheMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = ShippingMethodSerializer
+    cache_resource = 'shipping-methods'
     permission_classes = [permissions.AllowAny]
+    pagination_class = None
     queryset = ShippingMethod.objects.filter(is_active=True)
 
 
@@ -580,15 +734,16 @@ class OrderStatusUpdateView(generics.UpdateAPIView):
             order.refresh_from_db()
             if order.status != old_status or order.tracking_number != old_tracking:
                 try:
-                    send_order_status_update_email(order)
+                    tasks.enqueue("send_order_status_update_email", order.id)
                 except Exception as e:
-                    print(f"Error sending order status update email: {e}")
+                    log_event("order.status_email_failed", logging.ERROR, order_id=order.id, error=str(e))
         return response
 
 
 class FavoriteViewSet(viewsets.ModelViewSet):
     serializer_class = FavoriteSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
 
     def get_queryset(self):
         # Return all favorites for the user, including those with inactive products
@@ -631,20 +786,25 @@ class ProductLikeView(APIView):
         except Product.DoesNotExist:
             return Response({"error": "Product not found."}, status=404)
 
-        like, created = ProductLike.objects.get_or_create(
-            user=request.user,
-            product=product
-        )
+        with transaction.atomic():
+            like, created = ProductLike.objects.get_or_create(
+                user=request.user,
+                product=product
+            )
 
-        if not created:
-            like.delete()
-            return Response({"liked": False, "message": "Product unliked"})
+            if not created:
+                # like_count follows the row (store/signals.py), so a double-tap
+                # racing another unlike that deletes nothing can't count twice
+                ProductLike.objects.filter(pk=like.pk).delete()
+                return Response({"liked": False, "message": "Product unliked"})
 
         return Response({"liked": True, "message": "Product liked"})
 
 
-class HeroSlideViewSet(viewsets.ModelViewSet):
+class HeroSlideViewSet(caching.ResponseCacheMixin, viewsets.ModelViewSet):
     serializer_class = HeroSlideSerializer
+    cache_resource = 'hero-slides'
+    pagination_class = None
     parser_classes = [parsers.MultiPartParser, parsers.FormParser, parsers.JSONParser]
 
     def get_queryset(self):
@@ -664,8 +824,10 @@ class HeroSlideViewSet(viewsets.ModelViewSet):
         return [permissions.AllowAny()]
 
 
-class PromoBannerViewSet(viewsets.ModelViewSet):
+class PromoBannerViewSet(caching.ResponseCacheMixin, viewsets.ModelViewSet):
     serializer_class = PromoBannerSerializer
+    cache_resource = 'promo-banners'
+    pagination_class = None
     parser_classes = [parsers.MultiPartParser, parsers.FormParser, parsers.JSONParser]
 
     def get_queryset(self):
@@ -682,9 +844,7 @@ class PromoBannerViewSet(viewsets.ModelViewSet):
         try:
             return super().create(request, *args, **kwargs)
         except Exception as e:
-            print(f"Error creating HeroSlide: {e}")
-            import traceback
-            traceback.print_exc()
+            log_event("hero_slide.create_failed", logging.ERROR, error=str(e))
             return Response({"error": "An error occurred while creating the hero slide."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 class UsersStatsView(APIView):
@@ -714,6 +874,7 @@ class UsersStatsView(APIView):
 class ProductVariantViewSet(viewsets.ModelViewSet):
     serializer_class = ProductVariantSerializer
     permission_classes = [permissions.IsAdminUser]
+    pagination_class = None
 
     def get_queryset(self):
         return ProductVariant.objects.all()
@@ -722,6 +883,7 @@ class ProductVariantViewSet(viewsets.ModelViewSet):
 class ProductImageViewSet(viewsets.ModelViewSet):
     serializer_class = ProductImageSerializer
     permission_classes = [permissions.IsAdminUser]
+    pagination_class = None
     parser_classes = [parsers.MultiPartParser, parsers.FormParser, parsers.JSONParser]
 
     def get_queryset(self):
@@ -732,6 +894,7 @@ class DiscountCodeViewSet(viewsets.ModelViewSet):
     queryset = DiscountCode.objects.all()
     serializer_class = DiscountCodeSerializer
     permission_classes = [permissions.IsAdminUser]  # Only admins can manage discount codes
+    pagination_class = CreatedAtCursorPagination
 
 
 class ReturnRequestViewSet(viewsets.ModelViewSet):
@@ -741,6 +904,7 @@ class ReturnRequestViewSet(viewsets.ModelViewSet):
     """
     serializer_class = ReturnRequestSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
         user = self.request.user
@@ -801,63 +965,94 @@ class ProcessRefundView(APIView):
         # Get the original order payment reference
         order = return_request.order
         payment_reference = f"order_{order.id}"
+        # Identifies this return's refund on Paystack, which takes no idempotency key
+        merchant_note = f"Return request #{return_request.id} - Order #{order.id}"
 
-        # Process refund through Paystack
-        refund_amount = int(return_request.approved_refund_amount * 100)  # Convert to pesewas
-        
-        payload = {
-            "transaction": payment_reference,
-            "amount": refund_amount,  # Amount to refund in pesewas
-            "currency": "GHS",
-            "customer_note": f"Refund for return request #{return_request.id}",
-            "merchant_note": f"Return request #{return_request.id} - Order #{order.id}"
-        }
-
-        headers = {
-            "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
-            "Content-Type": "application/json"
-        }
+        # Record the attempt before calling Paystack: a POST that timed out may
+        # still have refunded, so a retry looks for that refund before sending another
+        if return_request.refund_attempted_at:
+            try:
+                data = self._find_refund(payment_reference, merchant_note)
+            except paystack.PaystackError as e:
+                return Response({
+                    "error": f"Could not check for an earlier refund attempt: {e.message}"
+                }, status=status.HTTP_502_BAD_GATEWAY)
+        else:
+            data = None
+        if data is None:
+            claimed = ReturnRequest.objects.filter(
+                pk=return_request.pk, status='approved',
+                refund_attempted_at=return_request.refund_attempted_at,
+            ).update(refund_attempted_at=timezone.now())
+            if not claimed:
+                return Response({
+                    "error": "A refund for this return request is already in progress."
+                }, status=status.HTTP_409_CONFLICT)
+            data = self._create_refund(return_request, payment_reference, merchant_note)
+            if isinstance(data, Response):
+                return data
+
+        # Refund successful
+        updated = ReturnRequest.objects.filter(pk=return_request.pk, status='approved').update(
+            status='refunded',
+            refund_reference=(data.get('transaction') or {}).get('reference', '') or payment_reference,
+            processed_at=timezone.now(),
+        )
+        if not updated:
+            return Response({"error": "Return request was already refunded."}, status=status.HTTP_409_CONFLICT)
+        return_request.refresh_from_db()
+
+        # Restore stock if returning order item
+        # (an UPDATE, so a concurrent checkout's `reserved` is not overwritten)
+        if return_request.order_item and return_request.order_item.variant_id:
+            ProductVariant.objects.filter(pk=return_request.order_item.variant_id).update(
+                stock=F('stock') + return_request.order_item.quantity
+            )
+            caching.bump_objects('variants', [return_request.order_item.variant_id])
 
-        url = f"{settings.PAYSTACK_BASE_URL}/refund"
+        return Response({
+            "message": "Refund processed successfully",
+            "refund_reference": return_request.refund_reference,
+            "refund_amount": str(return_request.approved_refund_amount),
+        }, status=status.HTTP_200_OK)
+
+    def _find_refund(self, payment_reference, merchant_note):
+        """The refund an earlier attempt made for this return, if Paystack has one."""
+        for refund in paystack.list_refunds(payment_reference) or []:
+            if refund.get('merchant_note') == merchant_note and refund.get('status') != 'failed':
+                return {'transaction': {'reference': payment_reference}}
+        return None
 
+    def _create_refund(self, return_request, payment_reference, merchant_note):
+        refund_amount = int(return_request.approved_refund_amount * 100)  # Convert to pesewas
         try:
-            response = requests.post(url, json=payload, headers=headers)
-            response_data = response.json()
-
-            if response.status_code == 200 and response_data.get('status'):
-                # Refund successful
-                return_request.status = 'refunded'
-                return_request.refund_reference = response_data.get('data', {}).get('transaction', {}).get('reference', '')
-                return_request.processed_at = timezone.now()
-                return_request.save()
-
-                # Restore stock if returning order item
-                if return_request.order_item and return_request.order_item.variant:
-                    variant = return_request.order_item.variant
-                    variant.stock += return_request.order_item.quantity
-                    variant.save()
-
-                return Response({
-                    "message": "Refund processed successfully",
-                    "refund_reference": return_request.refund_reference,
-                    "refund_amount": str(return_request.approved_refund_amount),
-                }, status=status.HTTP_200_OK)
-            else:
-                error_message = response_data.get('message', 'Failed to process refund')
+            return paystack.create_refund(
+                transaction=payment_reference,
+                amount=refund_amount,
+                currency="GHS",
+                customer_note=f"Refund for return request #{return_request.id}",
+                merchant_note=merchant_note,
+            )
+        except paystack.PaystackError as e:
+            if e.status_code is None:
+                # May or may not have reached Paystack (timeout / connection
+                # error); the attempt stays recorded so a retry checks first
                 return Response({
-                    "error": f"Paystack refund failed: {error_message}",
-                    "details": response_data
-                }, status=status.HTTP_400_BAD_REQUEST)
-
-        except Exception as e:
+                    "error": f"Error processing refund: {e.message}"
+                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            if e.status_code < 500:
+                # Rejected outright, so nothing was refunded
+                ReturnRequest.objects.filter(pk=return_request.pk).update(refund_attempted_at=None)
             return Response({
-                "error": f"Error processing refund: {str(e)}"
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                "error": f"Paystack refund failed: {e.message}",
+                "details": e.body
+            }, status=status.HTTP_400_BAD_REQUEST)
 
 
 class ReviewViewSet(viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
         product_id = self.request.query_params.get('product', None)
@@ -902,7 +1097,17 @@ class ReviewViewSet(viewsets.ModelViewSet):
         if existing_review.exists():
             raise ValidationError("You have already reviewed this product.")
 
-        serializer.save(user=user)
+        with transaction.atomic():
+            # The Review signals recompute the rating stats (store/signals.py)
+            serializer.save(user=user)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            product = Product.objects.select_for_update().get(pk=serializer.instance.product_id)
+            serializer.save()
+            if serializer.instance.product_id != product.pk:
+                # Review was moved to another product; the signal only refreshes that one
+                product.refresh_rating_stats()
 
 
 # ============================
@@ -949,31 +1154,33 @@ class SalesAnalyticsView(APIView):
     permission_classes = [permissions.IsAdminUser]
     
     def get(self, request):
-        from django.db.models import Sum, Count
-        from django.db.models.functions import TruncDate, TruncMonth
         from datetime import timedelta
         
         days = int(request.query_params.get('days', 30))
         start_date = timezone.now() - timedelta(days=days)
+        previous_start = start_date - timedelta(days=days)
+        
+        # Per (day, status) totals: whole days come from the rollup tables,
+        # the partial first day, today and days whose rollup is still queued
+        # from the orders themselves (store/analytics.py)
+        unrolled = analytics.unrolled_days()
+        period_rows = analytics.order_rows(start_date, unrolled=unrolled)
+        previous_rows = analytics.order_rows(previous_start, start_date, unrolled=unrolled)
+        
+        def paid_revenue(rows):
+            return sum(
+                (row['revenue'] or Decimal('0') for row in rows if row['status'] in analytics.PAID_STATUSES),
+                Decimal('0'),
+            )
         
         # Total revenue (all time)
-        total_revenue = Order.objects.filter(
-            status__in=['paid', 'processing', 'shipped', 'delivered']
-        ).aggregate(total=Sum('total'))['total'] or Decimal('0')
+        total_revenue = analytics.total_revenue(unrolled=unrolled)
         
         # Revenue for selected period
-        period_revenue = Order.objects.filter(
-            status__in=['paid', 'processing', 'shipped', 'delivered'],
-            created_at__gte=start_date
-        ).aggregate(total=Sum('total'))['total'] or Decimal('0')
+        period_revenue = paid_revenue(period_rows)
         
         # Previous period for comparison
-        previous_start = start_date - timedelta(days=days)
-        previous_period_revenue = Order.objects.filter(
-            status__in=['paid', 'processing', 'shipped', 'delivered'],
-            created_at__gte=previous_start,
-            created_at__lt=start_date
-        ).aggregate(total=Sum('total'))['total'] or Decimal('0')
+        previous_period_revenue = paid_revenue(previous_rows)
         
         # Calculate revenue change percentage
         revenue_change = 0
@@ -981,39 +1188,20 @@ class SalesAnalyticsView(APIView):
             revenue_change = ((period_revenue - previous_period_revenue) / previous_period_revenue) * 100
         
         # Orders count for period
-        period_orders = Order.objects.filter(created_at__gte=start_date).count()
+        period_orders = sum(row['order_count'] for row in period_rows)
         
         # Revenue by day (for chart)
-        daily_revenue = Order.objects.filter(
-            status__in=['paid', 'processing', 'shipped', 'delivered'],
-            created_at__gte=start_date
-        ).annotate(
-            date=TruncDate('created_at')
-        ).values('date').annotate(
-            revenue=Sum('total')
-        ).order_by('date')
+        daily_totals = {}
+        for row in period_rows:
+            if row['status'] in analytics.PAID_STATUSES:
+                daily_totals[row['date']] = daily_totals.get(row['date'], Decimal('0')) + (row['revenue'] or 0)
+        daily_revenue = [{'date': date, 'revenue': revenue} for date, revenue in sorted(daily_totals.items())]
         
         # Revenue by month (last 12 months)
-        monthly_revenue = Order.objects.filter(
-            status__in=['paid', 'processing', 'shipped', 'delivered']
-        ).annotate(
-            month=TruncMonth('created_at')
-        ).values('month').annotate(
-            revenue=Sum('total')
-        ).order_by('month')[:12]
+        monthly_revenue = analytics.monthly_revenue(unrolled=unrolled)
         
         # Top products by quantity sold
-        from django.db.models import F
-        top_products = OrderItem.objects.filter(
-            order__status__in=['paid', 'processing', 'shipped', 'delivered'],
-            order__created_at__gte=start_date
-        ).values(
-            'variant__product__id',
-            'variant__product__title'
-        ).annotate(
-            total_quantity=Sum('quantity'),
-            total_revenue=Sum(F('item_total'))
-        ).order_by('-total_quantity')[:10]
+        top_products = analytics.top_products(start_date, unrolled=unrolled)
         
         # Recent orders
         recent_orders = Order.objects.select_related('user').order_by('-created_at')[:10]
@@ -1034,13 +1222,10 @@ class SalesAnalyticsView(APIView):
             avg_order_value = period_revenue / period_orders
         
         # Discount statistics
-        discount_stats = Order.objects.filter(
-            discount_code__isnull=False,
-            created_at__gte=start_date
-        ).aggregate(
-            total_discount=Sum('discount_amount'),
-            count=Count('id')
-        )
+        discount_stats = {
+            'total_discount': sum((row['discount_total'] or Decimal('0') for row in period_rows), Decimal('0')),
+            'count': sum(row['discount_order_count'] for row in period_rows),
+        }
         
         # Format daily revenue for chart
         daily_revenue_list = [
@@ -1063,16 +1248,19 @@ class SalesAnalyticsView(APIView):
         # Format top products
         top_products_list = [
             {
-                'product_id': item['variant__product__id'],
-                'product_name': item['variant__product__title'] or 'Unknown Product',
-                'quantity_sold': item['total_quantity'] or 0,
-                'revenue': float(item['total_revenue'] or 0)
+                'product_id': item['product_id'],
+                'product_name': item['title'] or 'Unknown Product',
+                'quantity_sold': item['quantity'] or 0,
+                'revenue': float(item['revenue'] or 0)
             }
             for item in top_products
         ]
         
         # Format orders by status
-        orders_by_status = Order.objects.filter(created_at__gte=start_date).values('status').annotate(count=Count('id'))
+        status_counts = {}
+        for row in period_rows:
+            status_counts[row['status']] = status_counts.get(row['status'], 0) + row['order_count']
+        orders_by_status = [{'status': s, 'count': c} for s, c in status_counts.items() if c]
         orders_by_status_list = [
             {
                 'status': item['status'],
@@ -1117,16 +1305,12 @@ class PasswordResetRequestView(APIView):
             # Don't reveal if email exists or not for security
             return Response({"message": "If an account exists with this email, a password reset link has been sent."}, status=200)
         
-        # Generate token
-        token = default_token_generator.make_token(user)
-        uid = urlsafe_base64_encode(force_bytes(user.pk))
-        
-        # Send email
+        # Queue email; the task makes the token, so it is never stored in the job
         try:
-            send_password_reset_email(user, f"{uid}:{token}")
+            tasks.enqueue("send_password_reset_email", user.pk)
             return Response({"message": "If an account exists with this email, a password reset link has been sent."}, status=200)
         except Exception as e:
-            print(f"Error sending password reset email: {e}")
+            log_event("password_reset.email_failed", logging.ERROR, user_id=user.pk, error=str(e))
             return Response({"error": "Failed to send password reset email"}, status=500)
 
 
@@ -1191,33 +1375,6 @@ def _dropoff_from_request(request):
     )
 
 
-def _apply_delivery_data(delivery, data):
-    """Map a Mckot delivery object onto our Delivery row (partial-safe)."""
-    if not isinstance(data, dict):
-        return
-    if data.get("id"):
-        delivery.mckot_delivery_id = data["id"]
-    if data.get("status"):
-        delivery.status = data["status"]
-    if data.get("collection_status"):
-        delivery.collection_status = data["collection_status"]
-    courier = data.get("courier") or {}
-    if courier.get("name"):
-        delivery.courier_name = courier["name"]
-    if courier.get("phone"):
-        delivery.courier_phone = courier["phone"]
-    if data.get("tracking_url"):
-        delivery.tracking_url = data["tracking_url"]
-    fee = data.get("delivery_fee") or {}
-    if isinstance(fee, dict) and fee.get("amount") is not None:
-        delivery.delivery_fee = fee["amount"]
-    if data.get("distance_km") is not None:
-        delivery.distance_km = data["distance_km"]
-    if data.get("duration_minutes") is not None:
-        delivery.duration_minutes = data["duration_minutes"]
-    delivery.raw_response = data
-
-
 def _customer_from_order(order):
     if order.user:
         name = order.user.get_full_name() or order.user.username
@@ -1243,24 +1400,27 @@ def book_delivery_for_order(order):
         return delivery
 
     coords = [float(delivery.dropoff_lat), float(delivery.dropoff_lng)]
-    fresh = mckot.quote(
-        coords,
-        pickup_coordinates=_pickup_from_settings(),
-        ride_type_id=delivery.ride_type_id,
-    )
+    pickup = _pickup_from_settings()
+    # Reuses the checkout quote while it is still fresh; exact=True so the
+    # courier goes to this customer's pin, not a neighbour's.
+    fresh = mckot.cached_quote(coords, pickup_coordinates=pickup, ride_type_id=delivery.ride_type_id, exact=True)
     quote_id = fresh.get("quote_id")
-    data = mckot.create_delivery(
-        quote_id=quote_id,
+    booking = dict(
         order_ref=order.id,
         customer=_customer_from_order(order),
         goods={"payment": "prepaid"},  # order was paid online
         fee_payer=getattr(settings, "MCKOT_DEFAULT_FEE_PAYER", "merchant_wallet"),
     )
-    _apply_delivery_data(delivery, data)
-    if quote_id:
-        delivery.quote_id = quote_id
-    delivery.save()
-    return delivery
+    try:
+        data = mckot.create_delivery(quote_id=quote_id, **booking)
+    except mckot.MckotError as e:
+        if not (e.code and "quote" in e.code):
+            raise
+        # Cached quote was rejected (expired/used); re-quote once and retry
+        mckot.invalidate_quote(coords, pickup_coordinates=pickup, ride_type_id=delivery.ride_type_id)
+        quote_id = mckot.quote(coords, pickup_coordinates=pickup, ride_type_id=delivery.ride_type_id).get("quote_id")
+        data = mckot.create_delivery(quote_id=quote_id, **booking)
+    return webhooks.apply_delivery_snapshot(delivery, data, **({"quote_id": quote_id} if quote_id else {}))
 
 
 def _get_order_for_request(request, order_id):
@@ -1284,7 +1444,7 @@ class DeliveryQuoteView(APIView):
             return Response({"error": "dropoff coordinates [lat, lng] are required"}, status=400)
         ride_type_id = request.data.get("ride_type_id")
         try:
-            data = mckot.quote(coords, pickup_coordinates=_pickup_from_settings(), ride_type_id=ride_type_id)
+            data = mckot.cached_quote(coords, pickup_coordinates=_pickup_from_settings(), ride_type_id=ride_type_id)
         except mckot.MckotConfigError:
             return Response({"error": "Delivery is not configured"}, status=503)
         except mckot.MckotError as e:
@@ -1308,8 +1468,7 @@ class OrderDeliveryView(APIView):
             return Response({"error": "No delivery for this order"}, status=404)
         if delivery.mckot_delivery_id and delivery.status not in ("delivered", "cancelled"):
             try:
-                _apply_delivery_data(delivery, mckot.get_delivery(delivery.mckot_delivery_id))
-                delivery.save()
+                delivery = webhooks.apply_delivery_snapshot(delivery, mckot.get_delivery(delivery.mckot_delivery_id))
             except mckot.MckotError:
                 pass  # serve last-known status
         return Response(DeliverySerializer(delivery).data)
@@ -1328,7 +1487,7 @@ class OrderDeliveryView(APIView):
         if ride_type_id is not None:
             delivery.ride_type_id = ride_type_id
         try:
-            data = mckot.quote(coords, pickup_coordinates=_pickup_from_settings(), ride_type_id=ride_type_id)
+            data = mckot.cached_quote(coords, pickup_coordinates=_pickup_from_settings(), ride_type_id=ride_type_id)
         except mckot.MckotConfigError:
             return Response({"error": "Delivery is not configured"}, status=503)
         except mckot.MckotError as e:
@@ -1384,20 +1543,9 @@ class MckotWebhookView(APIView):
         if not mckot.verify_webhook_signature(request.body, signature):
             return Response({"error": "Invalid signature"}, status=400)
 
-        delivery_id = request.headers.get("X-Mckot-Delivery-Id")
-        payload = request.data if isinstance(request.data, dict) else {}
-        data = payload.get("data") or payload
-
-        delivery = None
-        if delivery_id:
-            delivery = Delivery.objects.filter(mckot_delivery_id=delivery_id).first()
-        if not delivery and isinstance(data, dict):
-            if data.get("id"):
-                delivery = Delivery.objects.filter(mckot_delivery_id=data["id"]).first()
-            if not delivery and data.get("order_ref"):
-                delivery = Delivery.objects.filter(order_id=data["order_ref"]).first()
-
-        if delivery:
-            _apply_delivery_data(delivery, data)
-            delivery.save()
+        # Append and acknowledge; the apply_mckot_events task folds events
+        # into Delivery in batches (see webhooks.py)
+        with transaction.atomic():
+            webhooks.record_mckot_event(request.data, delivery_ref=request.headers.get("X-Mckot-Delivery-Id"))
+            tasks.enqueue("apply_mckot_events")
         return Response({"status": "ok"})
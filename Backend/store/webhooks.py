@@ -0,0 +1,273 @@
+"""
+Webhook event ledgers.
+
+A webhook view checks the signature, records the event and queues its
+processing, then answers. Providers redeliver until they get a 2xx, and
+under load they retry before the first delivery has finished, so the
+ledger's unique constraint decides which delivery does the work: a repeat
+is turned away by one indexed lookup (or, if it races the first, by the
+constraint itself) without calling out to anyone.
+
+Paystack: record_paystack_event() in the view, then the
+process_paystack_event task verifies the charge with Paystack
+(verify_paystack_event, outside any transaction) and marks the order paid
+(apply_paystack_event), queueing the status email and delivery booking in
+the same transaction.
+
+Mckot: couriers fire many status events per delivery, and a repeat is
+harmless, so record_mckot_event() just appends to MckotEvent. The
+apply_mckot_events task folds unapplied events into Delivery in batches:
+one query finds their deliveries, one bulk_update writes them. Events older
+than the last one applied, and statuses that would move a delivery
+backwards, are skipped. Each status change is kept in
+Delivery.status_history. An event whose delivery we don't have yet (it can
+arrive before the booking is saved) stays unapplied and is retried on each
+run, up to MCKOT_EVENT_RETRY_HOURS after it arrived. Delivery objects we
+fetch ourselves go through apply_delivery_snapshot(), which locks the row so
+it can't overwrite a batch being applied.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import mckot, paystack
+from .instrumentation import log_event
+from .models import Delivery, MckotEvent, Order, PaystackEvent
+from .reservations import PAID_STATUSES
+
+# Events with follow-up work; anything else is acknowledged and dropped
+PAYSTACK_EVENTS = {'charge.success'}
+
+
+def order_id_from_reference(reference):
+    """Order id from an "order_<id>_<nonce>" reference, or None."""
+    prefix, _, rest = reference.partition('_')
+    order_id = rest.split('_', 1)[0]
+    return int(order_id) if prefix == 'order' and order_id.isdigit() else None
+
+
+def record_paystack_event(payload):
+    """
+    Add a signature-checked Paystack payload to the ledger. Returns the new
+    PaystackEvent, or None for a redelivery or an event we don't handle.
+    """
+    event = payload.get('event')
+    data = payload.get('data') or {}
+    reference = data.get('reference') if isinstance(data, dict) else None
+    if event not in PAYSTACK_EVENTS or not reference:
+        return None
+    if PaystackEvent.objects.filter(event=event, reference=reference).exists():
+        return None
+    try:
+        with transaction.atomic():
+            return PaystackEvent.objects.create(
+                event=event, reference=reference, paystack_id=str(data.get('id') or ''), payload=payload,
+            )
+    except IntegrityError:
+        return None  # a concurrent delivery of the same event got there first
+
+
+def verify_paystack_event(event_id):
+    """
+    Ask Paystack whether the event's charge really succeeded. Returns None if
+    the event has already been handled. Raises paystack.PaystackError if
+    Paystack can't be reached, so the task is retried.
+    """
+    record = PaystackEvent.objects.filter(pk=event_id, status='received').first()
+    if record is None:
+        return None
+    if order_id_from_reference(record.reference) is None:
+        return False
+    return paystack.verify_transaction(record.reference).get('status') == 'success'
+
+
+def apply_paystack_event(event_id, verified):
+    """
+    Mark the event's order paid if `verified` and it isn't already, and close
+    the event. Call inside a transaction. Returns the order if this call
+    paid it, else None.
+    """
+    record = PaystackEvent.objects.select_for_update().filter(pk=event_id, status='received').first()
+    if record is None:
+        return None
+    order = None
+    if verified:
+        order = Order.objects.select_for_update().filter(pk=order_id_from_reference(record.reference)).first()
+    if order is not None and order.status not in PAID_STATUSES:
+        order.status = 'paid'
+        order.save()  # commits the held stock, see signals.py
+    else:
+        order = None
+    record.status = 'processed' if order is not None else 'ignored'
+    record.processed_at = timezone.now()
+    record.save(update_fields=['status', 'processed_at'])
+    return order
+
+
+# --- Mckot -------------------------------------------------------------------
+
+# Used when an event's delivery object carries no status of its own
+MCKOT_EVENT_STATUSES = {
+    'delivery.created': 'pending',
+    'delivery.assigned': 'assigned',
+    'delivery.picked_up': 'in_transit',
+    'delivery.completed': 'delivered',
+    'delivery.cancelled': 'cancelled',
+}
+# How far along each status is; a delivery never moves to a lower rank, and
+# never leaves a final one. Statuses not listed are applied as they come.
+STATUS_RANK = {'scheduled': 0, 'pending': 1, 'assigned': 2, 'in_transit': 3, 'delivered': 4, 'cancelled': 4}
+FINAL_STATUSES = {'delivered', 'cancelled'}
+STATUS_HISTORY_LIMIT = 20
+APPLIED_FIELDS = [
+    'mckot_delivery_id', 'status', 'collection_status', 'courier_name', 'courier_phone', 'tracking_url',
+    'delivery_fee', 'distance_km', 'duration_minutes', 'status_history', 'last_event_at', 'updated_at',
+]
+
+
+def _event_time(payload, data):
+    for value in (payload.get('occurred_at'), payload.get('created_at'), data.get('updated_at')):
+        parsed = parse_datetime(value) if isinstance(value, str) else None
+        if parsed is not None:
+            return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+    return timezone.now()
+
+
+def record_mckot_event(payload, delivery_ref=None):
+    """Append a signature-checked Mckot payload to the event log."""
+    payload = payload if isinstance(payload, dict) else {}
+    data = payload.get('data') or payload
+    if not isinstance(data, dict):
+        data = {}
+    order_ref = str(data.get('order_ref') or '')
+    return MckotEvent.objects.create(
+        event=str(payload.get('event') or '')[:50],
+        delivery_ref=str(delivery_ref or data.get('id') or '')[:100],
+        order_ref=int(order_ref) if order_ref.isdigit() else None,
+        payload=data,
+        occurred_at=_event_time(payload, data),
+    )
+
+
+def _advances(current, new):
+    if new == current or current in FINAL_STATUSES:
+        return False
+    if new not in STATUS_RANK or current not in STATUS_RANK:
+        return True
+    return STATUS_RANK[new] >= STATUS_RANK[current]
+
+
+def _move_status(delivery, status, at):
+    """Set a delivery's status if it moves forward, and record it. Returns whether it moved."""
+    if not status or not _advances(delivery.status, status):
+        return False
+    delivery.status = status
+    history = list(delivery.status_history or [])
+    history.append({'status': status, 'at': at.isoformat()})
+    delivery.status_history = history[-STATUS_HISTORY_LIMIT:]
+    return True
+
+
+def fold_event(delivery, event):
+    """Apply one event to an in-memory Delivery. Returns False if it was stale."""
+    if delivery.last_event_at and event.occurred_at < delivery.last_event_at:
+        return False
+    fields = mckot.delivery_fields(event.payload)
+    status = fields.pop('status', None) or MCKOT_EVENT_STATUSES.get(event.event)
+    for field, value in fields.items():
+        setattr(delivery, field, value)
+    _move_status(delivery, status, event.occurred_at)
+    delivery.last_event_at = event.occurred_at
+    return True
+
+
+def apply_delivery_snapshot(delivery, data, **fields):
+    """
+    Save a Mckot delivery object we fetched (booking, tracking refresh) and any
+    extra `fields` onto `delivery`. The row is locked and re-read first, and
+    only the fields carried are written, so a webhook batch applied meanwhile
+    isn't overwritten; the status only moves forward, as from an event.
+    Returns the saved Delivery.
+    """
+    values = mckot.delivery_fields(data) if isinstance(data, dict) else {}
+    status = values.pop('status', None)
+    values.update(fields)
+    with transaction.atomic():
+        delivery = Delivery.objects.select_for_update().get(pk=delivery.pk)
+        for field, value in values.items():
+            setattr(delivery, field, value)
+        update_fields = [*values, 'updated_at']
+        if isinstance(data, dict):
+            delivery.raw_response = data
+            update_fields.append('raw_response')
+        if _move_status(delivery, status, timezone.now()):
+            update_fields += ['status', 'status_history']
+        delivery.save(update_fields=update_fields)
+    return delivery
+
+
+def _retry_cutoff():
+    return timezone.now() - timedelta(hours=getattr(settings, 'MCKOT_EVENT_RETRY_HOURS', 24))
+
+
+def _apply_batch(batch_size, after_id=0):
+    """
+    Fold one batch of unapplied events with ids above `after_id`. Returns
+    (events read, events applied, deliveries changed, last id read).
+    """
+    with transaction.atomic():
+        events = list(
+            MckotEvent.objects.select_for_update(skip_locked=True)
+            .filter(applied_at__isnull=True, id__gt=after_id).order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0, 0, 0, after_id
+        refs = {event.delivery_ref for event in events if event.delivery_ref}
+        order_refs = {event.order_ref for event in events if event.order_ref}
+        deliveries = list(
+            Delivery.objects.select_for_update().filter(Q(mckot_delivery_id__in=refs) | Q(order_id__in=order_refs))
+        )
+        by_ref = {delivery.mckot_delivery_id: delivery for delivery in deliveries if delivery.mckot_delivery_id}
+        by_order = {delivery.order_id: delivery for delivery in deliveries}
+
+        changed = {}
+        done, abandoned = [], []
+        cutoff = _retry_cutoff()
+        for event in sorted(events, key=lambda event: (event.occurred_at, event.id)):
+            delivery = by_ref.get(event.delivery_ref) or by_order.get(event.order_ref)
+            if delivery is None:
+                # Not booked on our side yet: keep it for the next run, within limits
+                if event.received_at < cutoff:
+                    abandoned.append(event.pk)
+                continue
+            done.append(event.pk)
+            if fold_event(delivery, event):
+                changed[delivery.pk] = delivery
+        now = timezone.now()
+        for delivery in changed.values():
+            delivery.updated_at = now  # bulk_update skips auto_now
+        Delivery.objects.bulk_update(changed.values(), APPLIED_FIELDS)
+        MckotEvent.objects.filter(pk__in=done + abandoned).update(applied_at=now)
+    if abandoned:
+        log_event('mckot.events_unmatched', logging.WARNING, event_ids=abandoned)
+    return len(events), len(done), len(changed), events[-1].pk
+
+
+def apply_mckot_events(batch_size=500):
+    """
+    Fold every unapplied Mckot event that has a Delivery into it. Returns
+    (events applied, deliveries changed).
+    """
+    applied = updated = 0
+    after_id = 0
+    while True:
+        read, events, deliveries, after_id = _apply_batch(batch_size, after_id)
+        applied += events
+        updated += deliveries
+        if read < batch_size:
+            return applied, updated
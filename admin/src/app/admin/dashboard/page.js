@@ -44,25 +44,24 @@ export default function AdminDashboard() {
 
   async function fetchStats() {
     try {
-      const [productsRes, ordersRes, usersRes] = await Promise.all([
-        authenticatedFetch(`${process.env.NEXT_PUBLIC_API_URL}/api/products/`),
-        authenticatedFetch(`${process.env.NEXT_PUBLIC_API_URL}/api/orders/`),
+      // page_size=1 with ?page= returns just the total count for each list
+      const [productsRes, ordersRes, usersRes, salesRes] = await Promise.all([
+        authenticatedFetch(`${process.env.NEXT_PUBLIC_API_URL}/api/products/?page=1&page_size=1`),
+        authenticatedFetch(`${process.env.NEXT_PUBLIC_API_URL}/api/orders/?page=1&page_size=1`),
         authenticatedFetch(`${process.env.NEXT_PUBLIC_API_URL}/api/users/stats/`),
+        authenticatedFetch(`${process.env.NEXT_PUBLIC_API_URL}/api/analytics/sales/`),
       ]);
 
       const products = await productsRes.json();
       const orders = await ordersRes.json();
       const usersData = await usersRes.json();
+      const sales = salesRes.ok ? await salesRes.json() : {};
 
-      // Ensure products and orders are arrays
-      const productsArray = Array.isArray(products) ? products : [];
-      const ordersArray = Array.isArray(orders) ? orders : [];
-
-      const revenue = ordersArray.reduce((sum, order) => sum + parseFloat(order.total || 0), 0);
+      const revenue = sales.summary?.total_revenue || 0;
 
       setStats({
-        totalProducts: productsArray.length || 0,
-        totalOrders: ordersArray.length || 0,
+        totalProducts: products.count || 0,
+        totalOrders: orders.count || 0,
         totalUsers: usersData.total_users || 0,
         totalRevenue: revenue,
       });
@@ -6,11 +6,16 @@ import { HiPlus, HiPencil, HiTrash, HiTag, HiMenu, HiX } from "react-icons/hi";
 import toast from "react-hot-toast";
 import AdminSidebar from "@/components/AdminSidebar";
 import AdminHeader from "@/components/AdminHeader";
+import AdminPagination from "@/components/AdminPagination";
 import { authenticatedFetch } from "@/utils/api";
 
+const PAGE_SIZE = 50;
+
 export default function AdminDiscountCodes() {
   const router = useRouter();
   const [codes, setCodes] = useState([]);
+  const [page, setPage] = useState(1);
+  const [count, setCount] = useState(0);
   const [loading, setLoading] = useState(true);
   const [showForm, setShowForm] = useState(false);
   const [editingId, setEditingId] = useState(null);
@@ -41,14 +46,15 @@ export default function AdminDiscountCodes() {
       return;
     }
     fetchCodes();
-  }, [accessToken, router]);
+  }, [accessToken, router, page]);
 
   async function fetchCodes() {
     try {
-      const res = await authenticatedFetch(`${process.env.NEXT_PUBLIC_API_URL}/api/discount-codes/`);
+      const res = await authenticatedFetch(`${process.env.NEXT_PUBLIC_API_URL}/api/discount-codes/?page=${page}&page_size=${PAGE_SIZE}`);
       if (res.ok) {
         const data = await res.json();
-        setCodes(data);
+        setCodes(Array.isArray(data) ? data : (data.results || []));
+        setCount(Array.isArray(data) ? data.length : data.count);
       }
     } catch (error) {
       console.error("Error fetching discount codes:", error);
@@ -462,6 +468,7 @@ export default function AdminDiscountCodes() {
                 </tbody>
               </table>
             </div>
+            <AdminPagination page={page} count={count} pageSize={PAGE_SIZE} onPageChange={setPage} />
             {codes.length === 0 && (
               <div className="text-center py-12">
                 <HiTag size={64} className="mx-auto text-gray-400 mb-4" />
@@ -7,11 +7,16 @@ import { HiShoppingCart, HiEye, HiShoppingBag, HiMenu, HiX, HiChevronDown } from
 import toast from "react-hot-toast";
 import AdminSidebar from "@/components/AdminSidebar";
 import AdminHeader from "@/components/AdminHeader";
+import AdminPagination from "@/components/AdminPagination";
 import { authenticatedFetch } from "@/utils/api";
 
+const PAGE_SIZE = 50;
+
 export default function AdminOrders() {
   const router = useRouter();
   const [orders, setOrders] = useState([]);
+  const [page, setPage] = useState(1);
+  const [count, setCount] = useState(0);
   const [loading, setLoading] = useState(true);
   const [sidebarOpen, setSidebarOpen] = useState(false);
   const [editingStatusId, setEditingStatusId] = useState(null);
@@ -31,11 +36,11 @@ export default function AdminOrders() {
       return;
     }
     fetchOrders();
-  }, [accessToken, router]);
+  }, [accessToken, router, page]);
 
   async function fetchOrders() {
     try {
-      const res = await authenticatedFetch(`${process.env.NEXT_PUBLIC_API_URL}/api/orders/`);
+      const res = await authenticatedFetch(`${process.env.NEXT_PUBLIC_API_URL}/api/orders/?page=${page}&page_size=${PAGE_SIZE}`);
       
       if (res.ok) {
         const data = await res.json();
@@ -45,6 +50,7 @@ export default function AdminOrders() {
         const ordersArray = Array.isArray(data) ? data : (data.results || []);
         console.log("Orders array:", ordersArray);
         setOrders(ordersArray);
+        setCount(Array.isArray(data) ? data.length : data.count);
       } else {
         const errorData = await res.json().catch(() => ({}));
         console.error("Failed to fetch orders:", res.status, errorData);
@@ -335,6 +341,7 @@ export default function AdminOrders() {
                 </tbody>
               </table>
             </div>
+            <AdminPagination page={page} count={count} pageSize={PAGE_SIZE} onPageChange={setPage} />
             {orders.length === 0 && (
               <div className="text-center py-12">
                 <HiShoppingCart size={64} className="mx-auto text-gray-400 mb-4" />
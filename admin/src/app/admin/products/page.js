@@ -8,34 +8,22 @@ import { HiPlus, HiPencil, HiTrash, HiShoppingBag } from "react-icons/hi";
 import toast from "react-hot-toast";
 import AdminSidebar from "@/components/AdminSidebar";
 import AdminHeader from "@/components/AdminHeader";
+import AdminPagination from "@/components/AdminPagination";
 import { authenticatedFetch } from "@/utils/api";
 
+const PAGE_SIZE = 50;
+
 export default function AdminProducts() {
   const router = useRouter();
   const [products, setProducts] = useState([]);
+  const [page, setPage] = useState(1);
+  const [count, setCount] = useState(0);
   const [loading, setLoading] = useState(true);
   const [sidebarOpen, setSidebarOpen] = useState(false);
 
   useEffect(() => {
     fetchProducts();
-  }, []);
-
-  async function fetchProducts() {
-    try {
-      const res = await authenticatedFetch(`${process.env.NEXT_PUBLIC_API_URL}/api/products/`);
-      if (res.ok) {
-        const data = await res.json();
-        setProducts(data);
-      }
-    } catch (error) {
-      console.error("Error fetching products:", error);
-      if (error.message === "No access token available" || error.message === "Refresh token expired") {
-        router.push("/");
-      }
-    } finally {
-      setLoading(false);
-    }
-  }
+  }, [page]);
 
   async function deleteProduct(id) {
     if (!confirm("Are you sure you want to delete this product?")) return;
@@ -64,10 +52,11 @@ export default function AdminProducts() {
 
   async function fetchProducts() {
     try {
-      const res = await authenticatedFetch(`${process.env.NEXT_PUBLIC_API_URL}/api/products/`);
+      const res = await authenticatedFetch(`${process.env.NEXT_PUBLIC_API_URL}/api/products/?page=${page}&page_size=${PAGE_SIZE}`);
       if (res.ok) {
         const data = await res.json();
-        setProducts(data);
+        setProducts(Array.isArray(data) ? data : (data.results || []));
+        setCount(Array.isArray(data) ? data.length : data.count);
       }
     } catch (error) {
       console.error("Error fetching products:", error);
@@ -197,6 +186,7 @@ export default function AdminProducts() {
                 </tbody>
               </table>
             </div>
+            <AdminPagination page={page} count={count} pageSize={PAGE_SIZE} onPageChange={setPage} />
             {products.length === 0 && (
               <div className="text-center py-12">
                 <HiShoppingBag size={64} className="mx-auto text-gray-400 mb-4" />
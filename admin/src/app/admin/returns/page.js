@@ -7,11 +7,16 @@ import { HiShoppingBag, HiEye, HiMenu, HiX, HiCheckCircle, HiXCircle, HiClock, H
 import toast from "react-hot-toast";
 import AdminSidebar from "@/components/AdminSidebar";
 import AdminHeader from "@/components/AdminHeader";
+import AdminPagination from "@/components/AdminPagination";
 import { authenticatedFetch } from "@/utils/api";
 
+const PAGE_SIZE = 50;
+
 export default function AdminReturns() {
   const router = useRouter();
   const [returns, setReturns] = useState([]);
+  const [page, setPage] = useState(1);
+  const [count, setCount] = useState(0);
   const [loading, setLoading] = useState(true);
   const [sidebarOpen, setSidebarOpen] = useState(false);
   const [editingId, setEditingId] = useState(null);
@@ -35,11 +40,11 @@ export default function AdminReturns() {
       return;
     }
     fetchReturns();
-  }, [accessToken, router]);
+  }, [accessToken, router, page]);
 
   async function fetchReturns() {
     try {
-      const res = await authenticatedFetch(`${process.env.NEXT_PUBLIC_API_URL}/api/return-requests/`);
+      const res = await authenticatedFetch(`${process.env.NEXT_PUBLIC_API_URL}/api/return-requests/?page=${page}&page_size=${PAGE_SIZE}`);
       if (res.ok) {
         const data = await res.json();
         console.log("Admin return requests response:", data);
@@ -47,6 +52,7 @@ export default function AdminReturns() {
         const requestsArray = Array.isArray(data) ? data : (data.results || []);
         console.log("Admin return requests array:", requestsArray);
         setReturns(requestsArray);
+        setCount(Array.isArray(data) ? data.length : data.count);
       }
     } catch (error) {
       console.error("Error fetching return requests:", error);
@@ -345,6 +351,7 @@ export default function AdminReturns() {
                 </tbody>
               </table>
             </div>
+            <AdminPagination page={page} count={count} pageSize={PAGE_SIZE} onPageChange={setPage} />
             {returns.length === 0 && (
               <div className="text-center py-12">
                 <HiShoppingBag size={64} className="mx-auto text-gray-400 mb-4" />
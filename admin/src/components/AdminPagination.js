@@ -0,0 +1,39 @@
+"use client";
+
+import { HiChevronLeft, HiChevronRight } from "react-icons/hi";
+
+// Page controls for the offset-paginated admin tables (?page=&page_size=)
+export default function AdminPagination({ page, count, pageSize, onPageChange }) {
+  const pages = Math.max(1, Math.ceil(count / pageSize));
+  if (pages <= 1) return null;
+
+  const first = (page - 1) * pageSize + 1;
+  const last = Math.min(page * pageSize, count);
+
+  return (
+    <div className="flex items-center justify-between px-6 py-4 border-t border-gray-200">
+      <p className="text-sm text-gray-600">
+        Showing {first}–{last} of {count}
+      </p>
+      <div className="flex items-center gap-2">
+        <button
+          onClick={() => onPageChange(page - 1)}
+          disabled={page <= 1}
+          className="p-2 rounded-md border border-gray-300 text-gray-700 hover:bg-gray-50 transition disabled:opacity-50 disabled:cursor-not-allowed"
+        >
+          <HiChevronLeft size={18} />
+        </button>
+        <span className="text-sm text-gray-700">
+          Page {page} of {pages}
+        </span>
+        <button
+          onClick={() => onPageChange(page + 1)}
+          disabled={page >= pages}
+          className="p-2 rounded-md border border-gray-300 text-gray-700 hover:bg-gray-50 transition disabled:opacity-50 disabled:cursor-not-allowed"
+        >
+          <HiChevronRight size={18} />
+        </button>
+      </div>
+    </div>
+  );
+}
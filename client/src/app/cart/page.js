@@ -95,10 +95,23 @@ export default function Page() {
     }
   }
 
-  function fetchProducts() {
-    fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/products/`)
+  function fetchProducts(cartItems) {
+    // Only fetch the products that are actually in the cart
+    const productIds = [...new Set(
+      (cartItems || [])
+        .map((item) => {
+          const product = item.variant?.product;
+          return product && typeof product === "object" ? product.id : product;
+        })
+        .filter(Boolean)
+    )];
+    if (productIds.length === 0) {
+      setProducts([]);
+      return;
+    }
+    fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/products/?ids=${productIds.join(",")}&page_size=100`)
       .then((res) => res.json())
-      .then((data) => setProducts(data))
+      .then((data) => setProducts(Array.isArray(data) ? data : (data.results || [])))
       .catch(() => {});
   }
 
@@ -199,7 +212,6 @@ export default function Page() {
     } else {
       loadGuestCart();
     }
-    fetchProducts();
     
     // Listen for cart update events
     const handleCartUpdate = () => {
@@ -217,6 +229,10 @@ export default function Page() {
     };
   }, [accessToken]);
 
+  useEffect(() => {
+    fetchProducts(cart?.items);
+  }, [cart]);
+
   function getProductAndVariant(cartItem) {
     if (!cartItem || !cartItem.variant) return { product: null, variant: null };
 
@@ -476,13 +492,13 @@ export default function Page() {
             </span>
             <button
               disabled={
-                                isUpdating || item.quantity >= variant.stock
+                                isUpdating || item.quantity >= variant.available
               }
               onClick={() =>
                                 updateCartItemQuantity(item.id, item.quantity + 1)
               }
               className={
-                                item.quantity >= variant.stock || isUpdating
+                                item.quantity >= variant.available || isUpdating
                   ? "opacity-30 cursor-not-allowed"
                   : ""
               }
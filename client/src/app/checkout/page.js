@@ -5,7 +5,7 @@ import { useRouter } from "next/navigation";
 import Link from "next/link";
 import toast from "react-hot-toast";
 import { HiPlus, HiMinus, HiLocationMarker, HiTruck } from "react-icons/hi";
-import { clearGuestCart, getGuestCart } from "@/utils/guestCart";
+import { clearGuestCart, getGuestCart, syncGuestCart } from "@/utils/guestCart";
 import DeliveryQuote from "@/components/DeliveryQuote";
 
 export default function CheckoutPage() {
@@ -206,6 +206,9 @@ export default function CheckoutPage() {
         headers["Authorization"] = `Bearer ${accessToken}`;
       }
 
+      // A saved guest cart is sent by its token rather than line by line
+      const cartToken = isGuest ? await syncGuestCart(cart) : null;
+
       const body = isGuest ? {
         guest_email: guestInfo.email,
         guest_name: guestInfo.name,
@@ -219,6 +222,7 @@ export default function CheckoutPage() {
         },
         shipping_method_id: selectedShipping,
         discount_code: discountCode || null,
+        ...(cartToken ? { cart_token: cartToken } : {}),
         cart_items: (cart.items || []).map(item => {
           // Handle both nested variant object and direct variant_id
           const variantId = item.variant?.id || item.variant_id || item.variant;
@@ -9,6 +9,9 @@ import Breadcrumbs from "@/components/Breadcrumbs";
 export default function OrdersPage() {
   const [orders, setOrders] = useState([]);
   const [loading, setLoading] = useState(true);
+  // Cursor link to the next (older) page of orders, null on the last page
+  const [nextUrl, setNextUrl] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const [accessToken, setAccessToken] = useState(() => {
     if (typeof window !== "undefined") {
@@ -55,9 +58,9 @@ export default function OrdersPage() {
     }
   }, [accessToken]);
 
-  async function fetchOrders() {
+  async function fetchOrders(url = `${process.env.NEXT_PUBLIC_API_URL}/api/orders/history/`, append = false) {
     try {
-      let res = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/orders/history/`, {
+      let res = await fetch(url, {
         headers: {
           Authorization: `Bearer ${accessToken}`,
         },
@@ -68,14 +71,14 @@ export default function OrdersPage() {
         const newToken = await refreshAccessToken();
         if (newToken) {
           // Retry with new token
-          res = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/orders/history/`, {
+          res = await fetch(url, {
             headers: {
               Authorization: `Bearer ${newToken}`,
             },
           });
         } else {
           console.error("Session expired. Please sign in again.");
-          setOrders([]);
+          if (!append) setOrders([]);
           setLoading(false);
           return;
         }
@@ -87,20 +90,28 @@ export default function OrdersPage() {
         // Ensure data is an array
         const ordersArray = Array.isArray(data) ? data : (data.results || []);
         console.log("Orders array:", ordersArray);
-        setOrders(ordersArray);
+        setOrders((prev) => (append ? [...prev, ...ordersArray] : ordersArray));
+        setNextUrl(Array.isArray(data) ? null : data.next);
       } else {
         const errorText = await res.text();
         console.error("Failed to fetch orders:", res.status, errorText);
-        setOrders([]);
+        if (!append) setOrders([]);
       }
     } catch (error) {
       console.error("Error fetching orders:", error);
-      setOrders([]);
+      if (!append) setOrders([]);
     } finally {
       setLoading(false);
     }
   }
 
+  async function loadMore() {
+    if (!nextUrl || loadingMore) return;
+    setLoadingMore(true);
+    await fetchOrders(nextUrl, true);
+    setLoadingMore(false);
+  }
+
   function getStatusColor(status) {
     const colors = {
       pending: "bg-yellow-100 text-yellow-800",
@@ -200,6 +211,17 @@ export default function OrdersPage() {
             ))}
           </div>
         )}
+        {nextUrl && (
+          <div className="flex justify-center mt-8">
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="px-6 py-3 rounded-md font-semibold bg-[#C8961F] text-[#231F20] hover:bg-[#A87814] transition disabled:opacity-60 disabled:cursor-not-allowed"
+            >
+              {loadingMore ? "Loading..." : "Load more"}
+            </button>
+          </div>
+        )}
       </div>
     </ProtectedRoute>
   );
@@ -29,11 +29,12 @@ export default function Home() {
     }
 
     fetch(
-      `${process.env.NEXT_PUBLIC_API_URL}/api/products/?ordering=-base_price`
+      `${process.env.NEXT_PUBLIC_API_URL}/api/products/?ordering=-base_price&page_size=8`
     )
       .then((res) => res.json())
       .then((data) => {
-        setFeaturedProducts(data.slice(0, 8));
+        const productsArray = Array.isArray(data) ? data : (data.results || []);
+        setFeaturedProducts(productsArray.slice(0, 8));
         setLoading(false);
       })
       .catch(() => setLoading(false));
@@ -21,7 +21,8 @@ export default function ProductsContent() {
     texture: [],
   });
   const [categories, setCategories] = useState([]);
-  const [sortBy, setSortBy] = useState("base_price");
+  // Search results default to the server's relevance order ("" = no ?ordering=)
+  const [sortBy, setSortBy] = useState(searchQuery ? "" : "base_price");
 
   useEffect(() => {
     // Fetch categories
@@ -74,6 +75,7 @@ export default function ProductsContent() {
                   onChange={(e) => setSortBy(e.target.value)}
                   className="appearance-none pl-3 pr-8 py-2 border border-gray-300 dark:border-gray-600 rounded-md text-sm text-gray-700 dark:text-gray-300 bg-white dark:bg-gray-800 focus:outline-none focus:ring-1 focus:ring-gray-400 dark:focus:ring-gray-500 focus:border-gray-400 dark:focus:border-gray-500 cursor-pointer hover:border-gray-400 dark:hover:border-gray-500 transition min-w-[160px]"
                 >
+                  {searchQuery && <option value="">Best Match</option>}
                   <option value="base_price">Price: Low to High</option>
                   <option value="-base_price">Price: High to Low</option>
                   <option value="title">Name: A to Z</option>
@@ -345,11 +345,11 @@ export default function ProductPage() {
     if (variantMatches.length === 0) return undefined;
 
     if (variantMatches.length === 1) {
-      return variantMatches[0].stock;
+      return variantMatches[0].available;
     }
 
-    // If multiple variants match → sum stock
-    return variantMatches.reduce((sum, v) => sum + (v.stock || 0), 0);
+    // If multiple variants match → sum what's available
+    return variantMatches.reduce((sum, v) => sum + (v.available || 0), 0);
   })();
 
   async function addCart() {
@@ -768,6 +768,7 @@ export default function ProductPage() {
           <div className="hidden lg:block w-full lg:max-w-[60vw] mt-6">
             <Reviews
               productId={product.id}
+              reviewCount={product.review_count}
               canReview={product.can_review || false}
               onReviewSubmitted={() => {
                 // Refresh product data to update can_review status
@@ -859,7 +860,7 @@ export default function ProductPage() {
         </div>
         {/* DYNAMIC VARIANT SYSTEM */}
         {(() => {
-          const ignored = ["id", "price", "stock"];
+          const ignored = ["id", "price", "stock", "available"];
           const variantKeys = Object.keys(product.variants[0]).filter(
             (key) =>
               !ignored.includes(key) &&
@@ -900,7 +901,7 @@ export default function ProductPage() {
                     <div className="flex flex-wrap gap-2">
                       {variantOptions[key].map((value) => {
                         const matchesStock = product.variants.some(
-                          (v) => v[key] === value && v.stock > 0
+                          (v) => v[key] === value && v.available > 0
                         );
                         const available = valid.includes(value) && matchesStock;
                         const isSelected = selected[key] === value;
@@ -1291,6 +1292,7 @@ export default function ProductPage() {
         <div className="w-full px-2 lg:hidden py-8">
           <Reviews
             productId={product.id}
+            reviewCount={product.review_count}
             canReview={product.can_review || false}
             onReviewSubmitted={async () => {
               // Refresh product data to update can_review status
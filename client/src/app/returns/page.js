@@ -12,6 +12,9 @@ export default function ReturnsPage() {
   const router = useRouter();
   const [returnRequests, setReturnRequests] = useState([]);
   const [loading, setLoading] = useState(true);
+  // Cursor link to the next (older) page of return requests, null on the last page
+  const [nextUrl, setNextUrl] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [accessToken, setAccessToken] = useState(() => {
     if (typeof window !== "undefined") {
       return localStorage.getItem("access");
@@ -27,9 +30,9 @@ export default function ReturnsPage() {
     fetchReturns();
   }, [accessToken, router]);
 
-  async function fetchReturns() {
+  async function fetchReturns(url = `${process.env.NEXT_PUBLIC_API_URL}/api/return-requests/`, append = false) {
     try {
-      const res = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/return-requests/`, {
+      const res = await fetch(url, {
         headers: {
           Authorization: `Bearer ${accessToken}`,
         },
@@ -41,7 +44,10 @@ export default function ReturnsPage() {
         // Handle paginated response
         const requestsArray = Array.isArray(data) ? data : (data.results || []);
         console.log("Return requests array:", requestsArray);
-        setReturnRequests(requestsArray);
+        setReturnRequests((prev) => (append ? [...prev, ...requestsArray] : requestsArray));
+        setNextUrl(Array.isArray(data) ? null : data.next);
+      } else if (append) {
+        toast.error("Couldn't load more return requests");
       }
     } catch (error) {
       console.error("Error fetching return requests:", error);
@@ -50,6 +56,13 @@ export default function ReturnsPage() {
     }
   }
 
+  async function loadMore() {
+    if (!nextUrl || loadingMore) return;
+    setLoadingMore(true);
+    await fetchReturns(nextUrl, true);
+    setLoadingMore(false);
+  }
+
   function getStatusColor(status) {
     const colors = {
       pending: "bg-yellow-100 text-yellow-800 border-yellow-200",
@@ -209,6 +222,17 @@ export default function ReturnsPage() {
             ))}
           </div>
         )}
+        {nextUrl && (
+          <div className="flex justify-center mt-8">
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="px-6 py-3 rounded-md font-semibold bg-[#C8961F] text-[#231F20] hover:bg-[#A87814] transition disabled:opacity-60 disabled:cursor-not-allowed"
+            >
+              {loadingMore ? "Loading..." : "Load more"}
+            </button>
+          </div>
+        )}
       </div>
     </ProtectedRoute>
   );
@@ -4,9 +4,12 @@ import { useState, useEffect } from "react";
 import { HiStar } from "react-icons/hi";
 import toast from "react-hot-toast";
 
-export default function Reviews({ productId, canReview, onReviewSubmitted }) {
+export default function Reviews({ productId, reviewCount, canReview, onReviewSubmitted }) {
   const [reviews, setReviews] = useState([]);
   const [loading, setLoading] = useState(true);
+  // Cursor link to the next (older) page of reviews, null on the last page
+  const [nextUrl, setNextUrl] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [showForm, setShowForm] = useState(false);
   const [formData, setFormData] = useState({
     rating: 5,
@@ -30,7 +33,8 @@ export default function Reviews({ productId, canReview, onReviewSubmitted }) {
       const res = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/reviews/?product=${productId}`);
       if (res.ok) {
         const data = await res.json();
-        setReviews(data);
+        setReviews(Array.isArray(data) ? data : (data.results || []));
+        setNextUrl(Array.isArray(data) ? null : data.next);
       }
     } catch (error) {
       console.error("Error fetching reviews:", error);
@@ -39,6 +43,26 @@ export default function Reviews({ productId, canReview, onReviewSubmitted }) {
     }
   }
 
+  async function loadMore() {
+    if (!nextUrl || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const res = await fetch(nextUrl);
+      if (!res.ok) throw new Error("Network response not ok");
+      const data = await res.json();
+      setReviews((prev) => {
+        const seen = new Set(prev.map((review) => review.id));
+        return [...prev, ...(data.results || []).filter((review) => !seen.has(review.id))];
+      });
+      setNextUrl(data.next);
+    } catch (error) {
+      console.error("Error fetching reviews:", error);
+      toast.error("Couldn't load more reviews");
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
   async function handleSubmit(e) {
     e.preventDefault();
     if (!accessToken) {
@@ -103,7 +127,7 @@ export default function Reviews({ productId, canReview, onReviewSubmitted }) {
     <div className="py-8 border-t border-gray-200 dark:border-gray-700">
       <div className="flex items-center justify-between mb-6">
         <h2 className="text-2xl font-bold text-gray-900 dark:text-white">
-          Reviews ({reviews.length})
+          Reviews ({reviewCount ?? reviews.length})
         </h2>
         {canReview && accessToken && !showForm && (
           <button
@@ -235,6 +259,17 @@ export default function Reviews({ productId, canReview, onReviewSubmitted }) {
           ))}
         </div>
       )}
+      {nextUrl && (
+        <div className="flex justify-center mt-8">
+          <button
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="px-6 py-2 bg-[#C8961F] text-[#231F20] rounded-lg hover:bg-[#A87814] transition font-semibold disabled:opacity-50 disabled:cursor-not-allowed"
+          >
+            {loadingMore ? "Loading..." : "Load more reviews"}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
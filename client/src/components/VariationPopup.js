@@ -77,7 +77,7 @@ export default function VariationPopup({ product, isOpen, onClose, onAddToCart,
   // Get available attributes
   const variantAttributes = getVariantAttributes();
   const maxStock = variantMatches.length > 0 
-    ? variantMatches.reduce((sum, v) => sum + (v.stock || 0), 0)
+    ? variantMatches.reduce((sum, v) => sum + (v.available || 0), 0)
     : 0;
 
   // Check if a variant is fully selected
@@ -95,8 +95,8 @@ export default function VariationPopup({ product, isOpen, onClose, onAddToCart,
       return;
     }
 
-    if (variantMatches[0].stock < quantity) {
-      toast.error(`Only ${variantMatches[0].stock} available in stock`);
+    if (variantMatches[0].available < quantity) {
+      toast.error(`Only ${variantMatches[0].available} available in stock`);
       return;
     }
 
@@ -271,8 +271,8 @@ export default function VariationPopup({ product, isOpen, onClose, onAddToCart,
                         </div>
                         <div className="flex justify-between items-center">
                           <span className="font-semibold">Stock:</span>
-                          <span className={variantMatches[0].stock > 0 ? "text-green-600" : "text-red-600"}>
-                            {variantMatches[0].stock > 0 ? `${variantMatches[0].stock} available` : "Out of stock"}
+                          <span className={variantMatches[0].available > 0 ? "text-green-600" : "text-red-600"}>
+                            {variantMatches[0].available > 0 ? `${variantMatches[0].available} available` : "Out of stock"}
                           </span>
                         </div>
                       </div>
@@ -13,6 +13,9 @@ const DEFAULT_FILTERS = {};
 export default function Listing({ searchQuery, filters = DEFAULT_FILTERS, sortBy = "base_price" }) {
   const router = useRouter();
   const [products, setProducts] = useState([]);
+  // Cursor link to the next page of results, null on the last page
+  const [nextUrl, setNextUrl] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [likedProducts, setLikedProducts] = useState(new Set());
   const [selectedProduct, setSelectedProduct] = useState(null);
   const [showVariationPopup, setShowVariationPopup] = useState(false);
@@ -28,6 +31,8 @@ export default function Listing({ searchQuery, filters = DEFAULT_FILTERS, sortBy
   const prevSearchQueryRef = useRef(searchQuery);
   const prevSortByRef = useRef(sortBy);
   const hasFetchedRef = useRef(false);
+  // Bumped on every new search so a late "load more" can't mix in old results
+  const requestRef = useRef(0);
   
   function fetchProducts() {
     let url = `${process.env.NEXT_PUBLIC_API_URL}/api/products/`;
@@ -62,6 +67,13 @@ export default function Listing({ searchQuery, filters = DEFAULT_FILTERS, sortBy
       });
     }
     
+    if (filters.priceMin !== null && filters.priceMin !== undefined) {
+      params.append("min_price", filters.priceMin);
+    }
+    if (filters.priceMax !== null && filters.priceMax !== undefined) {
+      params.append("max_price", filters.priceMax);
+    }
+    
     // Add sorting
     if (sortBy) {
       params.append("ordering", sortBy);
@@ -72,34 +84,48 @@ export default function Listing({ searchQuery, filters = DEFAULT_FILTERS, sortBy
       url += `?${queryString}`;
     }
     
+    const request = ++requestRef.current;
     fetch(url)
       .then((res) => {
         if (!res.ok) throw new Error("Network response not ok");
         return res.json();
       })
-      .then((products) => {
-        // Apply price filter on client side if needed
-        let filteredProducts = products;
-        
-        if (filters.priceMin !== null || filters.priceMax !== null) {
-          filteredProducts = products.filter((product) => {
-            const prices = product.variants.map((v) => parseFloat(v.price));
-            const minPrice = Math.min(...prices);
-            const maxPrice = Math.max(...prices);
-            
-            if (filters.priceMin !== null && maxPrice < filters.priceMin) return false;
-            if (filters.priceMax !== null && minPrice > filters.priceMax) return false;
-            return true;
-          });
-        }
-        
-        setProducts(filteredProducts);
+      .then((data) => {
+        if (request !== requestRef.current) return;
+        // Facet and price filters are applied server-side
+        const products = Array.isArray(data) ? data : (data.results || []);
+        setProducts(products);
+        setNextUrl(Array.isArray(data) ? null : data.next);
       })
       .catch((error) => {
         console.error("Fetch error:", error);
       });
   }
 
+  function loadMore() {
+    if (!nextUrl || loadingMore) return;
+    const request = requestRef.current;
+    setLoadingMore(true);
+    fetch(nextUrl)
+      .then((res) => {
+        if (!res.ok) throw new Error("Network response not ok");
+        return res.json();
+      })
+      .then((data) => {
+        if (request !== requestRef.current) return;
+        setProducts((prev) => {
+          const seen = new Set(prev.map((product) => product.id));
+          return [...prev, ...(data.results || []).filter((product) => !seen.has(product.id))];
+        });
+        setNextUrl(data.next);
+      })
+      .catch((error) => {
+        console.error("Fetch error:", error);
+        toast.error("Couldn't load more products");
+      })
+      .finally(() => setLoadingMore(false));
+  }
+
   function priceRange(variants) {
     const prices = variants.map((variant) => variant.price);
     const minPrice = Math.min(...prices);
@@ -111,7 +137,7 @@ export default function Listing({ searchQuery, filters = DEFAULT_FILTERS, sortBy
 
   function UrgencyBadge({ variants }) {
     const totalStock = variants.reduce(
-      (sum, variant) => sum + variant.stock,
+      (sum, variant) => sum + variant.available,
       0
     );
     const stock = totalStock;
@@ -508,6 +534,17 @@ export default function Listing({ searchQuery, filters = DEFAULT_FILTERS, sortBy
         </div></Link>
       ))}
     </div>
+    {nextUrl && (
+      <div className="flex justify-center mt-8">
+        <button
+          onClick={loadMore}
+          disabled={loadingMore}
+          className="px-6 py-3 rounded-md font-semibold bg-[#C8961F] text-[#231F20] hover:bg-[#A87814] transition disabled:opacity-60 disabled:cursor-not-allowed"
+        >
+          {loadingMore ? "Loading..." : "Load more"}
+        </button>
+      </div>
+    )}
     </>
   );
 }
@@ -7,6 +7,7 @@ import React, {
   useState,
   useCallback,
 } from "react";
+import { clearGuestCart, getGuestCartToken } from "@/utils/guestCart";
 
 const AuthContext = createContext(null);
 
@@ -148,13 +149,15 @@ export function AuthProvider({ children }) {
       const res = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/token/`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ username, password }),
+        // The server merges the guest cart, if any, into the account's cart
+        body: JSON.stringify({ username, password, cart_token: getGuestCartToken() || undefined }),
       });
 
       if (!res.ok) return false;
 
       const data = await res.json();
       saveTokens(data.access, data.refresh);
+      if (getGuestCartToken()) clearGuestCart();
       return true;
     } catch {
       return false;
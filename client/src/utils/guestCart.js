@@ -1,8 +1,12 @@
 /**
- * Guest cart utilities for managing cart in localStorage
+ * Guest cart utilities for managing cart in localStorage.
+ *
+ * The cart is mirrored to the server (/api/cart/guest/) so checkout and
+ * login can name it by its signed token instead of resending every line.
  */
 
 export const GUEST_CART_KEY = 'guest_cart';
+export const GUEST_CART_TOKEN_KEY = 'guest_cart_token';
 
 /**
  * Get guest cart from localStorage
@@ -53,6 +57,63 @@ export function saveGuestCart(cart) {
     window.dispatchEvent(new Event('cartUpdated'));
   } catch (error) {
     console.error('Error saving guest cart:', error);
+    return;
+  }
+
+  // Keep the server copy in step; the local cart works without it
+  syncGuestCart(cart);
+}
+
+/**
+ * Get the signed token of the server-side guest cart
+ * @returns {string|null} Token, or null if the cart hasn't been saved yet
+ */
+export function getGuestCartToken() {
+  if (typeof window === 'undefined') return null;
+  return localStorage.getItem(GUEST_CART_TOKEN_KEY);
+}
+
+/**
+ * Save the cart's lines to the server-side guest cart, creating it if needed.
+ * Every response carries a refreshed token, which replaces the stored one.
+ * @param {Object} cart - Cart object with items array
+ * @returns {Promise<string|null>} Current token, or null if the save failed
+ */
+export async function syncGuestCart(cart) {
+  if (typeof window === 'undefined' || !cart) return null;
+
+  const items = (cart.items || []).map(item => ({
+    variant_id: item.variant_id || item.variant?.id,
+    quantity: item.quantity || 1,
+  })).filter(item => item.variant_id);
+  const url = `${process.env.NEXT_PUBLIC_API_URL}/api/cart/guest/`;
+
+  try {
+    const token = getGuestCartToken();
+    let res = null;
+    if (token) {
+      res = await fetch(url, {
+        method: 'PUT',
+        headers: { 'Content-Type': 'application/json', 'X-Cart-Token': token },
+        body: JSON.stringify({ items }),
+      });
+    }
+    // No cart yet, or it expired: start a new one
+    if (!res || res.status === 404) {
+      res = await fetch(url, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ items }),
+      });
+    }
+    if (!res.ok) return null;
+
+    const data = await res.json();
+    localStorage.setItem(GUEST_CART_TOKEN_KEY, data.token);
+    return data.token;
+  } catch (error) {
+    console.error('Error syncing guest cart:', error);
+    return null;
   }
 }
 
@@ -139,6 +200,7 @@ export function updateGuestCartQuantity(variantId, quantity) {
 export function clearGuestCart() {
   if (typeof window === 'undefined') return;
   localStorage.removeItem(GUEST_CART_KEY);
+  localStorage.removeItem(GUEST_CART_TOKEN_KEY);
   window.dispatchEvent(new Event('cartUpdated'));
 }
 